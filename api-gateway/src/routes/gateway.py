@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flasgger import swag_from
 import requests
 import os
@@ -9,7 +9,8 @@ gateway_bp = Blueprint('gateway', __name__)
 SERVICES = {
     'user': os.getenv('USER_SERVICE_URL', 'http://localhost:3001'),
     'experience': os.getenv('EXPERIENCE_SERVICE_URL', 'http://localhost:3002'),
-    'review': os.getenv('REVIEW_SERVICE_URL', 'http://localhost:3004')
+    'review': os.getenv('REVIEW_SERVICE_URL', 'http://localhost:3004'),
+    'map': os.getenv('MAP_SERVICE_URL', 'http://localhost:3003')
 }
 
 def proxy_request(service_url, path, method='GET', timeout=30):
@@ -67,6 +68,52 @@ def proxy_request(service_url, path, method='GET', timeout=30):
     except Exception as e:
         return jsonify({'error': f'Erro interno do gateway: {str(e)}'}), 500
 
+def stream_proxy_request(service_url, path, timeout=30):
+    """Proxy de GET que repassa o corpo da resposta em blocos (downloads grandes e binários)
+
+    Repassa também 304 e os headers de cache (ETag), para If-None-Match do cliente
+    chegar ao serviço e a resposta condicional voltar intacta.
+    """
+    try:
+        headers = dict(request.headers)
+        for header in ['Content-Length', 'Host', 'Content-Type']:
+            headers.pop(header, None)
+        
+        response = requests.get(f"{service_url}{path}", params=request.args, headers=headers,
+                                timeout=timeout, stream=True)
+        
+        if response.status_code not in (200, 304):
+            try:
+                return response.json(), response.status_code
+            finally:
+                response.close()
+        
+        passthrough_headers = {
+            name: response.headers[name]
+            for name in ['Content-Disposition', 'Cache-Control', 'ETag', 'Last-Modified']
+            if name in response.headers
+        }
+        
+        def generate():
+            try:
+                yield from response.iter_content(chunk_size=64 * 1024)
+            finally:
+                response.close()
+        
+        return Response(
+            stream_with_context(generate()),
+            status=response.status_code,
+            content_type=response.headers.get('Content-Type'),
+            headers=passthrough_headers
+        )
+        
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Timeout na requisição'}), 504
+    except requests.exceptions.ConnectionError:
+        return jsonify({'error': 'Serviço indisponível'}), 503
+    except Exception as e:
+        return jsonify({'error': f'Erro interno do gateway: {str(e)}'}), 500
+
 # Rotas do User Service
 @gateway_bp.route('/auth/register', methods=['POST'])
 @swag_from({
@@ -242,7 +289,9 @@ def search_users():
         {'name': 'page', 'in': 'query', 'type': 'integer', 'description': 'Número da página'},
         {'name': 'per_page', 'in': 'query', 'type': 'integer', 'description': 'Itens por página'},
         {'name': 'category', 'in': 'query', 'type': 'string', 'description': 'Filtrar por categoria'},
-        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Termo de busca'}
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Termo de busca'},
+        {'name': 'include_facets', 'in': 'query', 'type': 'boolean', 'description': 'Incluir contagens por faceta do conjunto filtrado'},
+        {'name': 'open_at', 'in': 'query', 'type': 'string', 'description': "Abertas em: 'now', dia e horário ('sab 22:00') ou data ISO 8601"}
     ],
     'responses': {
         200: {'description': 'Lista de experiências'}
@@ -266,6 +315,78 @@ def get_experiences():
 def get_experience(experience_id):
     return proxy_request(SERVICES['experience'], f'/api/experiences/{experience_id}', 'GET')
 
+@gateway_bp.route('/experiences/facets', methods=['GET'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Contagens por faceta para os filtros de experiências',
+    'parameters': [
+        {'name': 'category_id', 'in': 'query', 'type': 'string'},
+        {'name': 'is_hidden_gem', 'in': 'query', 'type': 'boolean'},
+        {'name': 'min_rating', 'in': 'query', 'type': 'number'},
+        {'name': 'price_range', 'in': 'query', 'type': 'integer'},
+        {'name': 'search', 'in': 'query', 'type': 'string', 'description': 'Termo de busca'},
+        {'name': 'open_at', 'in': 'query', 'type': 'string', 'description': "Abertas em: 'now', dia e horário ('sab 22:00') ou data ISO 8601"}
+    ],
+    'responses': {
+        200: {'description': 'Total e contagens por categoria, faixa de preço, joia escondida e nota mínima'}
+    }
+})
+def get_experience_facets():
+    return proxy_request(SERVICES['experience'], '/api/experiences/facets', 'GET')
+
+@gateway_bp.route('/experiences/batch', methods=['GET', 'POST'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Obter várias experiências por ID',
+    'parameters': [
+        {'name': 'ids', 'in': 'query', 'type': 'string', 'required': False, 'description': 'IDs separados por vírgula (GET, máx. 250)'},
+        {'name': 'body', 'in': 'body', 'required': False, 'schema': {
+            'type': 'object',
+            'properties': {'ids': {'type': 'array', 'items': {'type': 'string'}}}
+        }}
+    ],
+    'responses': {
+        200: {'description': 'Experiências na ordem pedida e ids não encontrados (missing)'},
+        400: {'description': 'Nenhum id ou ids demais'}
+    }
+})
+def get_experiences_batch():
+    return proxy_request(SERVICES['experience'], '/api/experiences/batch', request.method)
+
+@gateway_bp.route('/experiences/<experience_id>/neighbors', methods=['GET'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Experiências mais próximas de uma experiência',
+    'parameters': [
+        {'name': 'experience_id', 'in': 'path', 'type': 'string', 'required': True},
+        {'name': 'scope', 'in': 'query', 'type': 'string', 'enum': ['all', 'category'], 'description': "'category' para só a mesma categoria (padrão: all)"},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'description': 'Máximo de vizinhos (padrão e máx.: 10)'}
+    ],
+    'responses': {
+        200: {'description': 'Vizinhos até 5km, do mais próximo ao mais distante'},
+        404: {'description': 'Experiência não encontrada'}
+    }
+})
+def get_experience_neighbors(experience_id):
+    return proxy_request(SERVICES['experience'], f'/api/experiences/{experience_id}/neighbors', 'GET')
+
+@gateway_bp.route('/experiences/<experience_id>/similar', methods=['GET'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Experiências parecidas com uma experiência',
+    'parameters': [
+        {'name': 'experience_id', 'in': 'path', 'type': 'string', 'required': True},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'description': 'Máximo de resultados (padrão: 10, máx.: 20)'}
+    ],
+    'responses': {
+        200: {'description': 'Experiências parecidas por nome, descrição, categoria e preço, com score de similaridade'},
+        404: {'description': 'Experiência não encontrada'},
+        503: {'description': 'Índice de similaridade ainda em construção'}
+    }
+})
+def get_similar_experiences(experience_id):
+    return proxy_request(SERVICES['experience'], f'/api/experiences/{experience_id}/similar', 'GET')
+
 @gateway_bp.route('/experiences/nearby', methods=['GET'])
 @swag_from({
     'tags': ['Experiences'],
@@ -273,7 +394,8 @@ def get_experience(experience_id):
     'parameters': [
         {'name': 'lat', 'in': 'query', 'type': 'number', 'required': True, 'description': 'Latitude'},
         {'name': 'lng', 'in': 'query', 'type': 'number', 'required': True, 'description': 'Longitude'},
-        {'name': 'radius', 'in': 'query', 'type': 'number', 'description': 'Raio em km (padrão: 10)'}
+        {'name': 'radius', 'in': 'query', 'type': 'number', 'description': 'Raio em km (padrão: 10)'},
+        {'name': 'open_at', 'in': 'query', 'type': 'string', 'description': "Abertas em: 'now', dia e horário ('sab 22:00') ou data ISO 8601"}
     ],
     'responses': {
         200: {'description': 'Experiências próximas'}
@@ -282,6 +404,124 @@ def get_experience(experience_id):
 def get_nearby_experiences():
     return proxy_request(SERVICES['experience'], '/api/experiences/nearby', 'GET')
 
+@gateway_bp.route('/experiences/nearby/batch', methods=['POST'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Buscar experiências próximas a várias coordenadas (roteiros)',
+    'parameters': [
+        {'name': 'body', 'in': 'body', 'required': True, 'schema': {
+            'type': 'object',
+            'properties': {
+                'origins': {'type': 'array', 'items': {'type': 'object', 'properties': {
+                    'latitude': {'type': 'number'}, 'longitude': {'type': 'number'}, 'radius_km': {'type': 'number'}
+                }}},
+                'radius_km': {'type': 'number', 'description': 'Raio padrão em km (padrão: 5, máx. 50)'},
+                'limit': {'type': 'integer', 'description': 'Resultados por origem (padrão: 20, máx. 50)'},
+                'category_id': {'type': 'string'},
+                'min_rating': {'type': 'number'},
+                'open_at': {'type': 'string'}
+            }
+        }}
+    ],
+    'responses': {
+        200: {'description': 'Ids e distâncias por origem; cada experiência uma vez em experiences'},
+        400: {'description': 'Origens inválidas'}
+    }
+})
+def get_nearby_experiences_batch():
+    return proxy_request(SERVICES['experience'], '/api/experiences/nearby/batch', 'POST')
+
+@gateway_bp.route('/experiences/along-route', methods=['GET', 'POST'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Buscar experiências ao longo de um trajeto',
+    'parameters': [
+        {'name': 'polyline', 'in': 'query', 'type': 'string', 'required': True, 'description': 'Trajeto em encoded polyline (no corpo JSON em POST)'},
+        {'name': 'precision', 'in': 'query', 'type': 'integer', 'enum': [5, 6], 'description': 'Precisão do polyline (padrão: 5)'},
+        {'name': 'width_m', 'in': 'query', 'type': 'number', 'description': 'Distância máxima até o trajeto em metros (padrão: 300, máx. 5000)'},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'description': 'Máximo de resultados (padrão: 100, máx. 200)'},
+        {'name': 'category_id', 'in': 'query', 'type': 'string'},
+        {'name': 'min_rating', 'in': 'query', 'type': 'number'},
+        {'name': 'open_at', 'in': 'query', 'type': 'string', 'description': "Abertas em: 'now', dia e horário ('sab 22:00') ou data ISO 8601"}
+    ],
+    'responses': {
+        200: {'description': 'Experiências na ordem do percurso, com posição no trajeto (km) e distância até ele (m)'},
+        400: {'description': 'Polyline ou parâmetros inválidos'}
+    }
+})
+def get_experiences_along_route():
+    return proxy_request(SERVICES['experience'], '/api/experiences/along-route', request.method)
+
+@gateway_bp.route('/tiles/<int:z>/<int:x>/<int:y>.mvt', methods=['GET'])
+@swag_from({
+    'tags': ['Map'],
+    'summary': 'Vector tile (Mapbox Vector Tile) com as experiências do tile z/x/y',
+    'produces': ['application/vnd.mapbox-vector-tile'],
+    'parameters': [
+        {'name': 'z', 'in': 'path', 'type': 'integer', 'required': True},
+        {'name': 'x', 'in': 'path', 'type': 'integer', 'required': True},
+        {'name': 'y', 'in': 'path', 'type': 'integer', 'required': True}
+    ],
+    'responses': {
+        200: {'description': 'Tile MVT (camada experiences), com ETag da versão do tile'},
+        304: {'description': 'Tile não mudou desde o ETag enviado em If-None-Match'},
+        400: {'description': 'Coordenadas de tile inválidas'}
+    }
+})
+def get_experience_tile(z, x, y):
+    return stream_proxy_request(SERVICES['map'], f'/api/tiles/{z}/{x}/{y}.mvt')
+
+@gateway_bp.route('/experiences/heatmap', methods=['GET'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Mapa de calor de experiências, reviews e nota média',
+    'parameters': [
+        {'name': 'bbox', 'in': 'query', 'type': 'string', 'required': True, 'description': 'min_lng,min_lat,max_lng,max_lat'},
+        {'name': 'resolution', 'in': 'query', 'type': 'integer', 'description': 'Precisão do geohash (3 a 7); padrão conforme o tamanho da área'}
+    ],
+    'responses': {
+        200: {'description': 'Células com quantidade de experiências, reviews, nota média e centro'},
+        400: {'description': 'bbox ou resolution inválidos'}
+    }
+})
+def get_experiences_heatmap():
+    return proxy_request(SERVICES['experience'], '/api/experiences/heatmap', 'GET')
+
+@gateway_bp.route('/experiences/suggest', methods=['GET'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Sugestões de experiências e categorias (autocomplete)',
+    'parameters': [
+        {'name': 'q', 'in': 'query', 'type': 'string', 'required': True, 'description': 'Texto digitado (mínimo 2 caracteres)'},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'description': 'Máximo de sugestões (padrão: 8, máximo: 20)'}
+    ],
+    'responses': {
+        200: {'description': 'Sugestões encontradas'}
+    }
+})
+def suggest_experiences():
+    return proxy_request(SERVICES['experience'], '/api/experiences/suggest', 'GET', timeout=5)
+
+@gateway_bp.route('/experiences/in-bounds', methods=['GET'])
+@swag_from({
+    'tags': ['Experiences'],
+    'summary': 'Buscar experiências na área visível do mapa (com clusters)',
+    'parameters': [
+        {'name': 'min_lat', 'in': 'query', 'type': 'number', 'required': True, 'description': 'Latitude mínima'},
+        {'name': 'min_lng', 'in': 'query', 'type': 'number', 'required': True, 'description': 'Longitude mínima'},
+        {'name': 'max_lat', 'in': 'query', 'type': 'number', 'required': True, 'description': 'Latitude máxima'},
+        {'name': 'max_lng', 'in': 'query', 'type': 'number', 'required': True, 'description': 'Longitude máxima'},
+        {'name': 'zoom', 'in': 'query', 'type': 'integer', 'description': 'Nível de zoom do mapa (padrão: 12)'},
+        {'name': 'category_id', 'in': 'query', 'type': 'string', 'description': 'Filtrar por categoria'}
+    ],
+    'responses': {
+        200: {'description': 'Experiências ou clusters na área'},
+        400: {'description': 'Área inválida'}
+    }
+})
+def get_experiences_in_bounds():
+    return proxy_request(SERVICES['experience'], '/api/experiences/in-bounds', 'GET')
+
 @gateway_bp.route('/experiences', methods=['POST'])
 @swag_from({
     'tags': ['Experiences'],
@@ -385,6 +625,23 @@ def delete_experience(experience_id):
 def upload_experience_photos(experience_id):
     return proxy_request(SERVICES['experience'], f'/api/experiences/{experience_id}/photos', 'POST')
 
+@gateway_bp.route('/photos', methods=['POST'])
+@swag_from({
+    'tags': ['Reviews'],
+    'summary': 'Upload de fotos para reviews',
+    'description': 'Retorna as entradas (URL e variantes) a enviar no campo photos da review',
+    'security': [{'Bearer': []}],
+    'parameters': [
+        {'name': 'photos', 'in': 'formData', 'type': 'file', 'required': True, 'multiple': True}
+    ],
+    'responses': {
+        201: {'description': 'Fotos armazenadas'},
+        400: {'description': 'Arquivo inválido'}
+    }
+})
+def upload_shared_photos():
+    return proxy_request(SERVICES['experience'], '/api/photos', 'POST')
+
 @gateway_bp.route('/experiences/<experience_id>/photos', methods=['DELETE'])
 @swag_from({
     'tags': ['Experiences'],
@@ -693,10 +950,16 @@ def unified_search():
     'summary': 'Upload em lote de experiências',
     'security': [{'Bearer': []}],
     'parameters': [
-        {'name': 'file', 'in': 'formData', 'type': 'file', 'required': True}
+        {'name': 'file', 'in': 'formData', 'type': 'file', 'required': True},
+        {'name': 'created_by', 'in': 'formData', 'type': 'string', 'required': False},
+        {'name': 'mode', 'in': 'formData', 'type': 'string', 'enum': ['insert', 'upsert'], 'required': False, 'description': 'upsert atualiza experiências já existentes em vez de duplicá-las'},
+        {'name': 'match_radius', 'in': 'formData', 'type': 'integer', 'required': False, 'description': 'Raio em metros para casar pelo nome no modo upsert (padrão 50)'},
+        {'name': 'dry_run', 'in': 'formData', 'type': 'boolean', 'required': False, 'description': 'Apenas validar o arquivo, sem gravar nada'},
+        {'name': 'report', 'in': 'formData', 'type': 'string', 'enum': ['ndjson', 'csv'], 'required': False, 'description': 'No dry run, devolver o relatório completo de erros neste formato'}
     ],
     'responses': {
-        201: {'description': 'Experiências criadas com sucesso'},
+        200: {'description': 'Resultado da validação (dry_run=true)'},
+        202: {'description': 'Job de importação criado; acompanhe pelo status_url'},
         400: {'description': 'Arquivo inválido'},
         401: {'description': 'Token inválido'}
     }
@@ -717,13 +980,33 @@ def admin_bulk_upload_experiences():
         headers = {'Authorization': request.headers.get('Authorization', '')}
         
         # Fazer requisição direta ao experience-service
+        # O processamento é assíncrono: o serviço só salva o arquivo e cria o job
+        # (no dry run a validação é síncrona, mas sem escrita no banco)
         response = requests.post(
             f"{SERVICES['experience']}/api/admin/experiences/bulk-upload",
             files=files,
+            data=request.form,
+            params=request.args,
             headers=headers,
-            timeout=120
+            timeout=60,
+            stream=True
         )
         
+        # Relatório de erros do dry run: repassar em streaming
+        if response.status_code == 200 and not response.headers.get('Content-Type', '').startswith('application/json'):
+            def generate():
+                try:
+                    yield from response.iter_content(chunk_size=64 * 1024)
+                finally:
+                    response.close()
+            
+            return Response(
+                stream_with_context(generate()),
+                status=response.status_code,
+                content_type=response.headers.get('Content-Type'),
+                headers={'Content-Disposition': response.headers.get('Content-Disposition', '')}
+            )
+        
         return response.json(), response.status_code
         
     except requests.exceptions.Timeout:
@@ -733,6 +1016,95 @@ def admin_bulk_upload_experiences():
     except Exception as e:
         return jsonify({'error': f'Erro interno do gateway: {str(e)}'}), 500
 
+@gateway_bp.route('/admin/experiences/cache', methods=['GET'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Estatísticas do cache de experiências',
+    'security': [{'Bearer': []}],
+    'responses': {
+        200: {'description': 'Acertos (local e Redis), falhas, invalidações e taxa de acerto do processo que respondeu'}
+    }
+})
+def admin_get_experience_cache_stats():
+    """Estatísticas do cache de experiências"""
+    return proxy_request(SERVICES['experience'], '/api/admin/experiences/cache', 'GET')
+
+@gateway_bp.route('/admin/experiences/bulk-upload/<job_id>', methods=['GET'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Progresso de um job de importação em lote',
+    'security': [{'Bearer': []}],
+    'parameters': [
+        {'name': 'job_id', 'in': 'path', 'type': 'string', 'required': True},
+        {'name': 'errors_limit', 'in': 'query', 'type': 'integer', 'required': False, 'description': 'Quantidade de erros no resumo (padrão 100, máx. 1000)'},
+        {'name': 'include_created_ids', 'in': 'query', 'type': 'boolean', 'required': False, 'description': 'Incluir os ids das experiências criadas'}
+    ],
+    'responses': {
+        200: {'description': 'Status do job (linhas processadas, criadas e erros)'},
+        404: {'description': 'Job não encontrado'}
+    }
+})
+def admin_get_bulk_upload_job(job_id):
+    """Progresso de um job de importação em lote"""
+    return proxy_request(SERVICES['experience'], f'/api/admin/experiences/bulk-upload/{job_id}', 'GET')
+
+@gateway_bp.route('/admin/experiences/bulk-upload/<job_id>/errors', methods=['GET'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Baixar relatório completo de erros de um job de importação',
+    'security': [{'Bearer': []}],
+    'produces': ['application/x-ndjson', 'text/csv'],
+    'parameters': [
+        {'name': 'job_id', 'in': 'path', 'type': 'string', 'required': True},
+        {'name': 'format', 'in': 'query', 'type': 'string', 'enum': ['ndjson', 'csv'], 'required': False}
+    ],
+    'responses': {
+        200: {'description': 'Relatório de erros (uma linha por erro)'},
+        400: {'description': 'Formato inválido'},
+        404: {'description': 'Job não encontrado'}
+    }
+})
+def admin_download_bulk_upload_errors(job_id):
+    """Relatório de erros de um job de importação, repassado em streaming"""
+    return stream_proxy_request(SERVICES['experience'], f'/api/admin/experiences/bulk-upload/{job_id}/errors', timeout=60)
+
+@gateway_bp.route('/admin/experiences/bulk-upload/<job_id>/resume', methods=['POST'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Retomar job de importação que falhou',
+    'security': [{'Bearer': []}],
+    'parameters': [
+        {'name': 'job_id', 'in': 'path', 'type': 'string', 'required': True}
+    ],
+    'responses': {
+        202: {'description': 'Job retomado a partir da última parte commitada'},
+        400: {'description': 'Job já concluído'},
+        404: {'description': 'Job não encontrado'}
+    }
+})
+def admin_resume_bulk_upload_job(job_id):
+    """Retoma um job de importação que falhou"""
+    return proxy_request(SERVICES['experience'], f'/api/admin/experiences/bulk-upload/{job_id}/resume', 'POST')
+
+@gateway_bp.route('/admin/experiences/export', methods=['GET'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Exportar experiências (mesmas colunas do template de upload)',
+    'security': [{'Bearer': []}],
+    'produces': ['text/csv', 'application/x-ndjson', 'application/vnd.apache.parquet'],
+    'parameters': [
+        {'name': 'format', 'in': 'query', 'type': 'string', 'enum': ['csv', 'ndjson', 'parquet'], 'required': False},
+        {'name': 'category_id', 'in': 'query', 'type': 'string', 'required': False}
+    ],
+    'responses': {
+        200: {'description': 'Arquivo exportado (streaming)'},
+        400: {'description': 'Formato inválido'}
+    }
+})
+def admin_export_experiences():
+    """Exportação de experiências, repassada em streaming"""
+    return stream_proxy_request(SERVICES['experience'], '/api/admin/experiences/export', timeout=120)
+
 @gateway_bp.route('/admin/experiences/template', methods=['GET'])
 @swag_from({
     'tags': ['Admin'],
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark da busca de experiências: ILIKE '%termo%' x full-text search (tsvector + GIN)
+
+Cria uma tabela sintética com 500 mil experiências, aplica a mesma configuração de busca
+de database/search_schema.sql e compara os tempos de execução (EXPLAIN ANALYZE) das duas
+estratégias para alguns termos de busca.
+
+Uso:
+    python benchmarks/search_benchmark.py [--rows 500000] [--keep]
+"""
+
+import argparse
+import os
+import psycopg2
+
+# Configurações do banco de dados
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': os.getenv('DB_PORT', '5432'),
+    'database': os.getenv('DB_NAME', 'taiglo_db'),
+    'user': os.getenv('DB_USER', 'taiglo_user'),
+    'password': os.getenv('DB_PASSWORD', 'taiglo_password')
+}
+
+BENCH_TABLE = 'bench_search_experiences'
+SEARCH_TERMS = ['café', 'cafe especial', 'restaurante japonês', 'parque', 'vinhos naturais', 'Pinheiros']
+REPETITIONS = 5
+
+# Mesma configuração de busca de database/search_schema.sql
+SEARCH_CONFIG_SQL = """
+    CREATE EXTENSION IF NOT EXISTS unaccent;
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'portuguese_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END $$;
+"""
+
+ILIKE_SQL = f"""
+    SELECT id, name FROM {BENCH_TABLE}
+    WHERE name ILIKE %(pattern)s OR description ILIKE %(pattern)s OR address ILIKE %(pattern)s
+    ORDER BY created_at DESC
+    LIMIT 20
+"""
+
+FTS_SQL = f"""
+    SELECT id, name, ts_rank(search_vector, q) AS rank
+    FROM {BENCH_TABLE}, websearch_to_tsquery('portuguese_unaccent', %(term)s) AS q
+    WHERE search_vector @@ q
+    ORDER BY rank DESC, id
+    LIMIT 20
+"""
+
+def create_bench_table(conn, rows):
+    """Cria e popula a tabela sintética"""
+    with conn.cursor() as cursor:
+        cursor.execute(SEARCH_CONFIG_SQL)
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(f"""
+            CREATE TABLE {BENCH_TABLE} (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                description TEXT NOT NULL,
+                address TEXT NOT NULL,
+                search_vector TSVECTOR,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute(f"""
+            INSERT INTO {BENCH_TABLE} (name, description, address, created_at)
+            SELECT
+                (ARRAY['Café', 'Restaurante', 'Bar', 'Parque', 'Museu', 'Galeria', 'Empório', 'Padaria'])[1 + (i %% 8)]
+                    || ' ' || (ARRAY['Aurora', 'Jardim', 'Central', 'Japonês', 'da Vila', 'Paulista', 'Secreto'])[1 + (i %% 7)]
+                    || ' ' || i,
+                (ARRAY['Grãos especiais e torra própria', 'Culinária japonesa tradicional',
+                       'Vinhos naturais e petiscos', 'Área verde com trilhas', 'Exposições de arte contemporânea',
+                       'Pães de fermentação natural', 'Música ao vivo toda semana'])[1 + (i %% 7)]
+                    || ' em ambiente ' || (ARRAY['acolhedor', 'descontraído', 'histórico', 'moderno'])[1 + (i %% 4)],
+                'R. ' || (ARRAY['Augusta', 'Oscar Freire', 'dos Pinheiros', 'Harmonia', 'Aspicuelta'])[1 + (i %% 5)]
+                    || ', ' || (i %% 2000) || ' - ' || (ARRAY['Pinheiros', 'Vila Madalena', 'Centro', 'Moema'])[1 + (i %% 4)],
+                NOW() - (i || ' minutes')::interval
+            FROM generate_series(1, %(rows)s) AS i
+        """, {'rows': rows})
+        cursor.execute(f"""
+            UPDATE {BENCH_TABLE} SET search_vector =
+                setweight(to_tsvector('portuguese_unaccent', name), 'A') ||
+                setweight(to_tsvector('portuguese_unaccent', description), 'B') ||
+                setweight(to_tsvector('portuguese_unaccent', address), 'C')
+        """)
+        cursor.execute(f"CREATE INDEX ON {BENCH_TABLE} USING GIN (search_vector)")
+        cursor.execute(f"CREATE INDEX ON {BENCH_TABLE} (created_at DESC)")
+        cursor.execute(f"ANALYZE {BENCH_TABLE}")
+    conn.commit()
+
+def execution_time_ms(conn, sql, params):
+    """Retorna o menor tempo de execução (ms) entre as repetições"""
+    times = []
+    with conn.cursor() as cursor:
+        for _ in range(REPETITIONS):
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params)
+            times.append(cursor.fetchone()[0][0]['Execution Time'])
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ILIKE x full-text search')
+    parser.add_argument('--rows', type=int, default=500000, help='Linhas da tabela sintética')
+    parser.add_argument('--keep', action='store_true', help='Não remover a tabela ao final')
+    args = parser.parse_args()
+
+    print("🔎 Taiglo MVP - Benchmark de Busca de Experiências")
+    print("=" * 50)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        print(f"📦 Criando tabela sintética com {args.rows} linhas...")
+        create_bench_table(conn, args.rows)
+
+        print(f"\n{'termo':<25}{'ILIKE (ms)':>14}{'FTS (ms)':>14}{'ganho':>10}")
+        for term in SEARCH_TERMS:
+            ilike_ms = execution_time_ms(conn, ILIKE_SQL, {'pattern': f'%{term}%'})
+            fts_ms = execution_time_ms(conn, FTS_SQL, {'term': term})
+            print(f"{term:<25}{ilike_ms:>14.2f}{fts_ms:>14.2f}{ilike_ms / max(fts_ms, 0.001):>9.1f}x")
+    finally:
+        if not args.keep:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+            conn.commit()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
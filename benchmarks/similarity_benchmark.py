@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark do índice de experiências parecidas (GET /experiences/<id>/similar)
+
+Gera experiências sintéticas (100 mil por padrão) com nome e descrição montados a
+partir de vocabulários por categoria e mede, sem banco:
+
+    build   -> construção completa (TF-IDF com hashing + listas top-k)
+    query   -> latência de SimilarityIndex.similar (p50/p99)
+    upsert  -> latência de editar uma experiência (linha nova + ajuste das listas)
+    remove  -> latência de remover uma experiência
+    disco   -> tamanho do .npz e tempo de carga
+
+Uso:
+    python benchmarks/similarity_benchmark.py [--count 100000] [--queries 10000] [--updates 200]
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'experience-service'))
+
+from src.utils.similarity import SimilarityIndex
+
+CATEGORY_WORDS = {
+    'gastronomia': ['café', 'torra', 'especial', 'padaria', 'fermentação', 'natural', 'pão', 'brunch', 'vinho',
+                    'bistrô', 'massa', 'artesanal', 'cozinha', 'nordestina', 'feijoada', 'petiscos', 'cerveja'],
+    'arte': ['galeria', 'exposição', 'grafite', 'artista', 'independente', 'ateliê', 'pintura', 'escultura',
+             'fotografia', 'mural', 'curadoria', 'contemporânea', 'gravura', 'instalação'],
+    'musica': ['samba', 'roda', 'chorinho', 'jazz', 'vinil', 'show', 'palco', 'forró', 'instrumental',
+               'discos', 'sarau', 'autoral', 'batucada', 'violão'],
+    'natureza': ['trilha', 'cachoeira', 'mirante', 'parque', 'jardim', 'botânico', 'mata', 'atlântica',
+                 'piquenique', 'lago', 'orquídeas', 'bicicleta', 'pôr', 'sol'],
+    'compras': ['brechó', 'feira', 'antiguidades', 'design', 'autoral', 'livraria', 'sebo', 'cerâmica',
+                'tecidos', 'moda', 'vintage', 'artesanato', 'discos'],
+    'vida_noturna': ['bar', 'drinks', 'coquetelaria', 'balada', 'karaokê', 'rooftop', 'boteco', 'chope',
+                     'madrugada', 'pista', 'DJ', 'cervejaria']
+}
+COMMON_WORDS = ['lugar', 'escondido', 'acolhedor', 'bairro', 'centro', 'vista', 'ambiente', 'pequeno',
+                'tradicional', 'família', 'fim', 'semana', 'amigos', 'histórico', 'charmoso', 'tranquilo']
+
+
+def generate_documents(count, seed=42):
+    """Tuplas (id, nome, descrição, category_id, price_range) no formato do índice"""
+    rng = random.Random(seed)
+    categories = {name: str(uuid.UUID(int=rng.getrandbits(128))) for name in CATEGORY_WORDS}
+    names = list(CATEGORY_WORDS)
+    documents = []
+    for i in range(count):
+        category = names[i % len(names)]
+        words = CATEGORY_WORDS[category]
+        name = ' '.join(rng.sample(words, 2)).title() + f' {i}'
+        description = ' '.join(rng.choices(words, k=12) + rng.choices(COMMON_WORDS, k=8))
+        price = rng.randint(1, 4) if rng.random() > 0.1 else None
+        documents.append((str(uuid.UUID(int=rng.getrandbits(128))), name, description, categories[category], price))
+    return documents
+
+
+def peak_rss_mb():
+    """Pico de memória do processo atual em MB (ru_maxrss é KB no Linux, bytes no macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do índice de experiências parecidas')
+    parser.add_argument('--count', type=int, default=100000, help='Experiências sintéticas')
+    parser.add_argument('--queries', type=int, default=10000, help='Consultas de similares')
+    parser.add_argument('--updates', type=int, default=200, help='Edições e remoções incrementais')
+    args = parser.parse_args()
+
+    print("📊 Taiglo MVP - Benchmark do Índice de Similaridade")
+    print("=" * 50)
+
+    documents = generate_documents(args.count)
+    rng = random.Random(7)
+
+    start = time.perf_counter()
+    index = SimilarityIndex()
+    index.build(documents)
+    build_seconds = time.perf_counter() - start
+    print(f"\n🏗️  Construção: {args.count} experiências em {build_seconds:.1f}s "
+          f"(nnz={index.matrix.nnz}, pico RSS {peak_rss_mb():.0f} MB)")
+
+    ids = [document[0] for document in documents]
+    latencies = []
+    for _ in range(args.queries):
+        experience_id = rng.choice(ids)
+        start = time.perf_counter()
+        index.similar(experience_id, 10)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"🔎 Consulta: p50 {percentile(latencies, 0.5):.3f} ms, p99 {percentile(latencies, 0.99):.3f} ms")
+
+    example = documents[0]
+    print(f"   Parecidas com '{example[1]}':")
+    names = {document[0]: document[1] for document in documents}
+    for similar_id, score in index.similar(example[0], 5):
+        print(f"     {score:.3f}  {names[similar_id]}")
+
+    latencies = []
+    for document in rng.sample(documents, args.updates):
+        edited = (document[0], document[1], document[2] + ' reformado', document[3], document[4])
+        start = time.perf_counter()
+        index.upsert([edited])
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"✏️  Edição: p50 {percentile(latencies, 0.5):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms")
+
+    latencies = []
+    for experience_id in rng.sample(ids, args.updates):
+        start = time.perf_counter()
+        index.remove([experience_id])
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"🗑️  Remoção: p50 {percentile(latencies, 0.5):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'similarity_index.npz')
+        index.save(path)
+        start = time.perf_counter()
+        SimilarityIndex.load(path)
+        print(f"💾 Arquivo: {os.path.getsize(path) / (1024 * 1024):.1f} MB, carga em {time.perf_counter() - start:.2f}s")
+
+    print(f"\n📈 Pico RSS total: {peak_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
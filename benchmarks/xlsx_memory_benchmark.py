@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memória da leitura de planilhas .xlsx do bulk upload
+
+Gera planilhas sintéticas (10 mil, 100 mil e 500 mil linhas, com as colunas do
+template de upload) e mede o pico de memória (RSS) de cada estratégia de leitura,
+cada uma em um processo separado:
+
+    read_excel  -> pd.read_excel(arquivo), leitura antiga (planilha inteira em memória)
+    streaming   -> iter_xlsx_chunks (openpyxl read_only, DataFrames de IMPORT_CHUNK_SIZE linhas)
+
+Uso:
+    python benchmarks/xlsx_memory_benchmark.py [--rows 10000 100000 500000] [--skip-read-excel]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'experience-service'))
+
+from src.utils.spreadsheet import iter_xlsx_chunks
+
+CHUNK_SIZE = 5000  # Mesmo valor de IMPORT_CHUNK_SIZE
+COLUMNS = ['name', 'description', 'address', 'latitude', 'longitude', 'category_id', 'phone',
+           'website_url', 'instagram_handle', 'opening_hours', 'price_range', 'is_hidden_gem']
+
+def create_workbook(path, rows):
+    """Gera a planilha em modo write_only (sem manter as linhas em memória)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(COLUMNS)
+    for i in range(rows):
+        sheet.append([
+            f'Experiência {i}',
+            'Café com grãos especiais e torra própria em ambiente acolhedor',
+            f'R. Augusta, {i % 2000} - Pinheiros, São Paulo',
+            -23.55 + (i % 1000) * 0.0001,
+            -46.63 - (i % 1000) * 0.0001,
+            None,
+            '(11) 99999-0000',
+            'https://example.com',
+            '@taiglo',
+            '{"seg": "08:00-18:00"}',
+            1 + i % 4,
+            'sim' if i % 10 == 0 else 'não'
+        ])
+    workbook.save(path)
+
+def peak_rss_mb():
+    """Pico de memória do processo atual em MB (ru_maxrss é KB no Linux, bytes no macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def read_with_pandas(path, result):
+    import pandas as pd
+    start = time.perf_counter()
+    rows = len(pd.read_excel(path))
+    result.put((rows, time.perf_counter() - start, peak_rss_mb()))
+
+def read_streaming(path, result):
+    start = time.perf_counter()
+    rows = sum(len(chunk) for chunk in iter_xlsx_chunks(path, CHUNK_SIZE))
+    result.put((rows, time.perf_counter() - start, peak_rss_mb()))
+
+def measure(target, path):
+    """Executa a leitura em um processo novo para isolar o pico de memória"""
+    context = multiprocessing.get_context('spawn')
+    result = context.Queue()
+    process = context.Process(target=target, args=(path, result))
+    process.start()
+    rows, seconds, peak = result.get()
+    process.join()
+    return rows, seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória da leitura de .xlsx')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000],
+                        help='Tamanhos de planilha a testar')
+    parser.add_argument('--skip-read-excel', action='store_true',
+                        help='Não medir pd.read_excel (lento nas planilhas grandes)')
+    args = parser.parse_args()
+
+    print("📊 Taiglo MVP - Benchmark de Memória do Upload .xlsx")
+    print("=" * 50)
+
+    strategies = [('streaming', read_streaming)]
+    if not args.skip_read_excel:
+        strategies.insert(0, ('read_excel', read_with_pandas))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"\n{'linhas':>10}{'arquivo (MB)':>14}{'estratégia':>14}{'tempo (s)':>12}{'pico RSS (MB)':>16}")
+        for rows in args.rows:
+            path = os.path.join(tmp_dir, f'bench_{rows}.xlsx')
+            create_workbook(path, rows)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+
+            for name, target in strategies:
+                read_rows, seconds, peak = measure(target, path)
+                assert read_rows == rows, f'{name} leu {read_rows} linhas, esperado {rows}'
+                print(f"{rows:>10}{size_mb:>14.1f}{name:>14}{seconds:>12.1f}{peak:>16.1f}")
+
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
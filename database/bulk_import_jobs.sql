@@ -0,0 +1,34 @@
+-- Migração: jobs de importação em lote processados em segundo plano
+-- Cada parte do arquivo é commitada junto com o progresso do job (chunks_committed),
+-- permitindo retomar a importação da última parte após uma falha.
+
+-- Jobs de importação em lote de experiências (processados em partes)
+CREATE TABLE IF NOT EXISTS bulk_import_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    filename VARCHAR(255) NOT NULL,
+    file_path TEXT NOT NULL,
+    file_format VARCHAR(10) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    created_by UUID REFERENCES users(id),
+    chunk_size INTEGER NOT NULL,
+    chunks_committed INTEGER NOT NULL DEFAULT 0,
+    rows_processed INTEGER NOT NULL DEFAULT 0,
+    created_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Erros de validação por linha dos jobs de importação
+CREATE TABLE IF NOT EXISTS bulk_import_job_errors (
+    id SERIAL PRIMARY KEY,
+    job_id UUID NOT NULL REFERENCES bulk_import_jobs(id) ON DELETE CASCADE,
+    row_number INTEGER NOT NULL,
+    message TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_bulk_import_jobs_status ON bulk_import_jobs(status);
+CREATE INDEX IF NOT EXISTS idx_bulk_import_job_errors_job_row ON bulk_import_job_errors(job_id, row_number);
@@ -0,0 +1,6 @@
+-- Migração: rastrear o job de importação que criou cada experiência
+-- Permite devolver os ids criados por um job sem guardar listas no próprio job
+
+ALTER TABLE experiences ADD COLUMN IF NOT EXISTS import_job_id UUID;
+
+CREATE INDEX IF NOT EXISTS idx_experiences_import_job ON experiences(import_job_id) WHERE import_job_id IS NOT NULL;
@@ -0,0 +1,13 @@
+-- Migração: modo upsert do bulk upload
+-- Linhas são associadas a experiências existentes pelo external_id ou pelo nome
+-- normalizado dentro de um raio (usando o índice GIST de location)
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+ALTER TABLE experiences ADD COLUMN IF NOT EXISTS external_id VARCHAR(255);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_experiences_external_id ON experiences(external_id) WHERE external_id IS NOT NULL;
+
+ALTER TABLE bulk_import_jobs ADD COLUMN IF NOT EXISTS mode VARCHAR(10) NOT NULL DEFAULT 'insert' CHECK (mode IN ('insert', 'upsert'));
+ALTER TABLE bulk_import_jobs ADD COLUMN IF NOT EXISTS match_radius_m INTEGER;
+ALTER TABLE bulk_import_jobs ADD COLUMN IF NOT EXISTS updated_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE bulk_import_jobs ADD COLUMN IF NOT EXISTS unchanged_count INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,88 @@
+-- Migração: mapa de calor das experiências (experience_heatmap_cells)
+-- Agregados por célula geohash em cada precisão, atualizados por delta nas triggers
+-- da projeção de leitura (só as células afetadas pela escrita são tocadas)
+
+-- Agregados do mapa de calor por célula geohash (precisões 3 a 7, de ~156km a ~150m)
+-- Mantidos incrementalmente por triggers na projeção de leitura
+CREATE TABLE IF NOT EXISTS experience_heatmap_cells (
+    precision SMALLINT NOT NULL,
+    geohash VARCHAR(12) NOT NULL,
+    bounds GEOMETRY(POLYGON, 4326) NOT NULL,
+    experience_count INTEGER NOT NULL DEFAULT 0,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    rating_weighted_sum NUMERIC NOT NULL DEFAULT 0, -- soma de average_rating * total_reviews
+    latitude_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    longitude_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (precision, geohash)
+);
+
+CREATE INDEX IF NOT EXISTS idx_experience_heatmap_cells_bounds ON experience_heatmap_cells USING GIST (bounds);
+
+-- Mapa de calor: soma (+1) as linhas novas e subtrai (-1) as antigas em cada precisão
+-- Células que ficam vazias permanecem com experience_count = 0 e são ignoradas na leitura
+CREATE OR REPLACE FUNCTION sync_experience_heatmap()
+RETURNS TRIGGER AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT 1, location, total_reviews, average_rating FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT -1, location, total_reviews, average_rating FROM old_rows';
+    ELSE
+        -- Só as linhas em que algo do mapa de calor mudou
+        changes := '
+            WITH changed AS (
+                SELECT o.location AS old_location, o.total_reviews AS old_reviews, o.average_rating AS old_rating,
+                       n.location AS new_location, n.total_reviews AS new_reviews, n.average_rating AS new_rating
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE NOT ST_Equals(o.location, n.location)
+                   OR o.total_reviews IS DISTINCT FROM n.total_reviews
+                   OR o.average_rating IS DISTINCT FROM n.average_rating
+            )
+            SELECT -1, old_location, old_reviews, old_rating FROM changed
+            UNION ALL
+            SELECT 1, new_location, new_reviews, new_rating FROM changed';
+    END IF;
+
+    EXECUTE format('
+        INSERT INTO experience_heatmap_cells AS cells (
+            precision, geohash, bounds, experience_count, review_count, rating_weighted_sum, latitude_sum, longitude_sum
+        )
+        SELECT p.precision, ST_GeoHash(c.location, p.precision), ST_GeomFromGeoHash(ST_GeoHash(c.location, p.precision)),
+               SUM(c.sign), SUM(c.sign * c.total_reviews), SUM(c.sign * c.average_rating * c.total_reviews),
+               SUM(c.sign * ST_Y(c.location)), SUM(c.sign * ST_X(c.location))
+        FROM (%s) AS c(sign, location, total_reviews, average_rating)
+        CROSS JOIN generate_series(3, 7) AS p(precision)
+        GROUP BY 1, 2
+        ON CONFLICT (precision, geohash) DO UPDATE SET
+            experience_count = cells.experience_count + EXCLUDED.experience_count,
+            review_count = cells.review_count + EXCLUDED.review_count,
+            rating_weighted_sum = cells.rating_weighted_sum + EXCLUDED.rating_weighted_sum,
+            latitude_sum = cells.latitude_sum + EXCLUDED.latitude_sum,
+            longitude_sum = cells.longitude_sum + EXCLUDED.longitude_sum', changes);
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_experience_heatmap_on_insert ON experience_read_model;
+DROP TRIGGER IF EXISTS sync_experience_heatmap_on_update ON experience_read_model;
+DROP TRIGGER IF EXISTS sync_experience_heatmap_on_delete ON experience_read_model;
+CREATE TRIGGER sync_experience_heatmap_on_insert AFTER INSERT ON experience_read_model REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_heatmap();
+CREATE TRIGGER sync_experience_heatmap_on_update AFTER UPDATE ON experience_read_model REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_heatmap();
+CREATE TRIGGER sync_experience_heatmap_on_delete AFTER DELETE ON experience_read_model REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_heatmap();
+
+-- Carga inicial
+TRUNCATE experience_heatmap_cells;
+INSERT INTO experience_heatmap_cells (
+    precision, geohash, bounds, experience_count, review_count, rating_weighted_sum, latitude_sum, longitude_sum
+)
+SELECT p.precision, ST_GeoHash(r.location, p.precision), ST_GeomFromGeoHash(ST_GeoHash(r.location, p.precision)),
+       COUNT(*), SUM(r.total_reviews), SUM(r.average_rating * r.total_reviews),
+       SUM(ST_Y(r.location)), SUM(ST_X(r.location))
+FROM experience_read_model r
+CROSS JOIN generate_series(3, 7) AS p(precision)
+GROUP BY 1, 2;
+
+ANALYZE experience_heatmap_cells;
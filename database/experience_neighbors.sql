@@ -0,0 +1,116 @@
+-- Migração: vizinhos pré-calculados das experiências (experience_neighbors)
+-- A página de detalhes lê a lista pronta pela chave primária em vez de uma busca espacial por visita
+
+-- Experiências mais próximas de cada experiência ("perto daqui" na página de detalhes)
+-- scope 'all': qualquer categoria; 'category': mesma categoria. Mantida por triggers na projeção de leitura
+CREATE TABLE IF NOT EXISTS experience_neighbors (
+    experience_id UUID NOT NULL REFERENCES experience_read_model(id) ON DELETE CASCADE,
+    scope VARCHAR(10) NOT NULL CHECK (scope IN ('all', 'category')),
+    rank SMALLINT NOT NULL,
+    neighbor_id UUID NOT NULL, -- Sem FK: a remoção do vizinho recalcula a lista na trigger
+    distance_m DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (experience_id, scope, rank)
+);
+
+CREATE INDEX IF NOT EXISTS idx_experience_neighbors_neighbor ON experience_neighbors(neighbor_id);
+
+-- Vizinhos: recalcula as listas (10 mais próximas até 5km, em cada scope) das experiências informadas
+CREATE OR REPLACE FUNCTION refresh_experience_neighbors(experience_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM experience_neighbors WHERE experience_id = ANY(experience_ids);
+
+    INSERT INTO experience_neighbors (experience_id, scope, rank, neighbor_id, distance_m)
+    SELECT e.id, s.scope, n.rank, n.id, n.distance_m
+    FROM experience_read_model e
+    CROSS JOIN (VALUES ('all'), ('category')) AS s(scope)
+    CROSS JOIN LATERAL (
+        SELECT k.id, k.distance_m, ROW_NUMBER() OVER (ORDER BY k.distance_m, k.id) AS rank
+        FROM (
+            -- O filtro em graus (com folga pela latitude) usa o índice GIST e limita as candidatas
+            -- a ~5km; a ordem é pela distância em metros (<-> em graus encurta a longitude e
+            -- trocaria os mais próximos)
+            SELECT r.id, ST_Distance(Geography(r.location), Geography(e.location)) AS distance_m
+            FROM experience_read_model r
+            WHERE r.id <> e.id
+              AND ST_DWithin(r.location, e.location,
+                             5000 / (111320 * GREATEST(COS(RADIANS(LEAST(ABS(e.latitude), 89))), 0.01)))
+              AND ST_DWithin(Geography(r.location), Geography(e.location), 5000)
+              AND (s.scope = 'all' OR r.category_id = e.category_id)
+            ORDER BY distance_m, r.id
+            LIMIT 10
+        ) AS k
+    ) AS n
+    WHERE e.id = ANY(experience_ids);
+END;
+$$ language 'plpgsql';
+
+-- Vizinhos: ao criar, mover, trocar de categoria ou remover, recalcula a própria lista e só as
+-- listas que mudam (as que continham a experiência e as que passam a incluí-la)
+CREATE OR REPLACE FUNCTION sync_experience_neighbors()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed UUID[] := '{}'; -- Posição ou categoria nova
+    removed UUID[] := '{}'; -- Saem das listas em que estavam
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := ARRAY(SELECT id FROM new_rows);
+    ELSIF TG_OP = 'UPDATE' THEN
+        changed := ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE NOT ST_Equals(n.location, o.location) OR n.category_id IS DISTINCT FROM o.category_id
+        );
+        removed := changed;
+    ELSE
+        removed := ARRAY(SELECT id FROM old_rows);
+    END IF;
+
+    IF cardinality(changed) = 0 AND cardinality(removed) = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM refresh_experience_neighbors(ARRAY(
+        SELECT unnest(changed)
+        UNION
+        SELECT experience_id FROM experience_neighbors WHERE neighbor_id = ANY(removed)
+        UNION
+        -- Listas incompletas ou cujo último vizinho está mais longe que a nova posição
+        SELECT y.id
+        FROM experience_read_model x
+        JOIN experience_read_model y
+          ON y.id <> x.id
+         AND ST_DWithin(y.location, x.location,
+                        5000 / (111320 * GREATEST(COS(RADIANS(LEAST(ABS(x.latitude), 89))), 0.01)))
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*) FILTER (WHERE nb.scope = 'all') AS all_count,
+                   MAX(nb.distance_m) FILTER (WHERE nb.scope = 'all') AS all_radius,
+                   COUNT(*) FILTER (WHERE nb.scope = 'category') AS category_count,
+                   MAX(nb.distance_m) FILTER (WHERE nb.scope = 'category') AS category_radius
+            FROM experience_neighbors nb
+            WHERE nb.experience_id = y.id
+        ) AS existing
+        CROSS JOIN LATERAL (
+            SELECT ST_Distance(Geography(y.location), Geography(x.location)) AS distance_m
+        ) AS d
+        WHERE x.id = ANY(changed)
+          AND d.distance_m <= 5000
+          AND (existing.all_count < 10 OR d.distance_m < existing.all_radius
+               OR (y.category_id = x.category_id
+                   AND (existing.category_count < 10 OR d.distance_m < existing.category_radius)))
+    ));
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_experience_neighbors_on_insert ON experience_read_model;
+DROP TRIGGER IF EXISTS sync_experience_neighbors_on_update ON experience_read_model;
+DROP TRIGGER IF EXISTS sync_experience_neighbors_on_delete ON experience_read_model;
+CREATE TRIGGER sync_experience_neighbors_on_insert AFTER INSERT ON experience_read_model REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_neighbors();
+CREATE TRIGGER sync_experience_neighbors_on_update AFTER UPDATE ON experience_read_model REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_neighbors();
+CREATE TRIGGER sync_experience_neighbors_on_delete AFTER DELETE ON experience_read_model REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_neighbors();
+
+-- Carga inicial
+SELECT refresh_experience_neighbors(ARRAY(SELECT id FROM experience_read_model));
+
+ANALYZE experience_neighbors;
@@ -0,0 +1,119 @@
+-- Migração: projeção de leitura das experiências (experience_read_model)
+-- Tabela desnormalizada mantida por triggers de instrução na mesma transação da escrita:
+-- leituras nunca esperam um REFRESH e não há janela de dados desatualizados
+
+-- Projeção de leitura das experiências (listagem, proximidade e busca)
+-- Categoria, coordenadas e miniaturas já resolvidas; mantida por triggers na mesma transação
+CREATE TABLE IF NOT EXISTS experience_read_model (
+    id UUID PRIMARY KEY REFERENCES experiences(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    description TEXT NOT NULL,
+    address TEXT NOT NULL,
+    category_id UUID,
+    category_name VARCHAR(100),
+    category_color VARCHAR(7),
+    category_icon_url TEXT,
+    latitude DOUBLE PRECISION NOT NULL,
+    longitude DOUBLE PRECISION NOT NULL,
+    location GEOMETRY(POINT, 4326) NOT NULL,
+    phone VARCHAR(20),
+    website_url TEXT,
+    instagram_handle VARCHAR(100),
+    opening_hours JSONB,
+    price_range INTEGER,
+    average_rating DECIMAL(3,2) NOT NULL DEFAULT 0.00,
+    total_reviews INTEGER NOT NULL DEFAULT 0,
+    is_hidden_gem BOOLEAN,
+    is_verified BOOLEAN,
+    authenticity_score DECIMAL(3,2) NOT NULL DEFAULT 0.00,
+    photos JSONB NOT NULL DEFAULT '[]',
+    thumbnails JSONB NOT NULL DEFAULT '[]', -- URL da miniatura de cada foto
+    search_vector TSVECTOR,
+    created_by UUID,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_experience_read_model_location ON experience_read_model USING GIST (location);
+CREATE INDEX IF NOT EXISTS idx_experience_read_model_category ON experience_read_model(category_id);
+CREATE INDEX IF NOT EXISTS idx_experience_read_model_search ON experience_read_model USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_experience_read_model_created_at_id ON experience_read_model(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_experience_read_model_rating_id ON experience_read_model(average_rating, id);
+CREATE INDEX IF NOT EXISTS idx_experience_read_model_name_id ON experience_read_model(name, id);
+
+-- Listagem e busca passam a ler a projeção: os índices equivalentes na tabela base só
+-- custariam manutenção a cada escrita (search_vector continua lá, é a origem da cópia)
+DROP INDEX IF EXISTS idx_experiences_search;
+DROP INDEX IF EXISTS idx_experiences_rating_id;
+DROP INDEX IF EXISTS idx_experiences_name_id;
+
+-- Projeção de leitura: recalcula as linhas das experiências informadas
+CREATE OR REPLACE FUNCTION refresh_experience_read_model(experience_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO experience_read_model (
+        id, name, description, address, category_id, category_name, category_color, category_icon_url,
+        latitude, longitude, location, phone, website_url, instagram_handle, opening_hours, price_range,
+        average_rating, total_reviews, is_hidden_gem, is_verified, authenticity_score, photos, thumbnails,
+        search_vector, created_by, created_at, updated_at
+    )
+    SELECT e.id, e.name, e.description, e.address, e.category_id, c.name, c.color_hex, c.icon_url,
+           ST_Y(e.location), ST_X(e.location), e.location, e.phone, e.website_url, e.instagram_handle,
+           e.opening_hours, e.price_range, COALESCE(e.average_rating, 0), COALESCE(e.total_reviews, 0),
+           e.is_hidden_gem, e.is_verified, COALESCE(e.authenticity_score, 0), COALESCE(e.photos, '[]'),
+           COALESCE((
+               SELECT jsonb_agg(CASE WHEN jsonb_typeof(p) = 'object'
+                                     THEN p #>> '{variants,thumbnail,webp}'
+                                     ELSE p #>> '{}' END)
+               FROM jsonb_array_elements(COALESCE(e.photos, '[]')) AS p
+           ), '[]'),
+           e.search_vector, e.created_by, e.created_at, e.updated_at
+    FROM experiences e
+    LEFT JOIN experience_categories c ON c.id = e.category_id
+    WHERE e.id = ANY(experience_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name, description = EXCLUDED.description, address = EXCLUDED.address,
+        category_id = EXCLUDED.category_id, category_name = EXCLUDED.category_name,
+        category_color = EXCLUDED.category_color, category_icon_url = EXCLUDED.category_icon_url,
+        latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude, location = EXCLUDED.location,
+        phone = EXCLUDED.phone, website_url = EXCLUDED.website_url, instagram_handle = EXCLUDED.instagram_handle,
+        opening_hours = EXCLUDED.opening_hours, price_range = EXCLUDED.price_range,
+        average_rating = EXCLUDED.average_rating, total_reviews = EXCLUDED.total_reviews,
+        is_hidden_gem = EXCLUDED.is_hidden_gem, is_verified = EXCLUDED.is_verified,
+        authenticity_score = EXCLUDED.authenticity_score, photos = EXCLUDED.photos,
+        thumbnails = EXCLUDED.thumbnails, search_vector = EXCLUDED.search_vector,
+        created_by = EXCLUDED.created_by, created_at = EXCLUDED.created_at, updated_at = EXCLUDED.updated_at;
+END;
+$$ language 'plpgsql';
+
+-- Um refresh por instrução (não por linha): o bulk import atualiza milhares de linhas de uma vez
+CREATE OR REPLACE FUNCTION sync_experience_read_model()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_experience_read_model(ARRAY(SELECT id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION sync_experience_read_model_category()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE experience_read_model r
+    SET category_name = c.name, category_color = c.color_hex, category_icon_url = c.icon_url
+    FROM changed_rows c
+    WHERE r.category_id = c.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS sync_experience_read_model_on_insert ON experiences;
+DROP TRIGGER IF EXISTS sync_experience_read_model_on_update ON experiences;
+DROP TRIGGER IF EXISTS sync_experience_read_model_on_category_update ON experience_categories;
+CREATE TRIGGER sync_experience_read_model_on_insert AFTER INSERT ON experiences REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_read_model();
+CREATE TRIGGER sync_experience_read_model_on_update AFTER UPDATE ON experiences REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_read_model();
+CREATE TRIGGER sync_experience_read_model_on_category_update AFTER UPDATE ON experience_categories REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_read_model_category();
+
+-- Carga inicial
+SELECT refresh_experience_read_model(ARRAY(SELECT id FROM experiences));
+
+ANALYZE experience_read_model;
@@ -0,0 +1,169 @@
+-- Migração: horário de funcionamento normalizado (filtro open_at)
+-- opening_minutes é gerada a partir de opening_hours em toda escrita (inclusive no bulk upload)
+-- e copiada para a projeção de leitura, onde o índice GiST atende opening_minutes @> minuto
+
+-- Horário de funcionamento normalizado: minutos da semana em que o lugar está aberto
+-- (segunda 00:00 = 0, domingo 23:59 = 10079). Aceita o formato livre de opening_hours:
+--   {"seg-sex": "07:00-19:00", "sab": "08:00-12:00, 14:00-18:00", "dom": "fechado"}
+--   {"qua-seg": "10h-18h"}, {"seg-sab": "17:00-02:00"} (vira a madrugada), {"todos os dias": "24h"}
+-- Retorna NULL quando nada é reconhecido (horário desconhecido)
+CREATE OR REPLACE FUNCTION opening_hours_minutes(hours JSONB)
+RETURNS INT4MULTIRANGE AS $$
+DECLARE
+    day_names CONSTANT TEXT[] := ARRAY['seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom'];
+    english_day_names CONSTANT TEXT[] := ARRAY['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'];
+    week_minutes CONSTANT INTEGER := 7 * 1440;
+    entry RECORD;
+    day_spec TEXT;
+    bounds TEXT[];
+    days INTEGER[];
+    first_day INTEGER;
+    last_day INTEGER;
+    day INTEGER;
+    spec TEXT;
+    times TEXT[];
+    intervals INTEGER[][];
+    open_minute INTEGER;
+    close_minute INTEGER;
+    range_start INTEGER;
+    range_end INTEGER;
+    recognized BOOLEAN := FALSE;
+    result INT4MULTIRANGE := '{}';
+BEGIN
+    IF hours IS NULL OR jsonb_typeof(hours) <> 'object' THEN
+        RETURN NULL;
+    END IF;
+
+    FOR entry IN SELECT key, value FROM jsonb_each_text(hours) LOOP
+        -- Dias: "seg", "seg-sex", "qua-seg" (passa pelo domingo), "seg, qua", "todos os dias"
+        days := '{}';
+        FOREACH day_spec IN ARRAY regexp_split_to_array(
+            translate(lower(btrim(entry.key)), 'áàâãéêíóôõúç', 'aaaaeeiooouc'), '\s*[,;/]\s*'
+        ) LOOP
+            IF day_spec ~ '^(todos|diario|todo dia|everyday|daily)' THEN
+                days := ARRAY[0, 1, 2, 3, 4, 5, 6];
+                CONTINUE;
+            END IF;
+
+            bounds := regexp_split_to_array(day_spec, '\s*-\s*|\s+a\s+|\s+ate\s+');
+            first_day := COALESCE(array_position(day_names, left(bounds[1], 3)),
+                                  array_position(english_day_names, left(bounds[1], 3))) - 1;
+            last_day := COALESCE(array_position(day_names, left(bounds[array_length(bounds, 1)], 3)),
+                                 array_position(english_day_names, left(bounds[array_length(bounds, 1)], 3))) - 1;
+            IF first_day IS NULL OR last_day IS NULL THEN
+                CONTINUE;
+            END IF;
+
+            day := first_day;
+            LOOP
+                days := days || day;
+                EXIT WHEN day = last_day;
+                day := (day + 1) % 7;
+            END LOOP;
+        END LOOP;
+
+        IF array_length(days, 1) IS NULL THEN
+            CONTINUE;
+        END IF;
+
+        -- Horários: "07:00-19:00", "7h às 19h", "08:00-12:00, 14:00-18:00", "24h", "fechado"
+        spec := lower(btrim(entry.value));
+        intervals := '{}';
+        FOR times IN SELECT regexp_matches(
+            spec, '(\d{1,2})(?:[:h.](\d{2}))?\s*h?\s*(?:-|–|às|as|a|até|ate)\s*(\d{1,2})(?:[:h.](\d{2}))?', 'g'
+        ) LOOP
+            open_minute := times[1]::INTEGER * 60 + COALESCE(times[2], '0')::INTEGER;
+            close_minute := times[3]::INTEGER * 60 + COALESCE(times[4], '0')::INTEGER;
+            CONTINUE WHEN open_minute > 1440 OR close_minute > 1440;
+            -- Fecha depois da meia-noite (ou 00:00-00:00, aberto o dia todo)
+            IF close_minute <= open_minute THEN
+                close_minute := close_minute + 1440;
+            END IF;
+            intervals := intervals || ARRAY[[open_minute, close_minute]];
+        END LOOP;
+
+        IF array_length(intervals, 1) IS NULL THEN
+            IF spec ~ '24\s*h|24 horas' THEN
+                intervals := ARRAY[[0, 1440]];
+            ELSIF spec ~ '^(fechado|closed)' THEN
+                recognized := TRUE;
+                CONTINUE;
+            ELSE
+                CONTINUE;
+            END IF;
+        END IF;
+
+        recognized := TRUE;
+        FOREACH day IN ARRAY days LOOP
+            FOR i IN 1..array_length(intervals, 1) LOOP
+                range_start := day * 1440 + intervals[i][1];
+                range_end := day * 1440 + intervals[i][2];
+                IF range_end <= week_minutes THEN
+                    result := result + int4multirange(int4range(range_start, range_end));
+                ELSE
+                    -- Domingo à noite até segunda de madrugada: volta ao início da semana
+                    result := result + int4multirange(int4range(range_start, week_minutes), int4range(0, range_end - week_minutes));
+                END IF;
+            END LOOP;
+        END LOOP;
+    END LOOP;
+
+    IF NOT recognized THEN
+        RETURN NULL;
+    END IF;
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+ALTER TABLE experiences ADD COLUMN IF NOT EXISTS opening_minutes INT4MULTIRANGE
+    GENERATED ALWAYS AS (opening_hours_minutes(opening_hours)) STORED;
+ALTER TABLE experience_read_model ADD COLUMN IF NOT EXISTS opening_minutes INT4MULTIRANGE;
+
+-- Projeção de leitura: recalcula as linhas das experiências informadas
+CREATE OR REPLACE FUNCTION refresh_experience_read_model(experience_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO experience_read_model (
+        id, name, description, address, category_id, category_name, category_color, category_icon_url,
+        latitude, longitude, location, phone, website_url, instagram_handle, opening_hours, opening_minutes, price_range,
+        average_rating, total_reviews, is_hidden_gem, is_verified, authenticity_score, photos, thumbnails,
+        search_vector, created_by, created_at, updated_at
+    )
+    SELECT e.id, e.name, e.description, e.address, e.category_id, c.name, c.color_hex, c.icon_url,
+           ST_Y(e.location), ST_X(e.location), e.location, e.phone, e.website_url, e.instagram_handle,
+           e.opening_hours, e.opening_minutes, e.price_range, COALESCE(e.average_rating, 0), COALESCE(e.total_reviews, 0),
+           e.is_hidden_gem, e.is_verified, COALESCE(e.authenticity_score, 0), COALESCE(e.photos, '[]'),
+           COALESCE((
+               SELECT jsonb_agg(CASE WHEN jsonb_typeof(p) = 'object'
+                                     THEN p #>> '{variants,thumbnail,webp}'
+                                     ELSE p #>> '{}' END)
+               FROM jsonb_array_elements(COALESCE(e.photos, '[]')) AS p
+           ), '[]'),
+           e.search_vector, e.created_by, e.created_at, e.updated_at
+    FROM experiences e
+    LEFT JOIN experience_categories c ON c.id = e.category_id
+    WHERE e.id = ANY(experience_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name, description = EXCLUDED.description, address = EXCLUDED.address,
+        category_id = EXCLUDED.category_id, category_name = EXCLUDED.category_name,
+        category_color = EXCLUDED.category_color, category_icon_url = EXCLUDED.category_icon_url,
+        latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude, location = EXCLUDED.location,
+        phone = EXCLUDED.phone, website_url = EXCLUDED.website_url, instagram_handle = EXCLUDED.instagram_handle,
+        opening_hours = EXCLUDED.opening_hours, opening_minutes = EXCLUDED.opening_minutes,
+        price_range = EXCLUDED.price_range,
+        average_rating = EXCLUDED.average_rating, total_reviews = EXCLUDED.total_reviews,
+        is_hidden_gem = EXCLUDED.is_hidden_gem, is_verified = EXCLUDED.is_verified,
+        authenticity_score = EXCLUDED.authenticity_score, photos = EXCLUDED.photos,
+        thumbnails = EXCLUDED.thumbnails, search_vector = EXCLUDED.search_vector,
+        created_by = EXCLUDED.created_by, created_at = EXCLUDED.created_at, updated_at = EXCLUDED.updated_at;
+END;
+$$ language 'plpgsql';
+
+UPDATE experience_read_model r
+SET opening_minutes = e.opening_minutes
+FROM experiences e
+WHERE e.id = r.id;
+
+CREATE INDEX IF NOT EXISTS idx_experience_read_model_opening_minutes ON experience_read_model USING GIST (opening_minutes);
+
+ANALYZE experience_read_model;
@@ -0,0 +1,14 @@
+-- Índices compostos para paginação por cursor (keyset)
+-- Cada ordenação suportada usa (coluna, id) para que "WHERE (coluna, id) < (...) ORDER BY coluna, id"
+-- seja atendido por um único range scan no índice, em qualquer profundidade
+
+-- Experiências: a listagem lê experience_read_model (índices em experience_read_model.sql);
+-- na tabela base só a ordem da exportação (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_experiences_created_at_id ON experiences(created_at, id);
+
+-- Reviews: sort_by = created_at | rating | helpful_votes (com e sem filtro por experiência)
+CREATE INDEX IF NOT EXISTS idx_reviews_created_at_id ON reviews(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_rating_id ON reviews(rating, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_helpful_votes_id ON reviews(helpful_votes, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_experience_created_at_id ON reviews(experience_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_experience_helpful_votes_id ON reviews(experience_id, helpful_votes, id);
@@ -0,0 +1,41 @@
+-- Migração: armazenamento de fotos endereçado pelo conteúdo
+-- Arquivos ficam em static/photos/<hash[:2]>/<hash>/ e são compartilhados;
+-- photo_refs registra quem usa cada foto e o trigger mantém photo_blobs.ref_count
+
+-- Fotos armazenadas pelo hash SHA-256 do conteúdo (compartilhadas entre experiências e reviews)
+CREATE TABLE IF NOT EXISTS photo_blobs (
+    hash CHAR(64) PRIMARY KEY,
+    variants JSONB NOT NULL, -- Variantes geradas: {thumbnail|card|full: {width, height, files}}
+    size_bytes INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0, -- Mantido por trigger em photo_refs
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Referências às fotos: quem usa cada blob
+CREATE TABLE IF NOT EXISTS photo_refs (
+    hash CHAR(64) NOT NULL REFERENCES photo_blobs(hash) ON DELETE CASCADE,
+    owner_type VARCHAR(20) NOT NULL CHECK (owner_type IN ('experience', 'review')),
+    owner_id UUID NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (hash, owner_type, owner_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_photo_refs_owner ON photo_refs(owner_type, owner_id);
+CREATE INDEX IF NOT EXISTS idx_photo_blobs_unreferenced ON photo_blobs(last_used_at) WHERE ref_count = 0;
+
+-- Contador de referências das fotos
+CREATE OR REPLACE FUNCTION update_photo_blob_ref_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE photo_blobs SET ref_count = ref_count + 1, last_used_at = CURRENT_TIMESTAMP WHERE hash = NEW.hash;
+        RETURN NEW;
+    END IF;
+    UPDATE photo_blobs SET ref_count = ref_count - 1, last_used_at = CURRENT_TIMESTAMP WHERE hash = OLD.hash;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_photo_blob_ref_count ON photo_refs;
+CREATE TRIGGER update_photo_blob_ref_count AFTER INSERT OR DELETE ON photo_refs FOR EACH ROW EXECUTE FUNCTION update_photo_blob_ref_count();
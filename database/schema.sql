@@ -4,6 +4,126 @@
 -- Habilitar extensões necessárias
 CREATE EXTENSION IF NOT EXISTS postgis;
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Configuração de busca textual: stemming em português + remoção de acentos
+CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese);
+ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent
+    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+
+-- Horário de funcionamento normalizado: minutos da semana em que o lugar está aberto
+-- (segunda 00:00 = 0, domingo 23:59 = 10079). Aceita o formato livre de opening_hours:
+--   {"seg-sex": "07:00-19:00", "sab": "08:00-12:00, 14:00-18:00", "dom": "fechado"}
+--   {"qua-seg": "10h-18h"}, {"seg-sab": "17:00-02:00"} (vira a madrugada), {"todos os dias": "24h"}
+-- Retorna NULL quando nada é reconhecido (horário desconhecido)
+CREATE OR REPLACE FUNCTION opening_hours_minutes(hours JSONB)
+RETURNS INT4MULTIRANGE AS $$
+DECLARE
+    day_names CONSTANT TEXT[] := ARRAY['seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom'];
+    english_day_names CONSTANT TEXT[] := ARRAY['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'];
+    week_minutes CONSTANT INTEGER := 7 * 1440;
+    entry RECORD;
+    day_spec TEXT;
+    bounds TEXT[];
+    days INTEGER[];
+    first_day INTEGER;
+    last_day INTEGER;
+    day INTEGER;
+    spec TEXT;
+    times TEXT[];
+    intervals INTEGER[][];
+    open_minute INTEGER;
+    close_minute INTEGER;
+    range_start INTEGER;
+    range_end INTEGER;
+    recognized BOOLEAN := FALSE;
+    result INT4MULTIRANGE := '{}';
+BEGIN
+    IF hours IS NULL OR jsonb_typeof(hours) <> 'object' THEN
+        RETURN NULL;
+    END IF;
+
+    FOR entry IN SELECT key, value FROM jsonb_each_text(hours) LOOP
+        -- Dias: "seg", "seg-sex", "qua-seg" (passa pelo domingo), "seg, qua", "todos os dias"
+        days := '{}';
+        FOREACH day_spec IN ARRAY regexp_split_to_array(
+            translate(lower(btrim(entry.key)), 'áàâãéêíóôõúç', 'aaaaeeiooouc'), '\s*[,;/]\s*'
+        ) LOOP
+            IF day_spec ~ '^(todos|diario|todo dia|everyday|daily)' THEN
+                days := ARRAY[0, 1, 2, 3, 4, 5, 6];
+                CONTINUE;
+            END IF;
+
+            bounds := regexp_split_to_array(day_spec, '\s*-\s*|\s+a\s+|\s+ate\s+');
+            first_day := COALESCE(array_position(day_names, left(bounds[1], 3)),
+                                  array_position(english_day_names, left(bounds[1], 3))) - 1;
+            last_day := COALESCE(array_position(day_names, left(bounds[array_length(bounds, 1)], 3)),
+                                 array_position(english_day_names, left(bounds[array_length(bounds, 1)], 3))) - 1;
+            IF first_day IS NULL OR last_day IS NULL THEN
+                CONTINUE;
+            END IF;
+
+            day := first_day;
+            LOOP
+                days := days || day;
+                EXIT WHEN day = last_day;
+                day := (day + 1) % 7;
+            END LOOP;
+        END LOOP;
+
+        IF array_length(days, 1) IS NULL THEN
+            CONTINUE;
+        END IF;
+
+        -- Horários: "07:00-19:00", "7h às 19h", "08:00-12:00, 14:00-18:00", "24h", "fechado"
+        spec := lower(btrim(entry.value));
+        intervals := '{}';
+        FOR times IN SELECT regexp_matches(
+            spec, '(\d{1,2})(?:[:h.](\d{2}))?\s*h?\s*(?:-|–|às|as|a|até|ate)\s*(\d{1,2})(?:[:h.](\d{2}))?', 'g'
+        ) LOOP
+            open_minute := times[1]::INTEGER * 60 + COALESCE(times[2], '0')::INTEGER;
+            close_minute := times[3]::INTEGER * 60 + COALESCE(times[4], '0')::INTEGER;
+            CONTINUE WHEN open_minute > 1440 OR close_minute > 1440;
+            -- Fecha depois da meia-noite (ou 00:00-00:00, aberto o dia todo)
+            IF close_minute <= open_minute THEN
+                close_minute := close_minute + 1440;
+            END IF;
+            intervals := intervals || ARRAY[[open_minute, close_minute]];
+        END LOOP;
+
+        IF array_length(intervals, 1) IS NULL THEN
+            IF spec ~ '24\s*h|24 horas' THEN
+                intervals := ARRAY[[0, 1440]];
+            ELSIF spec ~ '^(fechado|closed)' THEN
+                recognized := TRUE;
+                CONTINUE;
+            ELSE
+                CONTINUE;
+            END IF;
+        END IF;
+
+        recognized := TRUE;
+        FOREACH day IN ARRAY days LOOP
+            FOR i IN 1..array_length(intervals, 1) LOOP
+                range_start := day * 1440 + intervals[i][1];
+                range_end := day * 1440 + intervals[i][2];
+                IF range_end <= week_minutes THEN
+                    result := result + int4multirange(int4range(range_start, range_end));
+                ELSE
+                    -- Domingo à noite até segunda de madrugada: volta ao início da semana
+                    result := result + int4multirange(int4range(range_start, week_minutes), int4range(0, range_end - week_minutes));
+                END IF;
+            END LOOP;
+        END LOOP;
+    END LOOP;
+
+    IF NOT recognized THEN
+        RETURN NULL;
+    END IF;
+    RETURN result;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
 
 -- Tabela de usuários
 CREATE TABLE users (
@@ -45,13 +165,17 @@ CREATE TABLE experiences (
     website_url TEXT,
     instagram_handle VARCHAR(100),
     opening_hours JSONB DEFAULT '{}',
+    opening_minutes INT4MULTIRANGE GENERATED ALWAYS AS (opening_hours_minutes(opening_hours)) STORED, -- Minutos da semana em que está aberta
     price_range INTEGER CHECK (price_range >= 1 AND price_range <= 4), -- 1-4 ($-$$$$)
     average_rating DECIMAL(3,2) DEFAULT 0.00,
     total_reviews INTEGER DEFAULT 0,
     is_hidden_gem BOOLEAN DEFAULT FALSE,
     is_verified BOOLEAN DEFAULT FALSE,
     authenticity_score DECIMAL(3,2) DEFAULT 0.00,
-    photos JSONB DEFAULT '[]', -- Array de URLs das fotos da experiência
+    photos JSONB DEFAULT '[]', -- Fotos da experiência: URL principal + variantes (thumbnail, card, full) em WebP/JPEG
+    search_vector TSVECTOR, -- Documento de busca textual (mantido por trigger, copiado para experience_read_model)
+    external_id VARCHAR(255), -- Chave do parceiro/feed de origem (upsert do bulk upload)
+    import_job_id UUID, -- Job de importação em lote que criou a experiência
     created_by UUID REFERENCES users(id),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -103,15 +227,173 @@ CREATE TABLE user_favorites (
     UNIQUE(user_id, experience_id)
 );
 
+-- Jobs de importação em lote de experiências (processados em partes)
+CREATE TABLE bulk_import_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    filename VARCHAR(255) NOT NULL,
+    file_path TEXT NOT NULL,
+    file_format VARCHAR(10) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'completed', 'failed')),
+    created_by UUID REFERENCES users(id),
+    mode VARCHAR(10) NOT NULL DEFAULT 'insert' CHECK (mode IN ('insert', 'upsert')),
+    match_radius_m INTEGER,
+    chunk_size INTEGER NOT NULL,
+    chunks_committed INTEGER NOT NULL DEFAULT 0,
+    rows_processed INTEGER NOT NULL DEFAULT 0,
+    created_count INTEGER NOT NULL DEFAULT 0,
+    updated_count INTEGER NOT NULL DEFAULT 0,
+    unchanged_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    error_message TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Erros de validação por linha dos jobs de importação
+CREATE TABLE bulk_import_job_errors (
+    id SERIAL PRIMARY KEY,
+    job_id UUID NOT NULL REFERENCES bulk_import_jobs(id) ON DELETE CASCADE,
+    row_number INTEGER NOT NULL,
+    message TEXT NOT NULL
+);
+
+-- Fotos armazenadas pelo hash SHA-256 do conteúdo (compartilhadas entre experiências e reviews)
+CREATE TABLE photo_blobs (
+    hash CHAR(64) PRIMARY KEY,
+    variants JSONB NOT NULL, -- Variantes geradas: {thumbnail|card|full: {width, height, files}}
+    size_bytes INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0, -- Mantido por trigger em photo_refs
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Referências às fotos: quem usa cada blob
+CREATE TABLE photo_refs (
+    hash CHAR(64) NOT NULL REFERENCES photo_blobs(hash) ON DELETE CASCADE,
+    owner_type VARCHAR(20) NOT NULL CHECK (owner_type IN ('experience', 'review')),
+    owner_id UUID NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (hash, owner_type, owner_id)
+);
+
+-- Projeção de leitura das experiências (listagem, proximidade e busca)
+-- Categoria, coordenadas e miniaturas já resolvidas; mantida por triggers na mesma transação
+CREATE TABLE experience_read_model (
+    id UUID PRIMARY KEY REFERENCES experiences(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    description TEXT NOT NULL,
+    address TEXT NOT NULL,
+    category_id UUID,
+    category_name VARCHAR(100),
+    category_color VARCHAR(7),
+    category_icon_url TEXT,
+    latitude DOUBLE PRECISION NOT NULL,
+    longitude DOUBLE PRECISION NOT NULL,
+    location GEOMETRY(POINT, 4326) NOT NULL,
+    phone VARCHAR(20),
+    website_url TEXT,
+    instagram_handle VARCHAR(100),
+    opening_hours JSONB,
+    opening_minutes INT4MULTIRANGE,
+    price_range INTEGER,
+    average_rating DECIMAL(3,2) NOT NULL DEFAULT 0.00,
+    total_reviews INTEGER NOT NULL DEFAULT 0,
+    is_hidden_gem BOOLEAN,
+    is_verified BOOLEAN,
+    authenticity_score DECIMAL(3,2) NOT NULL DEFAULT 0.00,
+    photos JSONB NOT NULL DEFAULT '[]',
+    thumbnails JSONB NOT NULL DEFAULT '[]', -- URL da miniatura de cada foto
+    search_vector TSVECTOR,
+    created_by UUID,
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Agregados do mapa de calor por célula geohash (precisões 3 a 7, de ~156km a ~150m)
+-- Mantidos incrementalmente por triggers na projeção de leitura
+CREATE TABLE experience_heatmap_cells (
+    precision SMALLINT NOT NULL,
+    geohash VARCHAR(12) NOT NULL,
+    bounds GEOMETRY(POLYGON, 4326) NOT NULL,
+    experience_count INTEGER NOT NULL DEFAULT 0,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    rating_weighted_sum NUMERIC NOT NULL DEFAULT 0, -- soma de average_rating * total_reviews
+    latitude_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    longitude_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (precision, geohash)
+);
+
+-- Experiências mais próximas de cada experiência ("perto daqui" na página de detalhes)
+-- scope 'all': qualquer categoria; 'category': mesma categoria. Mantida por triggers na projeção de leitura
+CREATE TABLE experience_neighbors (
+    experience_id UUID NOT NULL REFERENCES experience_read_model(id) ON DELETE CASCADE,
+    scope VARCHAR(10) NOT NULL CHECK (scope IN ('all', 'category')),
+    rank SMALLINT NOT NULL,
+    neighbor_id UUID NOT NULL, -- Sem FK: a remoção do vizinho recalcula a lista na trigger
+    distance_m DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (experience_id, scope, rank)
+);
+
+-- Versão de cada vector tile do map-service nos zooms 10 a 14 (zooms maiores usam o
+-- ancestral de zoom 14; menores somam os descendentes de zoom 10 na leitura, para que
+-- escritas em lugares diferentes não disputem as mesmas poucas linhas de zoom baixo)
+-- Incrementada por triggers em experiences; tile sem linha tem versão 0
+CREATE TABLE experience_tile_versions (
+    z SMALLINT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (z, x, y)
+);
+
+-- Versões globais dos dados do mapa ('categories': nome e cor das categorias nos tiles)
+-- Começam no instante da criação para não coincidirem com tiles em cache de um banco recriado
+CREATE TABLE map_data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+INSERT INTO map_data_versions (name, version)
+VALUES ('categories', (EXTRACT(EPOCH FROM CURRENT_TIMESTAMP) * 1000)::BIGINT);
+
 -- Índices para performance
 CREATE INDEX idx_experiences_location ON experiences USING GIST (location);
 CREATE INDEX idx_experiences_category ON experiences(category_id);
 CREATE INDEX idx_experiences_rating ON experiences(average_rating DESC);
+CREATE INDEX idx_experiences_name_trgm ON experiences USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_experience_categories_name_trgm ON experience_categories USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_experiences_name_trgm_gist ON experiences USING GIST (name gist_trgm_ops); -- KNN (<<->) do autocomplete
 CREATE INDEX idx_reviews_experience ON reviews(experience_id);
 CREATE INDEX idx_reviews_user ON reviews(user_id);
 CREATE INDEX idx_reviews_rating ON reviews(rating);
 CREATE INDEX idx_users_email ON users(email);
 
+-- Índices compostos para paginação por cursor (keyset) nas ordenações suportadas
+-- (listagem e busca de experiências usam os de experience_read_model; este atende a exportação)
+CREATE INDEX idx_experiences_created_at_id ON experiences(created_at, id);
+CREATE INDEX idx_reviews_created_at_id ON reviews(created_at, id);
+CREATE INDEX idx_reviews_rating_id ON reviews(rating, id);
+CREATE INDEX idx_reviews_helpful_votes_id ON reviews(helpful_votes, id);
+CREATE INDEX idx_reviews_experience_created_at_id ON reviews(experience_id, created_at, id);
+CREATE INDEX idx_reviews_experience_helpful_votes_id ON reviews(experience_id, helpful_votes, id);
+CREATE INDEX idx_bulk_import_jobs_status ON bulk_import_jobs(status);
+CREATE INDEX idx_experiences_import_job ON experiences(import_job_id) WHERE import_job_id IS NOT NULL;
+CREATE UNIQUE INDEX idx_experiences_external_id ON experiences(external_id) WHERE external_id IS NOT NULL;
+CREATE INDEX idx_photo_refs_owner ON photo_refs(owner_type, owner_id);
+CREATE INDEX idx_photo_blobs_unreferenced ON photo_blobs(last_used_at) WHERE ref_count = 0;
+CREATE INDEX idx_bulk_import_job_errors_job_row ON bulk_import_job_errors(job_id, row_number);
+CREATE INDEX idx_experience_read_model_location ON experience_read_model USING GIST (location);
+CREATE INDEX idx_experience_read_model_category ON experience_read_model(category_id);
+CREATE INDEX idx_experience_read_model_search ON experience_read_model USING GIN (search_vector);
+CREATE INDEX idx_experience_read_model_created_at_id ON experience_read_model(created_at, id);
+CREATE INDEX idx_experience_read_model_rating_id ON experience_read_model(average_rating, id);
+CREATE INDEX idx_experience_read_model_name_id ON experience_read_model(name, id);
+CREATE INDEX idx_experience_read_model_opening_minutes ON experience_read_model USING GIST (opening_minutes);
+CREATE INDEX idx_experience_heatmap_cells_bounds ON experience_heatmap_cells USING GIST (bounds);
+CREATE INDEX idx_experience_neighbors_neighbor ON experience_neighbors(neighbor_id);
+
 -- Função para atualizar o timestamp de updated_at
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -126,6 +408,35 @@ CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users FOR EACH ROW EXECU
 CREATE TRIGGER update_experiences_updated_at BEFORE UPDATE ON experiences FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_reviews_updated_at BEFORE UPDATE ON reviews FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Contador de referências das fotos
+CREATE OR REPLACE FUNCTION update_photo_blob_ref_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE photo_blobs SET ref_count = ref_count + 1, last_used_at = CURRENT_TIMESTAMP WHERE hash = NEW.hash;
+        RETURN NEW;
+    END IF;
+    UPDATE photo_blobs SET ref_count = ref_count - 1, last_used_at = CURRENT_TIMESTAMP WHERE hash = OLD.hash;
+    RETURN OLD;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER update_photo_blob_ref_count AFTER INSERT OR DELETE ON photo_refs FOR EACH ROW EXECUTE FUNCTION update_photo_blob_ref_count();
+
+-- Função para manter o documento de busca das experiências (nome > descrição > endereço)
+CREATE OR REPLACE FUNCTION update_experience_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('portuguese_unaccent', COALESCE(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('portuguese_unaccent', COALESCE(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('portuguese_unaccent', COALESCE(NEW.address, '')), 'C');
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER update_experiences_search_vector BEFORE INSERT OR UPDATE OF name, description, address ON experiences FOR EACH ROW EXECUTE FUNCTION update_experience_search_vector();
+
 -- Função para atualizar a média de avaliações de uma experiência
 CREATE OR REPLACE FUNCTION update_experience_rating()
 RETURNS TRIGGER AS $$
@@ -153,3 +464,281 @@ CREATE TRIGGER update_experience_rating_on_insert AFTER INSERT ON reviews FOR EA
 CREATE TRIGGER update_experience_rating_on_update AFTER UPDATE ON reviews FOR EACH ROW EXECUTE FUNCTION update_experience_rating();
 CREATE TRIGGER update_experience_rating_on_delete AFTER DELETE ON reviews FOR EACH ROW EXECUTE FUNCTION update_experience_rating();
 
+-- Projeção de leitura: recalcula as linhas das experiências informadas
+CREATE OR REPLACE FUNCTION refresh_experience_read_model(experience_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO experience_read_model (
+        id, name, description, address, category_id, category_name, category_color, category_icon_url,
+        latitude, longitude, location, phone, website_url, instagram_handle, opening_hours, opening_minutes, price_range,
+        average_rating, total_reviews, is_hidden_gem, is_verified, authenticity_score, photos, thumbnails,
+        search_vector, created_by, created_at, updated_at
+    )
+    SELECT e.id, e.name, e.description, e.address, e.category_id, c.name, c.color_hex, c.icon_url,
+           ST_Y(e.location), ST_X(e.location), e.location, e.phone, e.website_url, e.instagram_handle,
+           e.opening_hours, e.opening_minutes, e.price_range, COALESCE(e.average_rating, 0), COALESCE(e.total_reviews, 0),
+           e.is_hidden_gem, e.is_verified, COALESCE(e.authenticity_score, 0), COALESCE(e.photos, '[]'),
+           COALESCE((
+               SELECT jsonb_agg(CASE WHEN jsonb_typeof(p) = 'object'
+                                     THEN p #>> '{variants,thumbnail,webp}'
+                                     ELSE p #>> '{}' END)
+               FROM jsonb_array_elements(COALESCE(e.photos, '[]')) AS p
+           ), '[]'),
+           e.search_vector, e.created_by, e.created_at, e.updated_at
+    FROM experiences e
+    LEFT JOIN experience_categories c ON c.id = e.category_id
+    WHERE e.id = ANY(experience_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name, description = EXCLUDED.description, address = EXCLUDED.address,
+        category_id = EXCLUDED.category_id, category_name = EXCLUDED.category_name,
+        category_color = EXCLUDED.category_color, category_icon_url = EXCLUDED.category_icon_url,
+        latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude, location = EXCLUDED.location,
+        phone = EXCLUDED.phone, website_url = EXCLUDED.website_url, instagram_handle = EXCLUDED.instagram_handle,
+        opening_hours = EXCLUDED.opening_hours, opening_minutes = EXCLUDED.opening_minutes,
+        price_range = EXCLUDED.price_range,
+        average_rating = EXCLUDED.average_rating, total_reviews = EXCLUDED.total_reviews,
+        is_hidden_gem = EXCLUDED.is_hidden_gem, is_verified = EXCLUDED.is_verified,
+        authenticity_score = EXCLUDED.authenticity_score, photos = EXCLUDED.photos,
+        thumbnails = EXCLUDED.thumbnails, search_vector = EXCLUDED.search_vector,
+        created_by = EXCLUDED.created_by, created_at = EXCLUDED.created_at, updated_at = EXCLUDED.updated_at;
+END;
+$$ language 'plpgsql';
+
+-- Um refresh por instrução (não por linha): o bulk import atualiza milhares de linhas de uma vez
+CREATE OR REPLACE FUNCTION sync_experience_read_model()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_experience_read_model(ARRAY(SELECT id FROM changed_rows));
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION sync_experience_read_model_category()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE experience_read_model r
+    SET category_name = c.name, category_color = c.color_hex, category_icon_url = c.icon_url
+    FROM changed_rows c
+    WHERE r.category_id = c.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER sync_experience_read_model_on_insert AFTER INSERT ON experiences REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_read_model();
+CREATE TRIGGER sync_experience_read_model_on_update AFTER UPDATE ON experiences REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_read_model();
+CREATE TRIGGER sync_experience_read_model_on_category_update AFTER UPDATE ON experience_categories REFERENCING NEW TABLE AS changed_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_read_model_category();
+
+-- Mapa de calor: soma (+1) as linhas novas e subtrai (-1) as antigas em cada precisão
+-- Células que ficam vazias permanecem com experience_count = 0 e são ignoradas na leitura
+CREATE OR REPLACE FUNCTION sync_experience_heatmap()
+RETURNS TRIGGER AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT 1, location, total_reviews, average_rating FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT -1, location, total_reviews, average_rating FROM old_rows';
+    ELSE
+        -- Só as linhas em que algo do mapa de calor mudou
+        changes := '
+            WITH changed AS (
+                SELECT o.location AS old_location, o.total_reviews AS old_reviews, o.average_rating AS old_rating,
+                       n.location AS new_location, n.total_reviews AS new_reviews, n.average_rating AS new_rating
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE NOT ST_Equals(o.location, n.location)
+                   OR o.total_reviews IS DISTINCT FROM n.total_reviews
+                   OR o.average_rating IS DISTINCT FROM n.average_rating
+            )
+            SELECT -1, old_location, old_reviews, old_rating FROM changed
+            UNION ALL
+            SELECT 1, new_location, new_reviews, new_rating FROM changed';
+    END IF;
+
+    EXECUTE format('
+        INSERT INTO experience_heatmap_cells AS cells (
+            precision, geohash, bounds, experience_count, review_count, rating_weighted_sum, latitude_sum, longitude_sum
+        )
+        SELECT p.precision, ST_GeoHash(c.location, p.precision), ST_GeomFromGeoHash(ST_GeoHash(c.location, p.precision)),
+               SUM(c.sign), SUM(c.sign * c.total_reviews), SUM(c.sign * c.average_rating * c.total_reviews),
+               SUM(c.sign * ST_Y(c.location)), SUM(c.sign * ST_X(c.location))
+        FROM (%s) AS c(sign, location, total_reviews, average_rating)
+        CROSS JOIN generate_series(3, 7) AS p(precision)
+        GROUP BY 1, 2
+        ON CONFLICT (precision, geohash) DO UPDATE SET
+            experience_count = cells.experience_count + EXCLUDED.experience_count,
+            review_count = cells.review_count + EXCLUDED.review_count,
+            rating_weighted_sum = cells.rating_weighted_sum + EXCLUDED.rating_weighted_sum,
+            latitude_sum = cells.latitude_sum + EXCLUDED.latitude_sum,
+            longitude_sum = cells.longitude_sum + EXCLUDED.longitude_sum', changes);
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER sync_experience_heatmap_on_insert AFTER INSERT ON experience_read_model REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_heatmap();
+CREATE TRIGGER sync_experience_heatmap_on_update AFTER UPDATE ON experience_read_model REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_heatmap();
+CREATE TRIGGER sync_experience_heatmap_on_delete AFTER DELETE ON experience_read_model REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_heatmap();
+
+-- Vizinhos: recalcula as listas (10 mais próximas até 5km, em cada scope) das experiências informadas
+CREATE OR REPLACE FUNCTION refresh_experience_neighbors(experience_ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM experience_neighbors WHERE experience_id = ANY(experience_ids);
+
+    INSERT INTO experience_neighbors (experience_id, scope, rank, neighbor_id, distance_m)
+    SELECT e.id, s.scope, n.rank, n.id, n.distance_m
+    FROM experience_read_model e
+    CROSS JOIN (VALUES ('all'), ('category')) AS s(scope)
+    CROSS JOIN LATERAL (
+        SELECT k.id, k.distance_m, ROW_NUMBER() OVER (ORDER BY k.distance_m, k.id) AS rank
+        FROM (
+            -- O filtro em graus (com folga pela latitude) usa o índice GIST e limita as candidatas
+            -- a ~5km; a ordem é pela distância em metros (<-> em graus encurta a longitude e
+            -- trocaria os mais próximos)
+            SELECT r.id, ST_Distance(Geography(r.location), Geography(e.location)) AS distance_m
+            FROM experience_read_model r
+            WHERE r.id <> e.id
+              AND ST_DWithin(r.location, e.location,
+                             5000 / (111320 * GREATEST(COS(RADIANS(LEAST(ABS(e.latitude), 89))), 0.01)))
+              AND ST_DWithin(Geography(r.location), Geography(e.location), 5000)
+              AND (s.scope = 'all' OR r.category_id = e.category_id)
+            ORDER BY distance_m, r.id
+            LIMIT 10
+        ) AS k
+    ) AS n
+    WHERE e.id = ANY(experience_ids);
+END;
+$$ language 'plpgsql';
+
+-- Vizinhos: ao criar, mover, trocar de categoria ou remover, recalcula a própria lista e só as
+-- listas que mudam (as que continham a experiência e as que passam a incluí-la)
+CREATE OR REPLACE FUNCTION sync_experience_neighbors()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed UUID[] := '{}'; -- Posição ou categoria nova
+    removed UUID[] := '{}'; -- Saem das listas em que estavam
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := ARRAY(SELECT id FROM new_rows);
+    ELSIF TG_OP = 'UPDATE' THEN
+        changed := ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE NOT ST_Equals(n.location, o.location) OR n.category_id IS DISTINCT FROM o.category_id
+        );
+        removed := changed;
+    ELSE
+        removed := ARRAY(SELECT id FROM old_rows);
+    END IF;
+
+    IF cardinality(changed) = 0 AND cardinality(removed) = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM refresh_experience_neighbors(ARRAY(
+        SELECT unnest(changed)
+        UNION
+        SELECT experience_id FROM experience_neighbors WHERE neighbor_id = ANY(removed)
+        UNION
+        -- Listas incompletas ou cujo último vizinho está mais longe que a nova posição
+        SELECT y.id
+        FROM experience_read_model x
+        JOIN experience_read_model y
+          ON y.id <> x.id
+         AND ST_DWithin(y.location, x.location,
+                        5000 / (111320 * GREATEST(COS(RADIANS(LEAST(ABS(x.latitude), 89))), 0.01)))
+        CROSS JOIN LATERAL (
+            SELECT COUNT(*) FILTER (WHERE nb.scope = 'all') AS all_count,
+                   MAX(nb.distance_m) FILTER (WHERE nb.scope = 'all') AS all_radius,
+                   COUNT(*) FILTER (WHERE nb.scope = 'category') AS category_count,
+                   MAX(nb.distance_m) FILTER (WHERE nb.scope = 'category') AS category_radius
+            FROM experience_neighbors nb
+            WHERE nb.experience_id = y.id
+        ) AS existing
+        CROSS JOIN LATERAL (
+            SELECT ST_Distance(Geography(y.location), Geography(x.location)) AS distance_m
+        ) AS d
+        WHERE x.id = ANY(changed)
+          AND d.distance_m <= 5000
+          AND (existing.all_count < 10 OR d.distance_m < existing.all_radius
+               OR (y.category_id = x.category_id
+                   AND (existing.category_count < 10 OR d.distance_m < existing.category_radius)))
+    ));
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER sync_experience_neighbors_on_insert AFTER INSERT ON experience_read_model REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_neighbors();
+CREATE TRIGGER sync_experience_neighbors_on_update AFTER UPDATE ON experience_read_model REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_neighbors();
+CREATE TRIGGER sync_experience_neighbors_on_delete AFTER DELETE ON experience_read_model REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION sync_experience_neighbors();
+
+-- Índice XYZ (Web Mercator) do tile que contém um ponto no zoom z
+CREATE OR REPLACE FUNCTION tile_x(location GEOMETRY, z INTEGER)
+RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(FLOOR((ST_X(location) + 180) / 360 * (1 << z))::INTEGER, 0), (1 << z) - 1)
+$$ LANGUAGE SQL IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION tile_y(location GEOMETRY, z INTEGER)
+RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(FLOOR(
+               (1 - LN(TAN(RADIANS(clamped.latitude)) + 1 / COS(RADIANS(clamped.latitude))) / PI()) / 2 * (1 << z)
+           )::INTEGER, 0), (1 << z) - 1)
+    FROM (SELECT LEAST(GREATEST(ST_Y(location), -85.0511), 85.0511) AS latitude) AS clamped
+$$ LANGUAGE SQL IMMUTABLE;
+
+-- Versões dos tiles: incrementa os tiles (zoom 10 a 14) da posição antiga e da nova
+-- Só mudanças em colunas que vão no tile contam (ver TILE_MVT_SQL no map-service;
+-- average_rating é desenhado no tile, então uma review nova também conta). As linhas
+-- são travadas sempre na mesma ordem para transações concorrentes não se bloquearem em ciclo
+CREATE OR REPLACE FUNCTION bump_experience_tile_versions()
+RETURNS TRIGGER AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT location FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT location FROM old_rows';
+    ELSE
+        changes := '
+            WITH changed AS (
+                SELECT o.location AS old_location, n.location AS new_location
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE NOT ST_Equals(o.location, n.location)
+                   OR o.name IS DISTINCT FROM n.name
+                   OR o.category_id IS DISTINCT FROM n.category_id
+                   OR o.average_rating IS DISTINCT FROM n.average_rating
+                   OR o.price_range IS DISTINCT FROM n.price_range
+                   OR o.is_hidden_gem IS DISTINCT FROM n.is_hidden_gem
+            )
+            SELECT old_location FROM changed
+            UNION ALL
+            SELECT new_location FROM changed';
+    END IF;
+
+    EXECUTE format('
+        INSERT INTO experience_tile_versions AS versions (z, x, y, version)
+        SELECT DISTINCT zoom.z, tile_x(c.location, zoom.z), tile_y(c.location, zoom.z), 1
+        FROM (%s) AS c(location)
+        CROSS JOIN generate_series(10, 14) AS zoom(z)
+        ORDER BY 1, 2, 3
+        ON CONFLICT (z, x, y) DO UPDATE SET version = versions.version + 1', changes);
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Nome e cor da categoria vão em todos os tiles das suas experiências: uma versão global
+CREATE OR REPLACE FUNCTION bump_category_tile_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE map_data_versions SET version = version + 1 WHERE name = 'categories';
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER bump_experience_tile_versions_on_insert AFTER INSERT ON experiences REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_experience_tile_versions();
+CREATE TRIGGER bump_experience_tile_versions_on_update AFTER UPDATE ON experiences REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_experience_tile_versions();
+CREATE TRIGGER bump_experience_tile_versions_on_delete AFTER DELETE ON experiences REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_experience_tile_versions();
+CREATE TRIGGER bump_category_tile_version AFTER UPDATE OR DELETE ON experience_categories FOR EACH STATEMENT EXECUTE FUNCTION bump_category_tile_version();
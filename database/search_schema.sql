@@ -0,0 +1,43 @@
+-- Busca textual das experiências (full-text search em português)
+-- Execute este script se a tabela experiences já existir sem a coluna search_vector
+
+-- Extensão para remover acentos ("cafe" encontra "Café")
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Configuração de busca: stemming em português + remoção de acentos
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'portuguese_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION portuguese_unaccent (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION portuguese_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END $$;
+
+-- Coluna com o documento de busca (nome > descrição > endereço)
+ALTER TABLE experiences ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+-- Função para manter o search_vector atualizado na escrita
+CREATE OR REPLACE FUNCTION update_experience_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('portuguese_unaccent', COALESCE(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('portuguese_unaccent', COALESCE(NEW.description, '')), 'B') ||
+        setweight(to_tsvector('portuguese_unaccent', COALESCE(NEW.address, '')), 'C');
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_experiences_search_vector ON experiences;
+CREATE TRIGGER update_experiences_search_vector BEFORE INSERT OR UPDATE OF name, description, address ON experiences FOR EACH ROW EXECUTE FUNCTION update_experience_search_vector();
+
+-- Preencher experiências existentes
+UPDATE experiences SET search_vector =
+    setweight(to_tsvector('portuguese_unaccent', COALESCE(name, '')), 'A') ||
+    setweight(to_tsvector('portuguese_unaccent', COALESCE(description, '')), 'B') ||
+    setweight(to_tsvector('portuguese_unaccent', COALESCE(address, '')), 'C')
+WHERE search_vector IS NULL;
+
+-- Índice GIN para a busca
+CREATE INDEX IF NOT EXISTS idx_experiences_search ON experiences USING GIN (search_vector);
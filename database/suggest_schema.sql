@@ -0,0 +1,14 @@
+-- Autocomplete de experiências (índices de trigramas)
+-- Execute este script se o banco já existir sem os índices de trigramas
+
+-- Extensão de similaridade por trigramas
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Índices GIN para busca por similaridade (operadores %, <% e LIKE)
+CREATE INDEX IF NOT EXISTS idx_experiences_name_trgm ON experiences USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_experience_categories_name_trgm ON experience_categories USING GIN (name gin_trgm_ops);
+
+-- Índice GiST para o autocomplete: ORDER BY :search <<-> name LIMIT k vira uma busca KNN
+CREATE INDEX IF NOT EXISTS idx_experiences_name_trgm_gist ON experiences USING GIST (name gist_trgm_ops);
+
+ANALYZE experiences;
@@ -0,0 +1,103 @@
+-- Migração: versões dos vector tiles (experience_tile_versions e map_data_versions)
+-- O map-service usa as versões como carimbo do cache de tiles: uma leitura pela chave
+-- primária em vez de MAX/COUNT sobre as experiências do tile a cada requisição
+
+-- Versão de cada vector tile do map-service nos zooms 10 a 14 (zooms maiores usam o
+-- ancestral de zoom 14; menores somam os descendentes de zoom 10 na leitura, para que
+-- escritas em lugares diferentes não disputem as mesmas poucas linhas de zoom baixo)
+-- Incrementada por triggers em experiences; tile sem linha tem versão 0
+CREATE TABLE IF NOT EXISTS experience_tile_versions (
+    z SMALLINT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (z, x, y)
+);
+
+-- Versões globais dos dados do mapa ('categories': nome e cor das categorias nos tiles)
+-- Começam no instante da criação para não coincidirem com tiles em cache de um banco recriado
+CREATE TABLE IF NOT EXISTS map_data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+-- Versões de zoom 0 a 9 das versões anteriores desta migração: não são mais lidas
+DELETE FROM experience_tile_versions WHERE z < 10;
+
+INSERT INTO map_data_versions (name, version)
+VALUES ('categories', (EXTRACT(EPOCH FROM CURRENT_TIMESTAMP) * 1000)::BIGINT)
+ON CONFLICT (name) DO NOTHING;
+
+-- Índice XYZ (Web Mercator) do tile que contém um ponto no zoom z
+CREATE OR REPLACE FUNCTION tile_x(location GEOMETRY, z INTEGER)
+RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(FLOOR((ST_X(location) + 180) / 360 * (1 << z))::INTEGER, 0), (1 << z) - 1)
+$$ LANGUAGE SQL IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION tile_y(location GEOMETRY, z INTEGER)
+RETURNS INTEGER AS $$
+    SELECT LEAST(GREATEST(FLOOR(
+               (1 - LN(TAN(RADIANS(clamped.latitude)) + 1 / COS(RADIANS(clamped.latitude))) / PI()) / 2 * (1 << z)
+           )::INTEGER, 0), (1 << z) - 1)
+    FROM (SELECT LEAST(GREATEST(ST_Y(location), -85.0511), 85.0511) AS latitude) AS clamped
+$$ LANGUAGE SQL IMMUTABLE;
+
+-- Versões dos tiles: incrementa os tiles (zoom 10 a 14) da posição antiga e da nova
+-- Só mudanças em colunas que vão no tile contam (ver TILE_MVT_SQL no map-service;
+-- average_rating é desenhado no tile, então uma review nova também conta). As linhas
+-- são travadas sempre na mesma ordem para transações concorrentes não se bloquearem em ciclo
+CREATE OR REPLACE FUNCTION bump_experience_tile_versions()
+RETURNS TRIGGER AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT location FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT location FROM old_rows';
+    ELSE
+        changes := '
+            WITH changed AS (
+                SELECT o.location AS old_location, n.location AS new_location
+                FROM old_rows o JOIN new_rows n ON n.id = o.id
+                WHERE NOT ST_Equals(o.location, n.location)
+                   OR o.name IS DISTINCT FROM n.name
+                   OR o.category_id IS DISTINCT FROM n.category_id
+                   OR o.average_rating IS DISTINCT FROM n.average_rating
+                   OR o.price_range IS DISTINCT FROM n.price_range
+                   OR o.is_hidden_gem IS DISTINCT FROM n.is_hidden_gem
+            )
+            SELECT old_location FROM changed
+            UNION ALL
+            SELECT new_location FROM changed';
+    END IF;
+
+    EXECUTE format('
+        INSERT INTO experience_tile_versions AS versions (z, x, y, version)
+        SELECT DISTINCT zoom.z, tile_x(c.location, zoom.z), tile_y(c.location, zoom.z), 1
+        FROM (%s) AS c(location)
+        CROSS JOIN generate_series(10, 14) AS zoom(z)
+        ORDER BY 1, 2, 3
+        ON CONFLICT (z, x, y) DO UPDATE SET version = versions.version + 1', changes);
+
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Nome e cor da categoria vão em todos os tiles das suas experiências: uma versão global
+CREATE OR REPLACE FUNCTION bump_category_tile_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE map_data_versions SET version = version + 1 WHERE name = 'categories';
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS bump_experience_tile_versions_on_insert ON experiences;
+DROP TRIGGER IF EXISTS bump_experience_tile_versions_on_update ON experiences;
+DROP TRIGGER IF EXISTS bump_experience_tile_versions_on_delete ON experiences;
+DROP TRIGGER IF EXISTS bump_category_tile_version ON experience_categories;
+CREATE TRIGGER bump_experience_tile_versions_on_insert AFTER INSERT ON experiences REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_experience_tile_versions();
+CREATE TRIGGER bump_experience_tile_versions_on_update AFTER UPDATE ON experiences REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_experience_tile_versions();
+CREATE TRIGGER bump_experience_tile_versions_on_delete AFTER DELETE ON experiences REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_experience_tile_versions();
+CREATE TRIGGER bump_category_tile_version AFTER UPDATE OR DELETE ON experience_categories FOR EACH STATEMENT EXECUTE FUNCTION bump_category_tile_version();
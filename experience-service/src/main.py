@@ -2,6 +2,8 @@ import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+# Código comum aos serviços (na imagem Docker fica em /app/taiglo_shared, já no PYTHONPATH)
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'shared'))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
@@ -9,10 +11,20 @@ from flasgger import Swagger, swag_from
 from src.models.experience import db
 from src.routes.experience import experience_bp
 from src.routes.category import category_bp
+from src.utils.import_worker import resume_pending_jobs
+from src.utils.experience_cache import experience_cache
+from src.utils.similarity_sync import start_similarity_sync
+from src.utils.photo_store import start_photo_gc
+from src.utils.static_files import send_static
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'taiglo-experience-secret-key-2024'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Entrega de arquivos estáticos por um proxy na frente (x-accel para nginx, x-sendfile para Apache)
+app.config['STATIC_OFFLOAD'] = os.getenv('STATIC_OFFLOAD', '').lower()
+app.config['STATIC_OFFLOAD_PREFIX'] = os.getenv('STATIC_OFFLOAD_PREFIX', '/_static')
+app.config['USE_X_SENDFILE'] = app.config['STATIC_OFFLOAD'] == 'x-sendfile'
+app.config['BULK_IMPORT_DIR'] = os.getenv('BULK_IMPORT_DIR', os.path.join(os.path.dirname(__file__), 'data', 'imports'))
 
 # Configurar CORS
 CORS(app, origins="*")
@@ -64,6 +76,37 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
 
+# Com app.run(debug=True) o reloader do werkzeug executa este arquivo em dois processos:
+# o pai só vigia os arquivos e não atende requisições, então não inicia trabalho em segundo plano
+SERVING_PROCESS = __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+# Retomar importações em lote interrompidas por uma queda do serviço
+if SERVING_PROCESS:
+    resume_pending_jobs(app)
+
+# Invalidações do cache de experiências feitas por outros processos
+experience_cache.start_listener()
+
+# Índice de experiências parecidas (carga inicial e sincronização em segundo plano)
+if SERVING_PROCESS:
+    start_similarity_sync(app)
+
+# Coleta de fotos sem referências (blobs e diretórios órfãos), fora do caminho das requisições
+if SERVING_PROCESS:
+    start_photo_gc(app, os.path.join(app.static_folder, 'photos'))
+
+# Fotos endereçadas pelo conteúdo nunca mudam: cache permanente, sem revalidação
+PHOTO_MAX_AGE = 365 * 24 * 60 * 60
+UPLOAD_MAX_AGE = 24 * 60 * 60
+
+@app.route('/static/photos/<path:filename>')
+def serve_photo(filename):
+    return send_static(os.path.join(app.static_folder, 'photos'), filename, PHOTO_MAX_AGE, immutable=True)
+
+@app.route('/static/uploads/<path:filename>')
+def serve_upload(filename):
+    return send_static(os.path.join(app.static_folder, 'uploads'), filename, UPLOAD_MAX_AGE)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -1,12 +1,37 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from sqlalchemy import func, text
+from sqlalchemy import and_, func, literal, select, text, tuple_
+from math import cos, radians
 import uuid
+from sqlalchemy.dialects.postgresql import INT4MULTIRANGE, TSVECTOR
 from geoalchemy2 import Geometry
 from geoalchemy2.elements import WKTElement
 
 db = SQLAlchemy()
 
+# Configuração do agrupamento de marcadores no mapa
+MAP_CLUSTER_THRESHOLD = 300  # Acima disso a área é retornada em clusters
+MAP_CELLS_PER_TILE = 4  # Células da grade por tile de 256px (~64px por cluster)
+MAP_MAX_GRID_CELLS = 20  # Máximo de células por eixo (no máximo 400 clusters)
+
+# Metros por grau de latitude (para converter raios em filtros por graus que usam o índice GIST)
+METERS_PER_DEGREE = 111320
+
+# Faixas da faceta de avaliação (cumulativas, como o filtro min_rating)
+RATING_FACET_THRESHOLDS = [4.5, 4.0, 3.0, 2.0]
+
+# Mapa de calor: precisões de geohash pré-agregadas (ver database/experience_heatmap.sql)
+HEATMAP_PRECISIONS = range(3, 8)
+HEATMAP_MAX_CELLS = 1000  # Sem resolution explícita, a mais fina com até isso de células na área
+
+# Vizinhos pré-calculados por experiência (ver database/experience_neighbors.sql)
+NEIGHBOR_SCOPES = ('all', 'category')
+NEIGHBOR_COUNT = 10
+
+# Configuração de busca textual (ver database/search_schema.sql)
+SEARCH_CONFIG = 'portuguese_unaccent'
+SEARCH_HIGHLIGHT_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8'
+
 class ExperienceCategory(db.Model):
     __tablename__ = 'experience_categories'
     
@@ -20,18 +45,19 @@ class ExperienceCategory(db.Model):
     # Relacionamento com experiências
     experiences = db.relationship('Experience', backref='category', lazy=True)
     
-    def to_dict(self):
-        count = db.session.query(func.count(Experience.id))\
-            .filter(Experience.category_id == self.id).scalar()
-        return {
+    def to_dict(self, include_count=True):
+        data = {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'icon_url': self.icon_url,
             'color_hex': self.color_hex,
-            'created_at': self.created_at.isoformat(),
-            'experience_count': count
+            'created_at': self.created_at.isoformat()
         }
+        if include_count:
+            data['experience_count'] = db.session.query(func.count(Experience.id))\
+                .filter(Experience.category_id == self.id).scalar()
+        return data
     
     def __repr__(self):
         return f'<ExperienceCategory {self.name}>'
@@ -58,8 +84,12 @@ class Experience(db.Model):
     is_hidden_gem = db.Column(db.Boolean, default=False)
     is_verified = db.Column(db.Boolean, default=False)
     authenticity_score = db.Column(db.Float, default=0.0)
-    photos = db.Column(db.JSON, default=[])  # Array de URLs das fotos
+    photos = db.Column(db.JSON, default=[])  # Fotos: {url, variants: {thumbnail, card, full}} (antigas: só a URL)
+    # Documento de busca textual, mantido por trigger no banco
+    search_vector = db.deferred(db.Column(TSVECTOR))
     created_by = db.Column(db.String(36))  # User ID
+    external_id = db.Column(db.String(255))  # Chave do parceiro/feed de origem (upsert do bulk upload)
+    import_job_id = db.Column(db.String(36))  # Job de importação em lote que criou a experiência
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -72,6 +102,8 @@ class Experience(db.Model):
             'name': self.name,
             'description': self.description,
             'category_id': self.category_id,
+            # experience_count é agregado da categoria: no JSON em cache pode ficar atrasado
+            # até o TTL (experience_cache), já que não é invalidado com cada experiência
             'category': self.category.to_dict() if self.category else None,
             'address': self.address,
             'coordinates': {'latitude': lat, 'longitude': lon},
@@ -114,28 +146,500 @@ class Experience(db.Model):
         r = 6371
         
         return c * r
-    
+
+    @staticmethod
+    def search_query(search):
+        """Converte o termo digitado em tsquery (aceita aspas, OR e -termo)"""
+        return func.websearch_to_tsquery(SEARCH_CONFIG, search)
+
     @classmethod
-    #def find_nearby(cls, latitude, longitude, radius_km=5, limit=50):
-    #    """Encontra experiências próximas a uma coordenada"""
-    #    experiences = cls.query.all()
-    #    nearby_experiences = []
-    #    
-    #    for exp in experiences:
-    #        distance = cls.calculate_distance(
-    #            latitude, longitude,
-    #            exp.latitude, exp.longitude
-    #        )
-            
-    #        if distance <= radius_km:
-    #            nearby_experiences.append((exp, distance))
-        
-        # Ordenar por distância
-    #    nearby_experiences.sort(key=lambda x: x[1])
-        
-        # Limitar resultados
-    #    return nearby_experiences[:limit]
-    
+    def search_highlights(cls, experience_ids, search):
+        """Gera trechos destacados do nome e da descrição para as experiências da página"""
+        if not experience_ids:
+            return {}
+
+        rows = db.session.execute(text("""
+            SELECT e.id::text AS id,
+                   ts_headline(:config, e.name, q.query, 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true') AS name,
+                   ts_headline(:config, e.description, q.query, :options) AS description
+            FROM experiences e,
+                 websearch_to_tsquery(:config, :search) AS q(query)
+            WHERE e.id = ANY(CAST(:ids AS UUID[]))
+        """), {
+            'config': SEARCH_CONFIG,
+            'options': SEARCH_HIGHLIGHT_OPTIONS,
+            'search': search,
+            'ids': list(experience_ids)
+        }).mappings().all()
+
+        return {row['id']: {'name': row['name'], 'description': row['description']} for row in rows}
+
+    @classmethod
+    def suggest(cls, search, limit=8):
+        """Sugestões de nomes para o autocomplete, tolerantes a erros de digitação
+
+        Usa similaridade de palavras do pg_trgm (operador <%). Nas experiências a
+        ordem é pela distância <<-> (1 - word_similarity), servida como KNN pelo
+        índice GiST de trigramas: o LIMIT para no k-ésimo nome sem pontuar todos os
+        candidatos. Categorias são poucas e usam o índice GIN.
+        """
+        experiences = db.session.execute(text("""
+            SELECT e.id::text AS id, e.name, c.name AS category_name,
+                   1 - (:search <<-> e.name) AS score
+            FROM experiences e
+            LEFT JOIN experience_categories c ON c.id = e.category_id
+            WHERE :search <% e.name
+            ORDER BY :search <<-> e.name, e.name ASC
+            LIMIT :limit
+        """), {'search': search, 'limit': limit}).mappings().all()
+
+        categories = db.session.execute(text("""
+            SELECT c.id::text AS id, c.name, word_similarity(:search, c.name) AS score
+            FROM experience_categories c
+            WHERE :search <% c.name
+            ORDER BY score DESC, c.name ASC
+            LIMIT :limit
+        """), {'search': search, 'limit': limit}).mappings().all()
+
+        return {
+            'experiences': [
+                {'id': row['id'], 'name': row['name'], 'category': row['category_name']}
+                for row in experiences
+            ],
+            'categories': [{'id': row['id'], 'name': row['name']} for row in categories]
+        }
+
+    @classmethod
+    def find_in_bounds(cls, min_lat, min_lng, max_lat, max_lng, zoom, category_id=None):
+        """Busca experiências dentro de um retângulo, agrupando em clusters quando denso
+
+        Retorna uma tupla (modo, features) onde modo é 'points' ou 'clusters'.
+        O agrupamento é feito no banco com uma grade cujo tamanho depende do zoom,
+        limitada a MAP_MAX_GRID_CELLS células por eixo. Lê a projeção de leitura
+        (experience_read_model), como as demais consultas de leitura.
+        """
+        params = {
+            'min_lat': min_lat,
+            'min_lng': min_lng,
+            'max_lat': max_lat,
+            'max_lng': max_lng,
+            'category_id': category_id
+        }
+
+        bbox_filter = """
+            e.location && ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)
+            AND (CAST(:category_id AS TEXT) IS NULL OR e.category_id = CAST(:category_id AS UUID))
+        """
+
+        # Contar no máximo MAP_CLUSTER_THRESHOLD + 1 linhas para decidir o modo
+        sample_count = db.session.execute(text(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM experience_read_model e
+                WHERE {bbox_filter}
+                LIMIT :limit
+            ) AS sample
+        """), {**params, 'limit': MAP_CLUSTER_THRESHOLD + 1}).scalar()
+
+        if sample_count <= MAP_CLUSTER_THRESHOLD:
+            rows = db.session.execute(text(f"""
+                SELECT e.id::text AS id, e.name, e.category_id::text AS category_id,
+                       e.latitude, e.longitude,
+                       e.average_rating, e.is_hidden_gem
+                FROM experience_read_model e
+                WHERE {bbox_filter}
+            """), params).mappings().all()
+
+            return 'points', [
+                {
+                    'id': row['id'],
+                    'name': row['name'],
+                    'category_id': row['category_id'],
+                    'coordinates': {'latitude': row['latitude'], 'longitude': row['longitude']},
+                    'average_rating': round(float(row['average_rating']), 2) if row['average_rating'] else 0.0,
+                    'is_hidden_gem': row['is_hidden_gem']
+                }
+                for row in rows
+            ]
+
+        # Tamanho da célula em graus: MAP_CELLS_PER_TILE células por tile no zoom pedido,
+        # nunca menor que o necessário para manter a grade dentro do limite. As células
+        # começam no canto do retângulo (uma grade alinhada à origem cortaria uma célula a
+        # mais em cada eixo); LEAST põe a borda máxima na última célula
+        tile_size = 360.0 / (2 ** zoom)
+        cell_size = max(
+            tile_size / MAP_CELLS_PER_TILE,
+            (max_lng - min_lng) / MAP_MAX_GRID_CELLS,
+            (max_lat - min_lat) / MAP_MAX_GRID_CELLS
+        )
+
+        rows = db.session.execute(text(f"""
+            SELECT COUNT(*) AS count,
+                   AVG(e.latitude) AS latitude,
+                   AVG(e.longitude) AS longitude,
+                   mode() WITHIN GROUP (ORDER BY e.category_id::text) AS top_category_id,
+                   CASE WHEN COUNT(*) = 1 THEN MIN(e.id::text) END AS experience_id
+            FROM experience_read_model e
+            WHERE {bbox_filter}
+            GROUP BY LEAST(FLOOR((e.longitude - :min_lng) / :cell_size), :max_cell),
+                     LEAST(FLOOR((e.latitude - :min_lat) / :cell_size), :max_cell)
+        """), {**params, 'cell_size': cell_size, 'max_cell': MAP_MAX_GRID_CELLS - 1}).mappings().all()
+
+        return 'clusters', [
+            {
+                'count': row['count'],
+                'coordinates': {'latitude': row['latitude'], 'longitude': row['longitude']},
+                'top_category_id': row['top_category_id'],
+                'experience_id': row['experience_id']
+            }
+            for row in rows
+        ]
+
     def __repr__(self):
         return f'<Experience {self.name}>'
 
+
+class ExperienceReadModel(db.Model):
+    """Projeção de leitura das experiências (experience_read_model)
+
+    Tabela desnormalizada mantida por triggers no banco na mesma transação das
+    escritas em experiences/experience_categories (ver database/experience_read_model.sql):
+    categoria, latitude/longitude e miniaturas já vêm resolvidas, sem joins nem
+    consultas por linha. Somente leitura.
+    """
+    __tablename__ = 'experience_read_model'
+
+    id = db.Column(db.String(36), primary_key=True)
+    name = db.Column(db.String(255))
+    description = db.Column(db.Text)
+    address = db.Column(db.Text)
+    category_id = db.Column(db.String(36))
+    category_name = db.Column(db.String(100))
+    category_color = db.Column(db.String(7))
+    category_icon_url = db.Column(db.Text)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    location = db.deferred(db.Column(Geometry(geometry_type='POINT', srid=4326)))
+    phone = db.Column(db.String(20))
+    website_url = db.Column(db.Text)
+    instagram_handle = db.Column(db.String(100))
+    opening_hours = db.Column(db.JSON)
+    # Minutos da semana em que está aberta (gerado de opening_hours no banco; NULL = desconhecido)
+    opening_minutes = db.deferred(db.Column(INT4MULTIRANGE))
+    price_range = db.Column(db.Integer)
+    average_rating = db.Column(db.Float)
+    total_reviews = db.Column(db.Integer)
+    is_hidden_gem = db.Column(db.Boolean)
+    is_verified = db.Column(db.Boolean)
+    authenticity_score = db.Column(db.Float)
+    photos = db.Column(db.JSON)
+    thumbnails = db.Column(db.JSON)  # URL da miniatura de cada foto, na ordem de photos
+    search_vector = db.deferred(db.Column(TSVECTOR))
+    created_by = db.Column(db.String(36))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+
+    def to_dict(self, include_distance=False, distance=None):
+        """Mesmo formato de Experience.to_dict (a categoria vem sem experience_count)"""
+        experience_dict = {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'category_id': self.category_id,
+            'category': {
+                'id': self.category_id,
+                'name': self.category_name,
+                'icon_url': self.category_icon_url,
+                'color_hex': self.category_color
+            } if self.category_id else None,
+            'address': self.address,
+            'coordinates': {'latitude': self.latitude, 'longitude': self.longitude},
+            'phone': self.phone,
+            'website_url': self.website_url,
+            'instagram_handle': self.instagram_handle,
+            'opening_hours': self.opening_hours,
+            'price_range': self.price_range,
+            'average_rating': round(self.average_rating, 2) if self.average_rating else 0.0,
+            'total_reviews': self.total_reviews,
+            'is_hidden_gem': self.is_hidden_gem,
+            'is_verified': self.is_verified,
+            'authenticity_score': round(self.authenticity_score, 2) if self.authenticity_score else 0.0,
+            'photos': self.photos,
+            'thumbnails': self.thumbnails,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+        if include_distance and distance is not None:
+            experience_dict['distance_km'] = round(distance, 2)
+
+        return experience_dict
+
+    @classmethod
+    def open_at(cls, minute):
+        """Condição 'aberta no minuto da semana' (índice GiST em opening_minutes)"""
+        return cls.opening_minutes.op('@>')(minute)
+
+    @classmethod
+    def within_meters(cls, geometry, meters, latitude):
+        """ST_DWithin em metros que usa o índice GIST de location
+
+        ST_DWithin em geography não usa o índice da coluna geometry: primeiro um
+        filtro em graus com folga (o grau de longitude encolhe com a latitude,
+        a maior em módulo da área), depois a distância exata em geography.
+        """
+        degrees = meters / (METERS_PER_DEGREE * max(cos(radians(min(abs(latitude), 89))), 0.01))
+        return and_(
+            func.ST_DWithin(cls.location, geometry, degrees),
+            func.ST_DWithin(func.Geography(cls.location), func.Geography(geometry), meters)
+        )
+
+    @classmethod
+    def apply_filters(cls, query, category_id=None, min_rating=None, open_at_minute=None):
+        if category_id:
+            query = query.filter(cls.category_id == category_id)
+        if min_rating:
+            query = query.filter(cls.average_rating >= min_rating)
+        if open_at_minute is not None:
+            query = query.filter(cls.open_at(open_at_minute))
+        return query
+
+    @classmethod
+    def facet_counts(cls, query):
+        """Contagens por faceta do conjunto filtrado pela query, em uma única consulta
+
+        GROUPING SETS agrupa por categoria, faixa de preço e joia escondida; a
+        linha do total geral traz também as faixas de nota, contadas com FILTER.
+        """
+        filtered = query.order_by(None).with_entities(
+            cls.category_id, cls.category_name, cls.category_color,
+            cls.price_range, func.coalesce(cls.is_hidden_gem, False).label('is_hidden_gem'), cls.average_rating
+        ).subquery()
+
+        # Bits (categoria, preço, joia): 1 = coluna fora do agrupamento da linha
+        grouping = func.grouping(filtered.c.category_id, filtered.c.price_range, filtered.c.is_hidden_gem)
+        rating_counts = [
+            func.count().filter(filtered.c.average_rating >= threshold).label(f'rating_{index}')
+            for index, threshold in enumerate(RATING_FACET_THRESHOLDS)
+        ]
+        rows = db.session.query(
+            grouping.label('grouping'),
+            filtered.c.category_id, filtered.c.category_name, filtered.c.category_color,
+            filtered.c.price_range, filtered.c.is_hidden_gem,
+            func.count().label('count'),
+            *rating_counts
+        ).group_by(func.grouping_sets(
+            tuple_(filtered.c.category_id, filtered.c.category_name, filtered.c.category_color),
+            tuple_(filtered.c.price_range),
+            tuple_(filtered.c.is_hidden_gem),
+            text('()')
+        )).all()
+
+        facets = {'total': 0, 'categories': [], 'price_ranges': [], 'hidden_gem': [], 'ratings': []}
+        for row in rows:
+            if row.grouping == 0b011:
+                facets['categories'].append({
+                    'id': row.category_id,
+                    'name': row.category_name,
+                    'color_hex': row.category_color,
+                    'count': row.count
+                })
+            elif row.grouping == 0b101:
+                facets['price_ranges'].append({'value': row.price_range, 'count': row.count})
+            elif row.grouping == 0b110:
+                facets['hidden_gem'].append({'value': row.is_hidden_gem, 'count': row.count})
+            else:
+                facets['total'] = row.count
+                facets['ratings'] = [
+                    {'min_rating': threshold, 'count': getattr(row, f'rating_{index}')}
+                    for index, threshold in enumerate(RATING_FACET_THRESHOLDS)
+                ]
+
+        facets['categories'].sort(key=lambda facet: -facet['count'])
+        facets['price_ranges'].sort(key=lambda facet: (facet['value'] is None, facet['value'] or 0))
+        return facets
+
+    @staticmethod
+    def geohash_cell_size(precision):
+        """(largura, altura) em graus de uma célula geohash da precisão dada"""
+        bits = 5 * precision
+        return 360.0 / 2 ** ((bits + 1) // 2), 180.0 / 2 ** (bits // 2)
+
+    @classmethod
+    def heatmap_precision(cls, min_lat, min_lng, max_lat, max_lng):
+        """Precisão mais fina cujo número de células na área não passa de HEATMAP_MAX_CELLS"""
+        chosen = HEATMAP_PRECISIONS[0]
+        for precision in HEATMAP_PRECISIONS:
+            width, height = cls.geohash_cell_size(precision)
+            cells = ((max_lng - min_lng) / width + 1) * ((max_lat - min_lat) / height + 1)
+            if cells > HEATMAP_MAX_CELLS:
+                break
+            chosen = precision
+        return chosen
+
+    @classmethod
+    def heatmap(cls, min_lat, min_lng, max_lat, max_lng, precision):
+        """Células do mapa de calor que tocam o retângulo, lidas dos agregados pré-calculados"""
+        rows = db.session.execute(text("""
+            SELECT geohash, experience_count, review_count, rating_weighted_sum,
+                   latitude_sum, longitude_sum, ST_XMin(bounds) AS min_lng, ST_YMin(bounds) AS min_lat,
+                   ST_XMax(bounds) AS max_lng, ST_YMax(bounds) AS max_lat
+            FROM experience_heatmap_cells
+            WHERE precision = :precision
+              AND experience_count > 0
+              AND bounds && ST_MakeEnvelope(:min_lng, :min_lat, :max_lng, :max_lat, 4326)
+        """), {
+            'precision': precision,
+            'min_lat': min_lat,
+            'min_lng': min_lng,
+            'max_lat': max_lat,
+            'max_lng': max_lng
+        }).mappings().all()
+
+        return [
+            {
+                'geohash': row['geohash'],
+                'count': row['experience_count'],
+                'review_count': row['review_count'],
+                'average_rating': round(float(row['rating_weighted_sum']) / row['review_count'], 2)
+                                  if row['review_count'] else None,
+                'coordinates': {
+                    'latitude': row['latitude_sum'] / row['experience_count'],
+                    'longitude': row['longitude_sum'] / row['experience_count']
+                },
+                'bounds': [row['min_lng'], row['min_lat'], row['max_lng'], row['max_lat']]
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    def find_nearby(cls, latitude, longitude, radius_km=5, limit=50, category_id=None, min_rating=None,
+                    open_at_minute=None):
+        """Experiências até radius_km de uma coordenada, da mais próxima para a mais distante
+
+        ST_DWithin (atendido pelo índice GIST) limita as candidatas ao raio e a
+        ordenação é pela distância geográfica em metros, a mesma informada na
+        resposta (<-> em graus encurta a longitude e pode trocar as mais próximas).
+        open_at_minute é um minuto da semana (ver utils/opening_hours.py).
+        Retorna [(experiência, distância em km)].
+        """
+        origin = func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326)
+        distance_m = func.ST_Distance(
+            func.Geography(cls.location), func.Geography(origin)
+        ).label('distance_m')
+
+        query = db.session.query(cls, distance_m).filter(cls.within_meters(origin, radius_km * 1000, latitude))
+        query = cls.apply_filters(query, category_id, min_rating, open_at_minute)
+
+        rows = query.order_by(distance_m, cls.id).limit(limit).all()
+        return [(experience, distance / 1000.0) for experience, distance in rows]
+
+    @classmethod
+    def find_nearby_many(cls, origins, limit=20, category_id=None, min_rating=None, open_at_minute=None):
+        """Vizinhos de várias origens em uma única consulta (LATERAL por origem)
+
+        origins é uma lista de (latitude, longitude, raio em km). Como em
+        find_nearby, cada origem ordena pela distância geográfica dentro do raio.
+        Retorna, na ordem das origens, listas de (id da experiência, distância em km).
+        """
+        rows = db.session.execute(text("""
+            WITH origins AS (
+                SELECT o.position, ST_SetSRID(ST_MakePoint(o.longitude, o.latitude), 4326) AS geom,
+                       o.radius_m,
+                       o.radius_m / (:meters_per_degree * GREATEST(COS(RADIANS(LEAST(ABS(o.latitude), 89))), 0.01)) AS radius_deg
+                FROM unnest(CAST(:latitudes AS FLOAT8[]), CAST(:longitudes AS FLOAT8[]), CAST(:radii_m AS FLOAT8[]))
+                     WITH ORDINALITY AS o(latitude, longitude, radius_m, position)
+            )
+            SELECT o.position, n.id::text AS id, n.distance_m
+            FROM origins o
+            CROSS JOIN LATERAL (
+                SELECT r.id, ST_Distance(Geography(r.location), Geography(o.geom)) AS distance_m
+                FROM experience_read_model r
+                WHERE ST_DWithin(r.location, o.geom, o.radius_deg)
+                  AND ST_DWithin(Geography(r.location), Geography(o.geom), o.radius_m)
+                  AND (CAST(:category_id AS TEXT) IS NULL OR r.category_id = CAST(:category_id AS UUID))
+                  AND (CAST(:min_rating AS FLOAT8) IS NULL OR r.average_rating >= CAST(:min_rating AS FLOAT8))
+                  AND (CAST(:open_at_minute AS INTEGER) IS NULL OR r.opening_minutes @> CAST(:open_at_minute AS INTEGER))
+                ORDER BY distance_m, r.id
+                LIMIT :limit
+            ) n
+            ORDER BY o.position, n.distance_m
+        """), {
+            'latitudes': [latitude for latitude, _, _ in origins],
+            'longitudes': [longitude for _, longitude, _ in origins],
+            'radii_m': [radius_km * 1000 for _, _, radius_km in origins],
+            'meters_per_degree': METERS_PER_DEGREE,
+            'category_id': category_id,
+            'min_rating': min_rating or None,
+            'open_at_minute': open_at_minute,
+            'limit': limit
+        })
+
+        results = [[] for _ in origins]
+        for position, experience_id, distance_m in rows:
+            results[position - 1].append((experience_id, distance_m / 1000.0))
+        return results
+
+    @classmethod
+    def find_along_route(cls, points, width_m, limit=100, category_id=None, min_rating=None,
+                         open_at_minute=None):
+        """Experiências a até width_m metros de um trajeto, na ordem em que aparecem nele
+
+        points é a lista de (latitude, longitude) do trajeto. A linha é montada
+        uma vez (CTE) e a posição de cada experiência vem de ST_LineLocatePoint.
+        Retorna [(experiência, metros percorridos no trajeto até ela, distância até o trajeto em m)].
+        """
+        route = select(func.ST_GeomFromText(cls.route_wkt(points), 4326).label('geom')).cte('route')
+
+        route_fraction = func.ST_LineLocatePoint(route.c.geom, cls.location)
+        # A fração é planar (graus); a posição em metros é o comprimento geodésico do
+        # trecho do início do trajeto até o ponto mais próximo da experiência
+        route_position_m = func.ST_Length(
+            func.Geography(func.ST_LineSubstring(route.c.geom, 0, route_fraction))
+        ).label('route_position_m')
+        distance_m = func.ST_Distance(
+            func.Geography(cls.location), func.Geography(route.c.geom)
+        ).label('distance_m')
+
+        max_latitude = max(abs(latitude) for latitude, _ in points)
+        query = db.session.query(cls, route_position_m, distance_m)\
+            .join(route, literal(True))\
+            .filter(cls.within_meters(route.c.geom, width_m, max_latitude))
+        query = cls.apply_filters(query, category_id, min_rating, open_at_minute)
+
+        rows = query.order_by(route_fraction, distance_m).limit(limit).all()
+        return [(experience, position, distance) for experience, position, distance in rows]
+
+    @staticmethod
+    def route_wkt(points):
+        return 'LINESTRING({})'.format(', '.join(f'{longitude} {latitude}' for latitude, longitude in points))
+
+    @classmethod
+    def route_length_m(cls, points):
+        """Comprimento geodésico do trajeto em metros (mesma medida de route_position_m)"""
+        return db.session.execute(
+            select(func.ST_Length(func.Geography(func.ST_GeomFromText(cls.route_wkt(points), 4326))))
+        ).scalar()
+
+class ExperienceNeighbor(db.Model):
+    """Experiências mais próximas de cada experiência, mantidas por triggers no banco. Somente leitura."""
+    __tablename__ = 'experience_neighbors'
+
+    experience_id = db.Column(db.String(36), primary_key=True)
+    scope = db.Column(db.String(10), primary_key=True)  # 'all' ou 'category' (mesma categoria)
+    rank = db.Column(db.SmallInteger, primary_key=True)
+    neighbor_id = db.Column(db.String(36), nullable=False)
+    distance_m = db.Column(db.Float, nullable=False)
+
+    @classmethod
+    def find_for(cls, experience_id, scope='all', limit=NEIGHBOR_COUNT):
+        """Vizinhos já ordenados: uma leitura pela chave primária e o join com a projeção de leitura
+
+        Retorna [(experiência da projeção de leitura, distância em km)].
+        """
+        rows = db.session.query(ExperienceReadModel, cls.distance_m)\
+            .join(cls, cls.neighbor_id == ExperienceReadModel.id)\
+            .filter(cls.experience_id == experience_id, cls.scope == scope)\
+            .order_by(cls.rank)\
+            .limit(limit).all()
+        return [(experience, distance / 1000.0) for experience, distance in rows]
@@ -0,0 +1,95 @@
+from src.models.experience import Experience, db
+from datetime import datetime
+import uuid
+
+# Quantidade de erros retornados junto com o status do job
+JOB_ERRORS_PREVIEW = 100
+# Linhas buscadas por vez ao exportar o relatório de erros (cursor do servidor)
+JOB_ERRORS_FETCH_SIZE = 2000
+
+class BulkImportJob(db.Model):
+    """Job de importação em lote de experiências, processado em partes por um worker"""
+    __tablename__ = 'bulk_import_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    filename = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.Text, nullable=False)
+    file_format = db.Column(db.String(10), nullable=False)  # csv, xlsx, xls
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed
+    created_by = db.Column(db.String(36))  # User ID
+    mode = db.Column(db.String(10), nullable=False, default='insert')  # insert, upsert
+    match_radius_m = db.Column(db.Integer)  # Raio do casamento por nome no modo upsert
+    chunk_size = db.Column(db.Integer, nullable=False)
+    chunks_committed = db.Column(db.Integer, nullable=False, default=0)  # Ponto de retomada após falha
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    created_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    unchanged_count = db.Column(db.Integer, nullable=False, default=0)
+    error_count = db.Column(db.Integer, nullable=False, default=0)
+    error_message = db.Column(db.Text)  # Erro fatal que interrompeu o job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def created_ids(self):
+        """Ids das experiências criadas pelo job (sem carregar os objetos)"""
+        rows = db.session.query(Experience.id).filter(Experience.import_job_id == self.id).all()
+        return [str(row[0]) for row in rows]
+
+    def iter_errors(self):
+        """Percorre os erros do job em ordem de linha com cursor do servidor
+
+        Retorna tuplas (linha, mensagem) sem carregar o relatório inteiro em memória.
+        """
+        query = db.session.query(BulkImportJobError.row_number, BulkImportJobError.message)\
+            .filter(BulkImportJobError.job_id == self.id)\
+            .order_by(BulkImportJobError.row_number.asc(), BulkImportJobError.id.asc())\
+            .yield_per(JOB_ERRORS_FETCH_SIZE)
+        for row_number, message in query:
+            yield row_number, message
+
+    def to_dict(self, errors_limit=JOB_ERRORS_PREVIEW, include_created_ids=False):
+        errors = BulkImportJobError.query.filter_by(job_id=self.id)\
+            .order_by(BulkImportJobError.row_number.asc())\
+            .limit(errors_limit).all()
+        data = {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'created_by': self.created_by,
+            'mode': self.mode,
+            'match_radius_m': self.match_radius_m,
+            'chunk_size': self.chunk_size,
+            'chunks_committed': self.chunks_committed,
+            'rows_processed': self.rows_processed,
+            'created_count': self.created_count,
+            'updated_count': self.updated_count,
+            'unchanged_count': self.unchanged_count,
+            'error_count': self.error_count,
+            'errors': [f'Linha {error.row_number}: {error.message}' for error in errors],
+            'errors_truncated': self.error_count > len(errors),
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_created_ids:
+            data['created_ids'] = self.created_ids()
+        return data
+
+    def __repr__(self):
+        return f'<BulkImportJob {self.id} - {self.status}>'
+
+class BulkImportJobError(db.Model):
+    """Erros de validação por linha de um job de importação"""
+    __tablename__ = 'bulk_import_job_errors'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id = db.Column(db.String(36), db.ForeignKey('bulk_import_jobs.id', ondelete='CASCADE'), nullable=False, index=True)
+    row_number = db.Column(db.Integer, nullable=False)  # Linha na planilha (cabeçalho = 1)
+    message = db.Column(db.Text, nullable=False)
+
+    def __repr__(self):
+        return f'<BulkImportJobError {self.job_id} - Linha {self.row_number}>'
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
-from src.models.experience import ExperienceCategory, db
+from src.models.experience import Experience, ExperienceCategory, db
+from src.utils.experience_cache import experience_cache
 import traceback
 from flask import current_app as app
 
@@ -101,6 +102,10 @@ def update_category(category_id):
         
         db.session.commit()
         
+        # A categoria vai embutida no JSON das experiências em cache
+        experience_ids = [row[0] for row in db.session.query(Experience.id).filter(Experience.category_id == category_id)]
+        experience_cache.invalidate(*experience_ids)
+        
         return jsonify({
             'message': 'Categoria atualizada com sucesso',
             'category': category.to_dict()
@@ -1,17 +1,138 @@
-from flask import Blueprint, request, jsonify, current_app
-from src.models.experience import Experience, ExperienceCategory, db
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from src.models.experience import (
+    Experience, ExperienceCategory, ExperienceNeighbor, ExperienceReadModel, HEATMAP_PRECISIONS,
+    NEIGHBOR_COUNT, NEIGHBOR_SCOPES, db
+)
+from src.utils.cache import TTLCache
+from src.utils.experience_cache import experience_cache
+from src.utils.similarity import SIMILARITY_TOP_K
+from src.utils.similarity_sync import similarity_state
+from src.utils.opening_hours import parse_open_at
+from src.utils.polyline import decode_polyline
+from taiglo_shared.pagination import InvalidCursor, keyset_paginate, estimate_count
+from src.models.import_job import BulkImportJob, JOB_ERRORS_PREVIEW
+from src.utils.import_worker import IMPORT_CHUNK_SIZE, submit_job, validate_file
+from src.utils.bulk_import import REQUIRED_COLUMNS, DEFAULT_MATCH_RADIUS_M, MAX_MATCH_RADIUS_M
+from src.utils.export import EXPORT_FORMATS, EXPORT_WRITERS, iter_export_batches
+from src.utils.photo_store import store_photos
+from taiglo_shared.photos import photo_hash, sync_photo_refs
 from datetime import datetime
+from sqlalchemy import Float, func
 import uuid
 from geoalchemy2.elements import WKTElement
 import pandas as pd
 import io
 import os
+import csv
+import json
+import itertools
+import math
+import shutil
 from werkzeug.utils import secure_filename
-from PIL import Image
 import base64
 
 experience_bp = Blueprint('experience', __name__)
 
+# Limite de erros no JSON de status do job (o relatório completo é baixado em streaming)
+JOB_ERRORS_MAX_LIMIT = 1000
+ERROR_REPORT_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+def parse_category_id(value):
+    """category_id normalizado (ou None se vazio); ValueError se não for um UUID
+    
+    Valida antes de chegar ao banco: CAST(... AS UUID) com texto inválido é erro do
+    PostgreSQL e viraria 500.
+    """
+    if value in (None, ''):
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValueError('category_id inválido')
+
+def filter_experiences(args):
+    """Query da projeção de leitura com os filtros de /experiences aplicados
+    
+    Retorna (query, filtros pedidos, rank de relevância ou None). Levanta
+    ValueError para open_at ou category_id inválidos.
+    """
+    category_id = parse_category_id(args.get('category_id'))
+    is_hidden_gem = args.get('is_hidden_gem', type=bool)
+    min_rating = args.get('min_rating', type=float)
+    price_range = args.get('price_range', type=int)
+    search = args.get('search', '').strip()
+    open_at = args.get('open_at')
+    
+    open_at_minute = parse_open_at(open_at) if open_at else None
+    
+    # Construir query
+    query = ExperienceReadModel.query
+    
+    # Aplicar filtros
+    if category_id:
+        query = query.filter(ExperienceReadModel.category_id == category_id)
+    
+    if is_hidden_gem is not None:
+        query = query.filter(ExperienceReadModel.is_hidden_gem == is_hidden_gem)
+    
+    if min_rating:
+        query = query.filter(ExperienceReadModel.average_rating >= min_rating)
+    
+    if price_range:
+        query = query.filter(ExperienceReadModel.price_range == price_range)
+    
+    if open_at_minute is not None:
+        query = query.filter(ExperienceReadModel.open_at(open_at_minute))
+    
+    search_rank = None
+    if search:
+        # Busca textual indexada (GIN em search_vector), ranqueada por relevância
+        search_query = Experience.search_query(search)
+        query = query.filter(ExperienceReadModel.search_vector.op('@@')(search_query))
+        # float8: o rank volta exato do cursor (float4 muda ao passar pelo JSON)
+        search_rank = func.ts_rank(ExperienceReadModel.search_vector, search_query).cast(Float(precision=53))
+    
+    filters = {
+        'category_id': category_id,
+        'is_hidden_gem': is_hidden_gem,
+        'min_rating': min_rating,
+        'price_range': price_range,
+        'search': search,
+        'open_at': open_at
+    }
+    return query, filters, search_rank
+
+# Contagens por faceta da mesma busca se repetem a cada página e a cada refinamento
+facets_cache = TTLCache(max_size=1024, ttl_seconds=30)
+
+def cached_facets(query, filters):
+    """Facetas do conjunto filtrado, com cache curto por combinação de filtros"""
+    # open_at=now fica no máximo o TTL do cache defasado
+    cache_key = tuple(sorted(filters.items()))
+    facets = facets_cache.get(cache_key)
+    if facets is None:
+        facets = ExperienceReadModel.facet_counts(query)
+        facets_cache.set(cache_key, facets)
+    return facets
+
+@experience_bp.route('/experiences/facets', methods=['GET'])
+def get_experience_facets():
+    """Contagens por categoria, faixa de preço, joia escondida e nota para os filtros de /experiences"""
+    try:
+        try:
+            query, filters, _ = filter_experiences(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'facets': cached_facets(query, filters),
+            'filters': filters
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao calcular facetas: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @experience_bp.route('/experiences', methods=['GET'])
 def get_experiences():
     """Lista todas as experiências com filtros opcionais"""
@@ -20,104 +141,321 @@ def get_experiences():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         per_page = min(per_page, 100)  # Limitar para evitar sobrecarga
+        include_facets = request.args.get('include_facets', '').lower() in ('true', '1')
         
-        # Filtros
-        category_id = request.args.get('category_id')
-        is_hidden_gem = request.args.get('is_hidden_gem', type=bool)
-        min_rating = request.args.get('min_rating', type=float)
-        price_range = request.args.get('price_range', type=int)
-        search = request.args.get('search', '').strip()
-        
-        # Construir query
-        query = Experience.query
-        
-        # Aplicar filtros
-        if category_id:
-            query = query.filter(Experience.category_id == category_id)
-        
-        if is_hidden_gem is not None:
-            query = query.filter(Experience.is_hidden_gem == is_hidden_gem)
+        try:
+            query, filters, search_rank = filter_experiences(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        search = filters['search']
         
-        if min_rating:
-            query = query.filter(Experience.average_rating >= min_rating)
+        # Ordenação (com busca, o padrão é por relevância)
+        sort_by = request.args.get('sort_by', 'relevance' if search else 'created_at')
+        sort_order = request.args.get('sort_order', 'desc')
         
-        if price_range:
-            query = query.filter(Experience.price_range == price_range)
+        # Paginação por cursor (keyset): sem OFFSET e sem COUNT por página
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total')  # 'exact' ou 'estimate'
         
-        if search:
-            query = query.filter(
-                db.or_(
-                    Experience.name.ilike(f'%{search}%'),
-                    Experience.description.ilike(f'%{search}%'),
-                    Experience.address.ilike(f'%{search}%')
+        if cursor is not None or request.args.get('pagination') == 'cursor':
+            total = None
+            if include_total == 'exact':
+                total = query.order_by(None).count()
+            elif include_total == 'estimate':
+                total = estimate_count(query)
+            
+            if sort_by == 'relevance' and search_rank is not None:
+                rows, next_cursor = keyset_paginate(
+                    query.add_columns(search_rank.label('search_rank')),
+                    search_rank, ExperienceReadModel.id, sort_by, sort_order, per_page, cursor,
+                    value_parser=float,
+                    position_getter=lambda row: (row.search_rank, row.ExperienceReadModel.id)
                 )
-            )
-        
-        # Ordenação
-        sort_by = request.args.get('sort_by', 'created_at')
-        sort_order = request.args.get('sort_order', 'desc')
-        
-        if sort_by == 'rating':
-            if sort_order == 'asc':
-                query = query.order_by(Experience.average_rating.asc())
+                items = [row.ExperienceReadModel for row in rows]
             else:
-                query = query.order_by(Experience.average_rating.desc())
-        elif sort_by == 'name':
-            if sort_order == 'asc':
-                query = query.order_by(Experience.name.asc())
-            else:
-                query = query.order_by(Experience.name.desc())
-        else:  # created_at
-            if sort_order == 'asc':
-                query = query.order_by(Experience.created_at.asc())
-            else:
-                query = query.order_by(Experience.created_at.desc())
-        
-        # Paginar
-        experiences = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        return jsonify({
-            'experiences': [exp.to_dict() for exp in experiences.items],
-            'pagination': {
+                sort_columns = {
+                    'created_at': ExperienceReadModel.created_at,
+                    'rating': ExperienceReadModel.average_rating,
+                    'name': ExperienceReadModel.name
+                }
+                if sort_by not in sort_columns:
+                    sort_by = 'created_at'
+                items, next_cursor = keyset_paginate(
+                    query, sort_columns[sort_by], ExperienceReadModel.id, sort_by, sort_order, per_page, cursor,
+                    value_parser=datetime.fromisoformat if sort_by == 'created_at' else None
+                )
+            
+            pagination = {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None,
+                'total': total
+            }
+        else:
+            if sort_by == 'relevance' and search_rank is not None:
+                query = query.order_by(search_rank.desc(), ExperienceReadModel.id.asc())
+            elif sort_by == 'rating':
+                if sort_order == 'asc':
+                    query = query.order_by(ExperienceReadModel.average_rating.asc())
+                else:
+                    query = query.order_by(ExperienceReadModel.average_rating.desc())
+            elif sort_by == 'name':
+                if sort_order == 'asc':
+                    query = query.order_by(ExperienceReadModel.name.asc())
+                else:
+                    query = query.order_by(ExperienceReadModel.name.desc())
+            else:  # created_at
+                if sort_order == 'asc':
+                    query = query.order_by(ExperienceReadModel.created_at.asc())
+                else:
+                    query = query.order_by(ExperienceReadModel.created_at.desc())
+            
+            # Paginar
+            experiences = query.paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+            items = experiences.items
+            
+            pagination = {
                 'page': experiences.page,
                 'pages': experiences.pages,
                 'per_page': experiences.per_page,
                 'total': experiences.total,
                 'has_next': experiences.has_next,
                 'has_prev': experiences.has_prev
-            },
+            }
+        
+        experiences_data = [exp.to_dict() for exp in items]
+        
+        # Trechos destacados apenas para a página retornada
+        if search:
+            highlights = Experience.search_highlights([exp['id'] for exp in experiences_data], search)
+            for exp in experiences_data:
+                exp['search_highlight'] = highlights.get(exp['id'])
+        
+        return jsonify({
+            'experiences': experiences_data,
+            'pagination': pagination,
+            **({'facets': cached_facets(query, filters)} if include_facets else {}),
             'filters': {
-                'category_id': category_id,
-                'is_hidden_gem': is_hidden_gem,
-                'min_rating': min_rating,
-                'price_range': price_range,
-                'search': search,
+                **filters,
                 'sort_by': sort_by,
                 'sort_order': sort_order
             }
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+# Cache dos prefixos mais buscados no autocomplete
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_MAX_LIMIT = 20
+suggest_cache = TTLCache(max_size=2048, ttl_seconds=60)
+
+@experience_bp.route('/experiences/suggest', methods=['GET'])
+def suggest_experiences():
+    """Sugestões rápidas de experiências e categorias para o campo de busca"""
+    try:
+        search = ' '.join(request.args.get('q', '').split()).lower()
+        limit = request.args.get('limit', 8, type=int)
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+        
+        if len(search) < SUGGEST_MIN_LENGTH:
+            return jsonify({'query': search, 'experiences': [], 'categories': []}), 200
+        
+        cache_key = (search, limit)
+        suggestions = suggest_cache.get(cache_key)
+        if suggestions is None:
+            suggestions = Experience.suggest(search, limit)
+            suggest_cache.set(cache_key, suggestions)
+        
+        return jsonify({'query': search, **suggestions}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar sugestões: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+# Máximo de ids por requisição em /experiences/batch
+BATCH_MAX_IDS = 250
+
+@experience_bp.route('/experiences/batch', methods=['GET', 'POST'])
+def get_experiences_batch():
+    """Busca várias experiências por id em uma única consulta
+    
+    GET com ?ids=id1,id2,... ou POST com {"ids": [...]}. As experiências voltam
+    na ordem pedida (ids repetidos uma vez só) e os ids não encontrados ou
+    inválidos são listados em missing.
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            raw_ids = data.get('ids')
+            if not isinstance(raw_ids, list):
+                return jsonify({'error': 'ids deve ser uma lista'}), 400
+        else:
+            raw_ids = [part for value in request.args.getlist('ids') for part in value.split(',')]
+        
+        requested_ids = list(dict.fromkeys(str(raw_id).strip() for raw_id in raw_ids if str(raw_id).strip()))
+        if not requested_ids:
+            return jsonify({'error': 'Informe ao menos um id'}), 400
+        if len(requested_ids) > BATCH_MAX_IDS:
+            return jsonify({'error': f'Máximo de {BATCH_MAX_IDS} ids por requisição'}), 400
+        
+        # Forma canônica do UUID (como o banco devolve); ids malformados não vão para a consulta
+        canonical_ids = {}
+        for requested_id in requested_ids:
+            try:
+                canonical_ids[requested_id] = str(uuid.UUID(requested_id))
+            except ValueError:
+                pass
+        
+        # Uma consulta na projeção de leitura (categoria e coordenadas sem consultas por linha)
+        experiences_by_id = {}
+        if canonical_ids:
+            rows = ExperienceReadModel.query.filter(
+                ExperienceReadModel.id.in_(set(canonical_ids.values()))
+            ).all()
+            experiences_by_id = {row.id: row.to_dict() for row in rows}
+        
+        experiences = []
+        missing = []
+        for requested_id in requested_ids:
+            experience = experiences_by_id.get(canonical_ids.get(requested_id))
+            if experience is None:
+                missing.append(requested_id)
+            else:
+                experiences.append(experience)
+        
+        return jsonify({
+            'experiences': experiences,
+            'missing': missing,
+            'total_found': len(experiences)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar experiências em lote: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @experience_bp.route('/experiences/<experience_id>', methods=['GET'])
 def get_experience(experience_id):
     """Busca uma experiência específica"""
     try:
-        experience = Experience.query.get(experience_id)
+        # JSON já serializado (cache local e Redis), invalidado nas escritas
+        payload = experience_cache.get(experience_id)
+        cache_status = 'HIT'
+        
+        if payload is None:
+            # Lida antes do banco: uma invalidação durante a consulta descarta o JSON
+            generation = experience_cache.generation(experience_id)
+            experience = Experience.query.get(experience_id)
+            
+            if not experience:
+                return jsonify({'error': 'Experiência não encontrada'}), 404
+            
+            payload = json.dumps({'experience': experience.to_dict()}, ensure_ascii=False)
+            experience_cache.set(experience_id, payload, generation)
+            cache_status = 'MISS'
         
-        if not experience:
+        response = Response(payload, status=200, mimetype='application/json')
+        response.headers['X-Cache'] = cache_status
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@experience_bp.route('/admin/experiences/cache', methods=['GET'])
+def admin_get_experience_cache_stats():
+    """Contadores de acertos e falhas do cache de experiências deste processo"""
+    return jsonify({'cache': experience_cache.stats()}), 200
+
+@experience_bp.route('/experiences/<experience_id>/neighbors', methods=['GET'])
+def get_experience_neighbors(experience_id):
+    """Experiências mais próximas de uma experiência (até 5km), lidas da lista pré-calculada"""
+    try:
+        scope = request.args.get('scope', 'all')
+        limit = request.args.get('limit', NEIGHBOR_COUNT, type=int)
+        
+        if scope not in NEIGHBOR_SCOPES:
+            return jsonify({'error': f'scope deve ser um de: {", ".join(NEIGHBOR_SCOPES)}'}), 400
+        
+        limit = max(1, min(limit, NEIGHBOR_COUNT))
+        
+        try:
+            experience_id = str(uuid.UUID(experience_id))
+        except ValueError:
+            return jsonify({'error': 'Experiência não encontrada'}), 404
+        
+        neighbors = ExperienceNeighbor.find_for(experience_id, scope, limit)
+        
+        # Lista vazia: experiência isolada ou inexistente
+        if not neighbors and not ExperienceReadModel.query.get(experience_id):
             return jsonify({'error': 'Experiência não encontrada'}), 404
         
         return jsonify({
-            'experience': experience.to_dict()
+            'experience_id': experience_id,
+            'scope': scope,
+            'neighbors': [
+                experience.to_dict(include_distance=True, distance=distance)
+                for experience, distance in neighbors
+            ],
+            'total_found': len(neighbors)
         }), 200
         
     except Exception as e:
+        current_app.logger.error(f"Erro ao buscar vizinhos da experiência: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@experience_bp.route('/experiences/<experience_id>/similar', methods=['GET'])
+def get_similar_experiences(experience_id):
+    """Experiências parecidas (texto de nome e descrição, categoria e preço), lidas do índice em memória"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        limit = max(1, min(limit, SIMILARITY_TOP_K))
+        
+        try:
+            experience_id = str(uuid.UUID(experience_id))
+        except ValueError:
+            return jsonify({'error': 'Experiência não encontrada'}), 404
+        
+        index = similarity_state.index
+        if index is None:
+            return jsonify({'error': 'Índice de similaridade ainda em construção'}), 503
+        
+        similar = index.similar(experience_id, limit)
+        if similar is None:
+            # Criada depois da última sincronização do índice, ou inexistente
+            if ExperienceReadModel.query.get(experience_id):
+                return jsonify({'error': 'Experiência ainda não indexada'}), 503
+            return jsonify({'error': 'Experiência não encontrada'}), 404
+        
+        experiences = {
+            experience.id: experience
+            for experience in ExperienceReadModel.query.filter(
+                ExperienceReadModel.id.in_([similar_id for similar_id, _ in similar])
+            ).all()
+        }
+        
+        results = []
+        for similar_id, score in similar:
+            # Removida do banco e ainda não do índice
+            if similar_id not in experiences:
+                continue
+            data = experiences[similar_id].to_dict()
+            data['similarity'] = round(score, 4)
+            results.append(data)
+        
+        return jsonify({
+            'experience_id': experience_id,
+            'similar': results,
+            'total_found': len(results)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar experiências parecidas: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @experience_bp.route('/experiences/nearby', methods=['GET'])
@@ -136,31 +474,28 @@ def get_nearby_experiences():
         limit = request.args.get('limit', 50, type=int)
         category_id = request.args.get('category_id')
         min_rating = request.args.get('min_rating', type=float)
+        open_at = request.args.get('open_at')
+        
+        try:
+            category_id = parse_category_id(category_id)
+            open_at_minute = parse_open_at(open_at) if open_at else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Limitar valores para evitar sobrecarga
         radius_km = min(radius_km, 50)  # Máximo 50km
         limit = min(limit, 100)  # Máximo 100 resultados
         
-        # Buscar experiências próximas
-        nearby_results = Experience.find_nearby(latitude, longitude, radius_km, limit)
-        
-        # Aplicar filtros adicionais se necessário
-        filtered_results = []
-        for experience, distance in nearby_results:
-            # Filtro por categoria
-            if category_id and experience.category_id != category_id:
-                continue
-            
-            # Filtro por rating mínimo
-            if min_rating and experience.average_rating < min_rating:
-                continue
-            
-            filtered_results.append((experience, distance))
+        # Busca e filtros no banco (índice GIST da projeção de leitura)
+        nearby_results = ExperienceReadModel.find_nearby(
+            latitude, longitude, radius_km, limit, category_id=category_id, min_rating=min_rating,
+            open_at_minute=open_at_minute
+        )
         
         return jsonify({
             'experiences': [
                 exp.to_dict(include_distance=True, distance=dist) 
-                for exp, dist in filtered_results
+                for exp, dist in nearby_results
             ],
             'search_params': {
                 'latitude': latitude,
@@ -168,12 +503,306 @@ def get_nearby_experiences():
                 'radius_km': radius_km,
                 'limit': limit,
                 'category_id': category_id,
-                'min_rating': min_rating
+                'min_rating': min_rating,
+                'open_at': open_at
+            },
+            'total_found': len(nearby_results)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+# Busca de proximidade em lote (roteiros com várias paradas)
+NEARBY_BATCH_MAX_ORIGINS = 50
+NEARBY_BATCH_MAX_LIMIT = 50
+
+@experience_bp.route('/experiences/nearby/batch', methods=['POST'])
+def get_nearby_experiences_batch():
+    """Busca experiências próximas a várias coordenadas de uma vez
+    
+    Corpo JSON: {"origins": [{"latitude", "longitude", "radius_km"?}], "radius_km",
+    "limit" (por origem), "category_id", "min_rating", "open_at"}. Cada
+    experiência é serializada uma vez em experiences (por id); cada origem
+    lista apenas ids e distâncias.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        raw_origins = data.get('origins')
+        
+        if not isinstance(raw_origins, list) or not raw_origins:
+            return jsonify({'error': 'origins deve ser uma lista com ao menos uma coordenada'}), 400
+        if len(raw_origins) > NEARBY_BATCH_MAX_ORIGINS:
+            return jsonify({'error': f'Máximo de {NEARBY_BATCH_MAX_ORIGINS} origens por requisição'}), 400
+        
+        try:
+            default_radius_km = float(data.get('radius_km', 5))
+            limit = int(data.get('limit', 20))
+            min_rating = float(data['min_rating']) if data.get('min_rating') is not None else None
+            origins = []
+            for origin in raw_origins:
+                latitude = float(origin['latitude'])
+                longitude = float(origin['longitude'])
+                radius_km = float(origin.get('radius_km', default_radius_km))
+                if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                    return jsonify({'error': 'Coordenadas fora do intervalo válido'}), 400
+                # Limitar valores para evitar sobrecarga
+                origins.append((latitude, longitude, max(0.01, min(radius_km, 50))))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return jsonify({'error': 'Cada origem precisa de latitude e longitude numéricas'}), 400
+        
+        category_id = data.get('category_id')
+        open_at = data.get('open_at')
+        try:
+            category_id = parse_category_id(category_id)
+            open_at_minute = parse_open_at(open_at) if open_at else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        limit = max(1, min(limit, NEARBY_BATCH_MAX_LIMIT))
+        
+        results = ExperienceReadModel.find_nearby_many(
+            origins, limit, category_id=category_id, min_rating=min_rating, open_at_minute=open_at_minute
+        )
+        
+        # Experiências repetidas entre origens são carregadas e serializadas uma vez
+        experience_ids = {experience_id for origin_results in results for experience_id, _ in origin_results}
+        experiences = {}
+        if experience_ids:
+            experiences = {
+                experience.id: experience.to_dict()
+                for experience in ExperienceReadModel.query.filter(ExperienceReadModel.id.in_(experience_ids))
+            }
+        
+        origins_data = []
+        for (latitude, longitude, radius_km), origin_results in zip(origins, results):
+            # Removidas entre as duas consultas ficam de fora (e da contagem)
+            found = [
+                {'id': experience_id, 'distance_km': round(distance_km, 2)}
+                for experience_id, distance_km in origin_results
+                if experience_id in experiences
+            ]
+            origins_data.append({
+                'latitude': latitude,
+                'longitude': longitude,
+                'radius_km': radius_km,
+                'results': found,
+                'total_found': len(found)
+            })
+        
+        return jsonify({
+            'origins': origins_data,
+            'experiences': experiences,
+            'search_params': {
+                'limit': limit,
+                'category_id': category_id,
+                'min_rating': min_rating,
+                'open_at': open_at
+            },
+            'total_experiences': len(experiences)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro na busca de proximidade em lote: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+# Busca ao longo de um trajeto (polyline)
+ROUTE_MAX_POINTS = 5000
+ROUTE_DEFAULT_WIDTH_M = 300
+ROUTE_MAX_WIDTH_M = 5000
+
+@experience_bp.route('/experiences/along-route', methods=['GET', 'POST'])
+def get_experiences_along_route():
+    """Busca experiências em um corredor ao redor de um trajeto, na ordem do percurso
+    
+    Parâmetros na query (GET) ou no corpo JSON (POST, para trajetos longos):
+    polyline (encoded polyline), precision (5 ou 6), width_m (distância máxima
+    até o trajeto), limit, category_id, min_rating e open_at.
+    """
+    try:
+        params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        
+        encoded = params.get('polyline')
+        if not encoded:
+            return jsonify({'error': 'polyline é obrigatório'}), 400
+        
+        try:
+            precision = int(params.get('precision', 5))
+            width_m = float(params.get('width_m', ROUTE_DEFAULT_WIDTH_M))
+            limit = int(params.get('limit', 100))
+            min_rating = float(params['min_rating']) if params.get('min_rating') not in (None, '') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'precision, width_m, limit e min_rating devem ser números'}), 400
+        
+        if precision not in (5, 6):
+            return jsonify({'error': 'precision deve ser 5 ou 6'}), 400
+        
+        try:
+            points = decode_polyline(encoded, precision)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Pontos repetidos em sequência não mudam o trajeto
+        points = [point for index, point in enumerate(points) if index == 0 or point != points[index - 1]]
+        if len(points) < 2:
+            return jsonify({'error': 'O trajeto precisa de pelo menos dois pontos distintos'}), 400
+        if len(points) > ROUTE_MAX_POINTS:
+            return jsonify({'error': f'O trajeto pode ter no máximo {ROUTE_MAX_POINTS} pontos'}), 400
+        if any(not (-90 <= latitude <= 90 and -180 <= longitude <= 180) for latitude, longitude in points):
+            return jsonify({'error': 'Coordenadas do trajeto fora do intervalo válido'}), 400
+        
+        category_id = params.get('category_id')
+        open_at = params.get('open_at')
+        try:
+            category_id = parse_category_id(category_id)
+            open_at_minute = parse_open_at(open_at) if open_at else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Limitar valores para evitar sobrecarga
+        width_m = max(1, min(width_m, ROUTE_MAX_WIDTH_M))
+        limit = max(1, min(limit, 200))
+        
+        results = ExperienceReadModel.find_along_route(
+            points, width_m, limit, category_id=category_id, min_rating=min_rating,
+            open_at_minute=open_at_minute
+        )
+        
+        route_length_km = ExperienceReadModel.route_length_m(points) / 1000
+        
+        experiences = []
+        for experience, position_m, distance_m in results:
+            experience_dict = experience.to_dict()
+            experience_dict['route_position_km'] = round(position_m / 1000, 2)
+            experience_dict['distance_from_route_m'] = round(distance_m)
+            experiences.append(experience_dict)
+        
+        return jsonify({
+            'experiences': experiences,
+            'route': {
+                'points': len(points),
+                'length_km': round(route_length_km, 2)
+            },
+            'search_params': {
+                'width_m': width_m,
+                'limit': limit,
+                'category_id': category_id,
+                'min_rating': min_rating,
+                'open_at': open_at
             },
-            'total_found': len(filtered_results)
+            'total_found': len(experiences)
         }), 200
         
     except Exception as e:
+        current_app.logger.error(f"Erro na busca ao longo do trajeto: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@experience_bp.route('/experiences/in-bounds', methods=['GET'])
+def get_experiences_in_bounds():
+    """Busca experiências dentro da área visível do mapa, agrupadas quando densas"""
+    try:
+        # Parâmetros obrigatórios
+        min_lat = request.args.get('min_lat', type=float)
+        min_lng = request.args.get('min_lng', type=float)
+        max_lat = request.args.get('max_lat', type=float)
+        max_lng = request.args.get('max_lng', type=float)
+
+        if None in (min_lat, min_lng, max_lat, max_lng):
+            return jsonify({'error': 'min_lat, min_lng, max_lat e max_lng são obrigatórios'}), 400
+
+        if not (-90 <= min_lat < max_lat <= 90):
+            return jsonify({'error': 'Latitudes devem estar entre -90 e 90 com min_lat < max_lat'}), 400
+
+        if not (-180 <= min_lng < max_lng <= 180):
+            return jsonify({'error': 'Longitudes devem estar entre -180 e 180 com min_lng < max_lng'}), 400
+
+        # Parâmetros opcionais
+        zoom = request.args.get('zoom', 12, type=int)
+        try:
+            category_id = parse_category_id(request.args.get('category_id'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Limitar zoom ao intervalo usado pelos mapas web
+        zoom = max(0, min(zoom, 22))
+
+        mode, features = Experience.find_in_bounds(
+            min_lat, min_lng, max_lat, max_lng, zoom, category_id
+        )
+
+        return jsonify({
+            'mode': mode,
+            'experiences': features if mode == 'points' else [],
+            'clusters': features if mode == 'clusters' else [],
+            'search_params': {
+                'min_lat': min_lat,
+                'min_lng': min_lng,
+                'max_lat': max_lat,
+                'max_lng': max_lng,
+                'zoom': zoom,
+                'category_id': category_id
+            },
+            'total_features': len(features)
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar experiências na área: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+# Mapa de calor: a área é alinhada à grade de células para reaproveitar o cache ao mover o mapa
+HEATMAP_MAX_RESPONSE_CELLS = 5000
+heatmap_cache = TTLCache(max_size=512, ttl_seconds=60)
+
+@experience_bp.route('/experiences/heatmap', methods=['GET'])
+def get_experiences_heatmap():
+    """Mapa de calor de experiências, reviews e nota média por célula geohash
+    
+    bbox=min_lng,min_lat,max_lng,max_lat; resolution é a precisão do geohash
+    (3 a 7). Sem resolution, usa a mais fina que mantém a área em até
+    HEATMAP_MAX_CELLS células.
+    """
+    try:
+        try:
+            min_lng, min_lat, max_lng, max_lat = [float(value) for value in request.args.get('bbox', '').split(',')]
+        except ValueError:
+            return jsonify({'error': 'bbox deve ser min_lng,min_lat,max_lng,max_lat'}), 400
+        
+        if not (-90 <= min_lat < max_lat <= 90):
+            return jsonify({'error': 'Latitudes devem estar entre -90 e 90 com min_lat < max_lat'}), 400
+        
+        if not (-180 <= min_lng < max_lng <= 180):
+            return jsonify({'error': 'Longitudes devem estar entre -180 e 180 com min_lng < max_lng'}), 400
+        
+        precision = request.args.get('resolution', type=int)
+        if precision is None:
+            precision = ExperienceReadModel.heatmap_precision(min_lat, min_lng, max_lat, max_lng)
+        elif precision not in HEATMAP_PRECISIONS:
+            return jsonify({'error': f'resolution deve estar entre {HEATMAP_PRECISIONS[0]} e {HEATMAP_PRECISIONS[-1]}'}), 400
+        
+        # Alinhar a área às bordas das células da precisão escolhida
+        cell_width, cell_height = ExperienceReadModel.geohash_cell_size(precision)
+        min_lng = max(-180.0, math.floor((min_lng + 180) / cell_width) * cell_width - 180)
+        max_lng = min(180.0, math.ceil((max_lng + 180) / cell_width) * cell_width - 180)
+        min_lat = max(-90.0, math.floor((min_lat + 90) / cell_height) * cell_height - 90)
+        max_lat = min(90.0, math.ceil((max_lat + 90) / cell_height) * cell_height - 90)
+        
+        if (max_lng - min_lng) / cell_width * (max_lat - min_lat) / cell_height > HEATMAP_MAX_RESPONSE_CELLS:
+            return jsonify({'error': 'Área grande demais para essa resolution'}), 400
+        
+        cache_key = (precision, min_lng, min_lat, max_lng, max_lat)
+        cells = heatmap_cache.get(cache_key)
+        if cells is None:
+            cells = ExperienceReadModel.heatmap(min_lat, min_lng, max_lat, max_lng, precision)
+            heatmap_cache.set(cache_key, cells)
+        
+        return jsonify({
+            'cells': cells,
+            'resolution': precision,
+            'bbox': [min_lng, min_lat, max_lng, max_lat],
+            'total_cells': len(cells)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao gerar mapa de calor: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @experience_bp.route('/experiences', methods=['POST'])
@@ -285,6 +914,7 @@ def update_experience(experience_id):
         
         experience.updated_at = datetime.utcnow()
         db.session.commit()
+        experience_cache.invalidate(experience_id)
         
         return jsonify({
             'message': 'Experiência atualizada com sucesso',
@@ -304,8 +934,10 @@ def delete_experience(experience_id):
         if not experience:
             return jsonify({'error': 'Experiência não encontrada'}), 404
         
+        sync_photo_refs(db.session, 'experience', experience.id, [])
         db.session.delete(experience)
         db.session.commit()
+        experience_cache.invalidate(experience_id)
         
         return jsonify({
             'message': 'Experiência deletada com sucesso'
@@ -317,6 +949,99 @@ def delete_experience(experience_id):
 
 # ==================== ROTAS DE ADMIN ====================
 
+def error_report_response(errors, report_format, filename):
+    """Resposta em streaming com os erros (linha, mensagem) em NDJSON ou CSV"""
+    def generate():
+        if report_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(['row', 'message'])
+            for row_number, message in errors:
+                writer.writerow([row_number, message])
+                # Enviar em blocos para não acumular o relatório em memória
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate(0)
+            yield buffer.getvalue()
+        else:
+            for row_number, message in errors:
+                yield json.dumps({'row': row_number, 'message': message}, ensure_ascii=False) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=ERROR_REPORT_MIMETYPES[report_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{report_format}'}
+    )
+
+def bulk_upload_dry_run(file, file_extension, mode):
+    """Valida a planilha inteira sem gravar nada e devolve o relatório de erros
+    
+    Por padrão retorna um resumo JSON com os primeiros erros; com report=ndjson|csv
+    o relatório completo é gerado em streaming enquanto o arquivo é lido.
+    """
+    report_format = (request.form.get('report') or request.args.get('report') or '').lower()
+    if report_format and report_format not in ERROR_REPORT_MIMETYPES:
+        return jsonify({'error': 'Formato de relatório inválido. Use ndjson ou csv'}), 400
+    
+    import_dir = current_app.config['BULK_IMPORT_DIR']
+    os.makedirs(import_dir, exist_ok=True)
+    file_path = os.path.join(import_dir, f'dry-run-{uuid.uuid4()}.{file_extension}')
+    file.save(file_path)
+    
+    def remove_file():
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+    
+    try:
+        chunks = validate_file(file_path, file_extension, mode)
+        # Ler a primeira parte já aqui para que colunas ausentes virem um 400
+        first_chunk = next(chunks, None)
+    except ValueError as e:
+        remove_file()
+        return jsonify({'error': str(e), 'required_columns': REQUIRED_COLUMNS}), 400
+    except Exception:
+        remove_file()
+        raise
+    
+    all_chunks = itertools.chain([first_chunk] if first_chunk else [], chunks)
+    
+    if report_format:
+        def iter_errors():
+            try:
+                for _, _, row_errors in all_chunks:
+                    yield from row_errors
+            finally:
+                remove_file()
+        
+        return error_report_response(iter_errors(), report_format, 'bulk-upload-dry-run-errors')
+    
+    rows_processed = valid_count = error_count = 0
+    errors = []
+    errors_limit = min(request.args.get('errors_limit', JOB_ERRORS_PREVIEW, type=int), JOB_ERRORS_MAX_LIMIT)
+    try:
+        for chunk_rows, chunk_valid, row_errors in all_chunks:
+            rows_processed += chunk_rows
+            valid_count += chunk_valid
+            error_count += len(row_errors)
+            # Guardar só os primeiros erros; o total é contado
+            errors.extend(f'Linha {row}: {message}' for row, message in row_errors[:max(errors_limit - len(errors), 0)])
+    finally:
+        remove_file()
+    
+    return jsonify({
+        'message': f'Validação concluída. {valid_count} linhas válidas, {error_count} com erro. Nada foi gravado.',
+        'dry_run': True,
+        'mode': mode,
+        'rows_processed': rows_processed,
+        'valid_count': valid_count,
+        'error_count': error_count,
+        'errors': errors,
+        'errors_truncated': error_count > len(errors)
+    }), 200
+
 @experience_bp.route('/admin/experiences/bulk-upload', methods=['POST'])
 def admin_bulk_upload_experiences():
     """Upload em lote de experiências via planilha (Excel/CSV)"""
@@ -342,113 +1067,157 @@ def admin_bulk_upload_experiences():
         if file_extension not in allowed_extensions:
             return jsonify({'error': 'Formato de arquivo não suportado. Use Excel (.xlsx, .xls) ou CSV (.csv)'}), 400
         
-        # Ler o arquivo
-        try:
-            current_app.logger.info(f"Lendo arquivo {file_extension}")
-            if file_extension == 'csv':
-                df = pd.read_csv(file)
-            else:
-                df = pd.read_excel(file)
-            current_app.logger.info(f"Arquivo lido com {len(df)} linhas")
-        except Exception as e:
-            current_app.logger.error(f"Erro ao ler arquivo: {str(e)}")
-            return jsonify({'error': f'Erro ao ler arquivo: {str(e)}'}), 400
-        
-        # Validar colunas obrigatórias
-        required_columns = ['name', 'description', 'address', 'latitude', 'longitude']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            current_app.logger.error(f"Colunas ausentes: {missing_columns}")
-            return jsonify({
-                'error': f'Colunas obrigatórias ausentes: {", ".join(missing_columns)}',
-                'required_columns': required_columns,
-                'available_columns': list(df.columns)
-            }), 400
-        
-        current_app.logger.info("Iniciando processamento das linhas")
-        
-        # Processar cada linha
-        created_experiences = []
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Validar dados obrigatórios
-                if pd.isna(row['name']) or pd.isna(row['description']) or pd.isna(row['address']):
-                    errors.append(f'Linha {index + 2}: Campos obrigatórios não podem estar vazios')
-                    continue
-                
-                # Validar coordenadas
-                try:
-                    latitude = float(row['latitude'])
-                    longitude = float(row['longitude'])
-                    
-                    if not (-90 <= latitude <= 90):
-                        errors.append(f'Linha {index + 2}: Latitude deve estar entre -90 e 90')
-                        continue
-                    
-                    if not (-180 <= longitude <= 180):
-                        errors.append(f'Linha {index + 2}: Longitude deve estar entre -180 e 180')
-                        continue
-                    
-                    point = WKTElement(f'POINT({longitude} {latitude})', srid=4326)
-                except (ValueError, TypeError):
-                    errors.append(f'Linha {index + 2}: Latitude e longitude devem ser números válidos')
-                    continue
-                
-                # Validar categoria se fornecida
-                category_id = None
-                if 'category_id' in df.columns and not pd.isna(row['category_id']):
-                    category = ExperienceCategory.query.get(row['category_id'])
-                    if not category:
-                        errors.append(f'Linha {index + 2}: Categoria não encontrada')
-                        continue
-                    category_id = row['category_id']
-                
-                # Criar experiência
-                experience = Experience(
-                    name=str(row['name']).strip(),
-                    description=str(row['description']).strip(),
-                    category_id=category_id,
-                    address=str(row['address']).strip(),
-                    location=point,
-                    phone=str(row['phone']).strip() if 'phone' in df.columns and not pd.isna(row['phone']) else None,
-                    website_url=str(row['website_url']).strip() if 'website_url' in df.columns and not pd.isna(row['website_url']) else None,
-                    instagram_handle=str(row['instagram_handle']).strip() if 'instagram_handle' in df.columns and not pd.isna(row['instagram_handle']) else None,
-                    opening_hours=row['opening_hours'] if 'opening_hours' in df.columns and not pd.isna(row['opening_hours']) else {},
-                    price_range=int(row['price_range']) if 'price_range' in df.columns and not pd.isna(row['price_range']) else None,
-                    is_hidden_gem=bool(row['is_hidden_gem']) if 'is_hidden_gem' in df.columns and not pd.isna(row['is_hidden_gem']) else False,
-                    created_by=request.args.get('created_by')  # ID do admin que fez o upload
-                )
-                
-                db.session.add(experience)
-                created_experiences.append(experience)
-                
-            except Exception as e:
-                errors.append(f'Linha {index + 2}: {str(e)}')
-                continue
+        # Modo de importação: insert (sempre cria) ou upsert (atualiza as já existentes)
+        mode = (request.form.get('mode') or request.args.get('mode') or 'insert').lower()
+        if mode not in ('insert', 'upsert'):
+            return jsonify({'error': 'Modo inválido. Use insert ou upsert'}), 400
         
-        # Commit das experiências válidas
-        if created_experiences:
-            current_app.logger.info(f"Fazendo commit de {len(created_experiences)} experiências")
-            db.session.commit()
-            current_app.logger.info("Commit realizado com sucesso")
+        match_radius_m = None
+        if mode == 'upsert':
+            try:
+                match_radius_m = int(request.form.get('match_radius') or request.args.get('match_radius') or DEFAULT_MATCH_RADIUS_M)
+            except ValueError:
+                return jsonify({'error': 'match_radius deve ser um número inteiro (metros)'}), 400
+            if not 1 <= match_radius_m <= MAX_MATCH_RADIUS_M:
+                return jsonify({'error': f'match_radius deve estar entre 1 e {MAX_MATCH_RADIUS_M} metros'}), 400
+        
+        # dry_run: só validar, sem criar job nem gravar experiências
+        if (request.form.get('dry_run') or request.args.get('dry_run') or 'false').lower() == 'true':
+            return bulk_upload_dry_run(file, file_extension, mode)
+        
+        # Salvar o arquivo e criar o job; a leitura e a inserção acontecem em segundo plano
+        job_id = str(uuid.uuid4())
+        import_dir = current_app.config['BULK_IMPORT_DIR']
+        os.makedirs(import_dir, exist_ok=True)
+        file_path = os.path.join(import_dir, f'{job_id}.{file_extension}')
+        file.save(file_path)
+        
+        job = BulkImportJob(
+            id=job_id,
+            filename=file.filename,
+            file_path=file_path,
+            file_format=file_extension,
+            created_by=request.form.get('created_by') or request.args.get('created_by'),  # ID do admin que fez o upload
+            mode=mode,
+            match_radius_m=match_radius_m,
+            chunk_size=IMPORT_CHUNK_SIZE
+        )
+        db.session.add(job)
+        db.session.commit()
         
-        current_app.logger.info(f"Bulk upload concluído: {len(created_experiences)} criadas, {len(errors)} erros")
+        submit_job(current_app._get_current_object(), job.id)
+        current_app.logger.info(f"Job de importação {job.id} criado para {file.filename}")
         
         return jsonify({
-            'message': f'Upload concluído. {len(created_experiences)} experiências criadas.',
-            'created_count': len(created_experiences),
-            'errors': errors,
-            'created_experiences': [exp.to_dict() for exp in created_experiences]
-        }), 201
+            'message': 'Upload recebido. A importação será processada em segundo plano.',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/api/admin/experiences/bulk-upload/{job.id}',
+            'job': job.to_dict()
+        }), 202
         
     except Exception as e:
         current_app.logger.error(f"Erro no bulk upload: {str(e)}")
         db.session.rollback()
         return jsonify({'error': f'Erro interno do servidor: {str(e)}'}), 500
 
+@experience_bp.route('/admin/experiences/bulk-upload/<job_id>', methods=['GET'])
+def admin_get_bulk_upload_job(job_id):
+    """Progresso de um job de importação (linhas processadas, criadas e erros)"""
+    try:
+        job = BulkImportJob.query.get(job_id)
+        
+        if not job:
+            return jsonify({'error': 'Job de importação não encontrado'}), 404
+        
+        errors_limit = min(request.args.get('errors_limit', JOB_ERRORS_PREVIEW, type=int), JOB_ERRORS_MAX_LIMIT)
+        include_created_ids = request.args.get('include_created_ids', 'false').lower() == 'true'
+        
+        return jsonify({'job': job.to_dict(errors_limit=max(errors_limit, 0), include_created_ids=include_created_ids)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@experience_bp.route('/admin/experiences/bulk-upload/<job_id>/errors', methods=['GET'])
+def admin_download_bulk_upload_errors(job_id):
+    """Relatório completo de erros do job em NDJSON ou CSV, gerado em streaming"""
+    try:
+        job = BulkImportJob.query.get(job_id)
+        
+        if not job:
+            return jsonify({'error': 'Job de importação não encontrado'}), 404
+        
+        report_format = request.args.get('format', 'ndjson').lower()
+        if report_format not in ERROR_REPORT_MIMETYPES:
+            return jsonify({'error': 'Formato inválido. Use ndjson ou csv'}), 400
+        
+        return error_report_response(job.iter_errors(), report_format, f'bulk-upload-{job.id}-errors')
+        
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@experience_bp.route('/admin/experiences/bulk-upload/<job_id>/resume', methods=['POST'])
+def admin_resume_bulk_upload_job(job_id):
+    """Retoma um job que falhou a partir da última parte commitada"""
+    try:
+        job = BulkImportJob.query.get(job_id)
+        
+        if not job:
+            return jsonify({'error': 'Job de importação não encontrado'}), 404
+        
+        if job.status == 'completed':
+            return jsonify({'error': 'Job de importação já concluído'}), 400
+        
+        if not os.path.exists(job.file_path):
+            return jsonify({'error': 'Arquivo do job não está mais disponível'}), 410
+        
+        if job.status == 'failed':
+            job.status = 'pending'
+            job.error_message = None
+            job.finished_at = None
+            db.session.commit()
+        
+        submit_job(current_app._get_current_object(), job.id)
+        
+        return jsonify({
+            'message': 'Job de importação retomado',
+            'job': job.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@experience_bp.route('/admin/experiences/export', methods=['GET'])
+def admin_export_experiences():
+    """Exporta as experiências em CSV, NDJSON ou Parquet, em streaming
+    
+    Usa as colunas do template de upload (o arquivo pode ser reimportado, de
+    preferência no modo upsert) e lê as linhas com cursor do servidor.
+    """
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'Formato inválido. Use csv, ndjson ou parquet'}), 400
+        
+        try:
+            category_id = parse_category_id(request.args.get('category_id'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        rows = EXPORT_WRITERS[export_format](iter_export_batches(category_id or None))
+        
+        return Response(
+            stream_with_context(rows),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename=experiences_{timestamp}.{export_format}'}
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro na exportação: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @experience_bp.route('/admin/experiences/template', methods=['GET'])
 def admin_get_upload_template():
     """Retorna template para upload de experiências"""
@@ -466,7 +1235,8 @@ def admin_get_upload_template():
                 'website_url',
                 'instagram_handle',
                 'price_range',
-                'is_hidden_gem'
+                'is_hidden_gem',
+                'external_id'
             ],
             'required_columns': ['name', 'description', 'address', 'latitude', 'longitude'],
             'example_data': [
@@ -481,7 +1251,8 @@ def admin_get_upload_template():
                     'website_url': 'https://exemplo.com',
                     'instagram_handle': '@exemplo',
                     'price_range': 2,
-                    'is_hidden_gem': True
+                    'is_hidden_gem': True,
+                    'external_id': 'parceiro-123'
                 }
             ],
             'price_range_options': {
@@ -496,7 +1267,9 @@ def admin_get_upload_template():
                 '3. Latitude: -90 a 90, Longitude: -180 a 180',
                 '4. category_id: ID da categoria (opcional)',
                 '5. price_range: 1-4 (opcional)',
-                '6. is_hidden_gem: true/false (opcional)'
+                '6. is_hidden_gem: true/false (opcional)',
+                '7. external_id: código do local no sistema do parceiro (opcional); no modo upsert '
+                'atualiza a experiência com o mesmo código ou, sem código, a de mesmo nome a até match_radius metros'
             ]
         }
         
@@ -548,6 +1321,7 @@ def admin_update_experience(experience_id):
         
         experience.updated_at = datetime.utcnow()
         db.session.commit()
+        experience_cache.invalidate(experience_id)
         
         return jsonify({
             'message': 'Experiência atualizada com sucesso',
@@ -567,8 +1341,10 @@ def admin_delete_experience(experience_id):
         if not experience:
             return jsonify({'error': 'Experiência não encontrada'}), 404
         
+        sync_photo_refs(db.session, 'experience', experience.id, [])
         db.session.delete(experience)
         db.session.commit()
+        experience_cache.invalidate(experience_id)
         
         return jsonify({
             'message': 'Experiência deletada com sucesso'
@@ -586,28 +1362,28 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def save_image(file, experience_id):
-    """Salva uma imagem e retorna a URL"""
-    try:
-        # Criar diretório se não existir
-        upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', str(experience_id))
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Gerar nome único para o arquivo
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        unique_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(upload_folder, unique_filename)
-        
-        # Salvar arquivo
-        file.save(filepath)
-        
-        # Retornar URL relativa
-        return f"/static/uploads/{experience_id}/{unique_filename}"
-        
-    except Exception as e:
-        current_app.logger.error(f"Erro ao salvar imagem: {str(e)}")
-        return None
+def photo_url(photo):
+    """URL principal de uma foto (fotos antigas são só a URL; as novas, objetos com variantes)"""
+    return photo['url'] if isinstance(photo, dict) else photo
+
+def photo_storage_root():
+    return os.path.join(current_app.root_path, 'static', 'photos')
+
+def remove_photo_files(photo):
+    """Remove do disco os arquivos de uma foto antiga (fora do armazenamento por hash)
+    
+    Fotos endereçadas pelo conteúdo são compartilhadas: seus arquivos só saem
+    na coleta periódica de blobs sem referências (start_photo_gc).
+    """
+    url = photo_url(photo)
+    if not url.startswith('/static/uploads/'):
+        return
+    file_path = os.path.join(current_app.root_path, url.lstrip('/'))
+    if isinstance(photo, dict):
+        # Variantes ficam juntas no diretório da foto
+        shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+    elif os.path.exists(file_path):
+        os.remove(file_path)
 
 @experience_bp.route('/experiences/<experience_id>/photos', methods=['POST'])
 def upload_photos(experience_id):
@@ -625,7 +1401,7 @@ def upload_photos(experience_id):
         if not files or files[0].filename == '':
             return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
         
-        uploaded_urls = []
+        accepted = []
         
         for file in files:
             if file and allowed_file(file.filename):
@@ -637,23 +1413,34 @@ def upload_photos(experience_id):
                 if file_size > MAX_FILE_SIZE:
                     return jsonify({'error': f'Arquivo {file.filename} é muito grande. Máximo 5MB.'}), 400
                 
-                # Salvar imagem
-                image_url = save_image(file, experience_id)
-                if image_url:
-                    uploaded_urls.append(image_url)
-                else:
-                    return jsonify({'error': f'Erro ao salvar {file.filename}'}), 500
+                accepted.append(file)
+        
+        # Armazenar pelo hash do conteúdo; imagens inéditas são processadas
+        # (EXIF removido, variantes WebP/JPEG) fora das threads de requisição
+        stored_photos, failed = store_photos(accepted, photo_storage_root())
+        if failed:
+            db.session.rollback()
+            return jsonify({'error': f'Erro ao processar {", ".join(failed)}'}), 400
         
-        # Atualizar lista de fotos da experiência
+        # Atualizar lista de fotos da experiência (a mesma imagem não entra duas vezes)
         current_photos = experience.photos or []
-        experience.photos = current_photos + uploaded_urls
+        current_hashes = {photo_hash(photo) for photo in current_photos}
+        uploaded_photos = []
+        for photo in stored_photos:
+            if photo['hash'] not in current_hashes:
+                current_hashes.add(photo['hash'])
+                uploaded_photos.append(photo)
+        
+        experience.photos = current_photos + uploaded_photos
         experience.updated_at = datetime.utcnow()
+        sync_photo_refs(db.session, 'experience', experience.id, experience.photos)
         
         db.session.commit()
+        experience_cache.invalidate(experience_id)
         
         return jsonify({
-            'message': f'{len(uploaded_urls)} foto(s) enviada(s) com sucesso',
-            'photos': uploaded_urls,
+            'message': f'{len(uploaded_photos)} foto(s) enviada(s) com sucesso',
+            'photos': uploaded_photos,
             'total_photos': len(experience.photos)
         }), 200
         
@@ -677,25 +1464,25 @@ def delete_photos(experience_id):
             return jsonify({'error': 'Nenhuma foto especificada para remoção'}), 400
         
         current_photos = experience.photos or []
-        updated_photos = [photo for photo in current_photos if photo not in photo_urls]
+        removed_photos = [photo for photo in current_photos if photo_url(photo) in photo_urls]
+        updated_photos = [photo for photo in current_photos if photo_url(photo) not in photo_urls]
         
         # Remover arquivos físicos
-        for photo_url in photo_urls:
+        for photo in removed_photos:
             try:
-                if photo_url.startswith('/static/uploads/'):
-                    file_path = os.path.join(current_app.root_path, photo_url.lstrip('/'))
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                remove_photo_files(photo)
             except Exception as e:
-                current_app.logger.warning(f"Erro ao remover arquivo {photo_url}: {str(e)}")
+                current_app.logger.warning(f"Erro ao remover arquivo {photo_url(photo)}: {str(e)}")
         
         experience.photos = updated_photos
         experience.updated_at = datetime.utcnow()
+        sync_photo_refs(db.session, 'experience', experience.id, updated_photos)
         
         db.session.commit()
+        experience_cache.invalidate(experience_id)
         
         return jsonify({
-            'message': f'{len(photo_urls)} foto(s) removida(s) com sucesso',
+            'message': f'{len(removed_photos)} foto(s) removida(s) com sucesso',
             'total_photos': len(updated_photos)
         }), 200
         
@@ -718,20 +1505,21 @@ def reorder_photos(experience_id):
         if not new_order:
             return jsonify({'error': 'Nova ordem não especificada'}), 400
         
-        current_photos = experience.photos or []
+        current_photos = {photo_url(photo): photo for photo in (experience.photos or [])}
         
-        # Verificar se todas as fotos na nova ordem existem
-        if not all(photo in current_photos for photo in new_order):
+        # Verificar se todas as fotos na nova ordem existem (identificadas pela URL principal)
+        if not all(url in current_photos for url in new_order):
             return jsonify({'error': 'Algumas fotos especificadas não existem'}), 400
         
-        experience.photos = new_order
+        experience.photos = [current_photos[url] for url in new_order]
         experience.updated_at = datetime.utcnow()
         
         db.session.commit()
+        experience_cache.invalidate(experience_id)
         
         return jsonify({
             'message': 'Fotos reordenadas com sucesso',
-            'photos': new_order
+            'photos': experience.photos
         }), 200
         
     except Exception as e:
@@ -739,3 +1527,41 @@ def reorder_photos(experience_id):
         current_app.logger.error(f"Erro ao reordenar fotos: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@experience_bp.route('/photos', methods=['POST'])
+def upload_shared_photos():
+    """Upload de fotos sem dono (ex.: fotos de reviews)
+    
+    As entradas retornadas vão no campo photos da review; o review-service
+    registra as referências ao salvá-la. Fotos não referenciadas em até um dia
+    são removidas.
+    """
+    try:
+        files = request.files.getlist('photos')
+        if not files or files[0].filename == '':
+            return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+        
+        for file in files:
+            if not allowed_file(file.filename):
+                return jsonify({'error': f'Formato de {file.filename} não suportado'}), 400
+            file.seek(0, 2)
+            if file.tell() > MAX_FILE_SIZE:
+                return jsonify({'error': f'Arquivo {file.filename} é muito grande. Máximo 5MB.'}), 400
+            file.seek(0)
+        
+        photos, failed = store_photos(files, photo_storage_root())
+        if failed:
+            db.session.rollback()
+            return jsonify({'error': f'Erro ao processar {", ".join(failed)}'}), 400
+        
+        db.session.commit()
+        
+        return jsonify({
+            'message': f'{len(photos)} foto(s) enviada(s) com sucesso',
+            'photos': photos
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Erro no upload de fotos: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
@@ -0,0 +1,394 @@
+from src.models.experience import ExperienceCategory, db
+from sqlalchemy import text
+import pandas as pd
+import json
+import uuid
+
+# Colunas da planilha de upload (mesma ordem do template)
+REQUIRED_COLUMNS = ['name', 'description', 'address', 'latitude', 'longitude']
+OPTIONAL_COLUMNS = ['category_id', 'phone', 'website_url', 'instagram_handle', 'opening_hours', 'price_range', 'is_hidden_gem', 'external_id']
+TEXT_COLUMNS = ['name', 'description', 'address', 'category_id', 'phone', 'website_url', 'instagram_handle', 'external_id']
+
+TRUE_VALUES = {'true', '1', 'sim', 's', 'yes', 'y', 'verdadeiro', 'x'}
+
+# Linhas por INSERT (e por commit) na inserção em lote
+BULK_INSERT_BATCH_SIZE = 5000
+
+BULK_INSERT_SQL = text("""
+    INSERT INTO experiences (
+        id, name, description, category_id, address, location, phone, website_url,
+        instagram_handle, opening_hours, price_range, is_hidden_gem, external_id, created_by,
+        import_job_id, created_at, updated_at
+    )
+    SELECT t.id::uuid, t.name, t.description, t.category_id::uuid, t.address,
+           ST_SetSRID(ST_MakePoint(t.longitude, t.latitude), 4326),
+           t.phone, t.website_url, t.instagram_handle, t.opening_hours::jsonb,
+           t.price_range, t.is_hidden_gem, t.external_id, CAST(:created_by AS UUID),
+           CAST(:import_job_id AS UUID), NOW(), NOW()
+    FROM unnest(
+        CAST(:ids AS TEXT[]), CAST(:names AS TEXT[]), CAST(:descriptions AS TEXT[]),
+        CAST(:category_ids AS TEXT[]), CAST(:addresses AS TEXT[]),
+        CAST(:longitudes AS DOUBLE PRECISION[]), CAST(:latitudes AS DOUBLE PRECISION[]),
+        CAST(:phones AS TEXT[]), CAST(:website_urls AS TEXT[]), CAST(:instagram_handles AS TEXT[]),
+        CAST(:opening_hours AS TEXT[]), CAST(:price_ranges AS INTEGER[]), CAST(:is_hidden_gems AS BOOLEAN[]),
+        CAST(:external_ids AS TEXT[])
+    ) AS t(id, name, description, category_id, address, longitude, latitude, phone,
+           website_url, instagram_handle, opening_hours, price_range, is_hidden_gem, external_id)
+""")
+
+
+def missing_columns(df):
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+def _clean_text(series):
+    """Converte para texto sem espaços nas pontas; vazios viram NaN"""
+    # Números inteiros lidos como float (ex.: category_id 1 -> 1.0) voltam a ser inteiros
+    if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        series = series.astype('Int64')
+    cleaned = series.astype('string').str.strip()
+    return cleaned.mask(cleaned == '')
+
+
+def _opening_hours_json(value):
+    """Aceita JSON (objeto) ou texto livre e devolve JSON serializado"""
+    if pd.isna(value):
+        return '{}'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    try:
+        return json.dumps(json.loads(value))
+    except (TypeError, ValueError):
+        return json.dumps(str(value))
+
+
+def resolve_categories(category_ids):
+    """Retorna o conjunto de category_id existentes, com uma única consulta IN"""
+    unique_ids = [str(value) for value in pd.unique(category_ids.dropna())]
+    if not unique_ids:
+        return set()
+
+    rows = db.session.query(db.cast(ExperienceCategory.id, db.String))\
+        .filter(db.cast(ExperienceCategory.id, db.String).in_(unique_ids)).all()
+    return {row[0] for row in rows}
+
+
+def load_category_ids():
+    """Todos os ids de categoria (tabela pequena), para validar um arquivo inteiro com uma consulta"""
+    return {row[0] for row in db.session.query(db.cast(ExperienceCategory.id, db.String)).all()}
+
+
+def existing_external_ids(external_ids):
+    """external_id da planilha que já estão cadastrados, com uma única consulta"""
+    unique_ids = [str(value) for value in pd.unique(external_ids.dropna())]
+    if not unique_ids:
+        return set()
+
+    rows = db.session.execute(
+        text("SELECT external_id FROM experiences WHERE external_id = ANY(CAST(:ids AS TEXT[]))"),
+        {'ids': unique_ids}
+    )
+    return {row[0] for row in rows}
+
+
+def _report(mask, message, invalid, positions, row_offset, errors):
+    """Registra o erro nas linhas de mask ainda sem erro; retorna a nova máscara de inválidas"""
+    new_errors = mask.fillna(True).astype(bool) & ~invalid
+    # Linha da planilha = posição + 2 (cabeçalho + índice base 1)
+    errors.extend((int(position) + row_offset + 2, message) for position in positions[new_errors])
+    return invalid | new_errors
+
+
+def validate_frame(df, row_offset=0, known_categories=None, seen_external_ids=None):
+    """Valida a planilha coluna a coluna
+
+    Retorna (DataFrame normalizado só com as linhas válidas, lista de erros).
+    Cada erro é uma tupla (linha da planilha, mensagem); apenas o primeiro
+    problema de cada linha é reportado. row_offset é o índice da primeira
+    linha do DataFrame dentro do arquivo (para leitura em partes).
+
+    known_categories evita a consulta de categorias por parte. Com
+    seen_external_ids (conjunto compartilhado entre as partes do arquivo)
+    external_id repetidos no arquivo ou já cadastrados também são erros,
+    verificados só entre as linhas sem outro erro (uma linha descartada não
+    torna repetida a próxima com o mesmo id); o conjunto é atualizado com os
+    ids das linhas válidas desta parte.
+    """
+    frame = pd.DataFrame(index=df.index)
+    for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+        frame[column] = df[column] if column in df.columns else pd.Series(pd.NA, index=df.index, dtype='object')
+
+    for column in TEXT_COLUMNS:
+        frame[column] = _clean_text(frame[column])
+
+    latitude = pd.to_numeric(frame['latitude'], errors='coerce')
+    longitude = pd.to_numeric(frame['longitude'], errors='coerce')
+    price_range = pd.to_numeric(frame['price_range'], errors='coerce')
+
+    if known_categories is None:
+        known_categories = resolve_categories(frame['category_id'])
+
+    # Regras na ordem em que são reportadas (primeiro erro de cada linha)
+    checks = [
+        (frame[['name', 'description', 'address']].isna().any(axis=1),
+         'Campos obrigatórios não podem estar vazios'),
+        (latitude.isna() | longitude.isna(),
+         'Latitude e longitude devem ser números válidos'),
+        (~latitude.between(-90, 90),
+         'Latitude deve estar entre -90 e 90'),
+        (~longitude.between(-180, 180),
+         'Longitude deve estar entre -180 e 180'),
+        (frame['category_id'].notna() & ~frame['category_id'].isin(known_categories),
+         'Categoria não encontrada'),
+        (frame['price_range'].notna() & ~price_range.isin([1, 2, 3, 4]),
+         'price_range deve ser um número inteiro entre 1 e 4'),
+    ]
+
+    invalid = pd.Series(False, index=frame.index)
+    errors = []
+    positions = pd.Series(range(len(frame)), index=frame.index)
+    for mask, message in checks:
+        invalid = _report(mask, message, invalid, positions, row_offset, errors)
+
+    if seen_external_ids is not None:
+        external_id = frame['external_id'].where(~invalid)
+        external_checks = [
+            (external_id.notna() & (external_id.duplicated() | external_id.isin(seen_external_ids)),
+             'external_id repetido no arquivo'),
+            (external_id.notna() & external_id.isin(existing_external_ids(external_id)),
+             'external_id já cadastrado (use o modo upsert para atualizar)'),
+        ]
+        for mask, message in external_checks:
+            invalid = _report(mask, message, invalid, positions, row_offset, errors)
+        seen_external_ids.update(frame['external_id'][~invalid].dropna().tolist())
+
+    errors.sort(key=lambda error: error[0])
+
+    valid = frame[~invalid].copy()
+    valid['latitude'] = latitude[~invalid]
+    valid['longitude'] = longitude[~invalid]
+    valid['price_range'] = price_range[~invalid].astype('Int64')
+    valid['is_hidden_gem'] = valid['is_hidden_gem'].astype('string').str.strip().str.lower().isin(TRUE_VALUES)
+    valid['opening_hours'] = valid['opening_hours'].map(_opening_hours_json)
+
+    return valid, errors
+
+
+def _column_values(series):
+    """Lista Python com None no lugar de NaN/NA (para os arrays do INSERT)"""
+    return [None if pd.isna(value) else value for value in series.tolist()]
+
+
+def _batch_arrays(batch):
+    """Colunas do lote como arrays para os parâmetros de unnest()"""
+    return {
+        'names': _column_values(batch['name']),
+        'descriptions': _column_values(batch['description']),
+        'category_ids': _column_values(batch['category_id']),
+        'addresses': _column_values(batch['address']),
+        'longitudes': batch['longitude'].astype(float).tolist(),
+        'latitudes': batch['latitude'].astype(float).tolist(),
+        'phones': _column_values(batch['phone']),
+        'website_urls': _column_values(batch['website_url']),
+        'instagram_handles': _column_values(batch['instagram_handle']),
+        'opening_hours': batch['opening_hours'].tolist(),
+        'price_ranges': [None if pd.isna(value) else int(value) for value in batch['price_range'].tolist()],
+        'is_hidden_gems': batch['is_hidden_gem'].astype(bool).tolist(),
+        'external_ids': _column_values(batch['external_id'])
+    }
+
+
+def insert_experiences(valid, created_by=None, batch_size=BULK_INSERT_BATCH_SIZE, commit=True, import_job_id=None):
+    """Insere as linhas válidas com INSERT ... SELECT FROM unnest(arrays)
+
+    Uma instrução (e um commit) por lote de batch_size linhas, em vez de um
+    objeto ORM e um round-trip por linha. Com commit=False a transação fica
+    a cargo de quem chama. Retorna a lista de ids criados.
+    """
+    created_ids = []
+
+    for start in range(0, len(valid), batch_size):
+        batch = valid.iloc[start:start + batch_size]
+        ids = [str(uuid.uuid4()) for _ in range(len(batch))]
+
+        db.session.execute(BULK_INSERT_SQL, {
+            'ids': ids,
+            **_batch_arrays(batch),
+            'created_by': created_by,
+            'import_job_id': import_job_id
+        })
+        if commit:
+            db.session.commit()
+        created_ids.extend(ids)
+
+    return created_ids
+
+
+# Raio padrão (metros) para considerar uma linha sem external_id a mesma experiência
+DEFAULT_MATCH_RADIUS_M = 50
+MAX_MATCH_RADIUS_M = 5000
+# Metros por grau de latitude (pré-filtro em graus que usa o índice GIST de location)
+METERS_PER_DEGREE = 111320
+
+# Colunas opcionais atualizadas no upsert quando presentes na planilha: coluna -> valor na tabela de staging
+UPSERT_OPTIONAL_VALUES = {
+    'category_id': 's.category_id::uuid',
+    'phone': 's.phone',
+    'website_url': 's.website_url',
+    'instagram_handle': 's.instagram_handle',
+    'opening_hours': 's.opening_hours::jsonb',
+    'price_range': 's.price_range',
+    'is_hidden_gem': 's.is_hidden_gem',
+    'external_id': 'COALESCE(s.external_id, e.external_id)'
+}
+
+UPSERT_STAGE_SQL = text("""
+    CREATE TEMP TABLE import_stage ON COMMIT DROP AS
+    SELECT t.*, ST_SetSRID(ST_MakePoint(t.longitude, t.latitude), 4326) AS geom,
+           lower(unaccent(btrim(t.name))) AS norm_name, NULL::uuid AS match_id
+    FROM unnest(
+        CAST(:positions AS INTEGER[]), CAST(:row_numbers AS INTEGER[]),
+        CAST(:names AS TEXT[]), CAST(:descriptions AS TEXT[]),
+        CAST(:category_ids AS TEXT[]), CAST(:addresses AS TEXT[]),
+        CAST(:longitudes AS DOUBLE PRECISION[]), CAST(:latitudes AS DOUBLE PRECISION[]),
+        CAST(:phones AS TEXT[]), CAST(:website_urls AS TEXT[]), CAST(:instagram_handles AS TEXT[]),
+        CAST(:opening_hours AS TEXT[]), CAST(:price_ranges AS INTEGER[]), CAST(:is_hidden_gems AS BOOLEAN[]),
+        CAST(:external_ids AS TEXT[])
+    ) AS t(position, row_number, name, description, category_id, address, longitude, latitude, phone,
+           website_url, instagram_handle, opening_hours, price_range, is_hidden_gem, external_id)
+""")
+
+UPSERT_MATCH_BY_KEY_SQL = text("""
+    UPDATE import_stage s SET match_id = e.id
+    FROM experiences e
+    WHERE s.external_id IS NOT NULL AND e.external_id = s.external_id
+""")
+
+# Mesmo nome normalizado dentro do raio: o pré-filtro em graus usa o índice GIST
+# e ST_DWithin em geography confirma a distância em metros
+UPSERT_MATCH_BY_NAME_SQL = text("""
+    UPDATE import_stage s SET match_id = (
+        SELECT e.id FROM experiences e
+        WHERE ST_DWithin(e.location, s.geom, :radius_deg / GREATEST(cos(radians(s.latitude)), 0.01))
+          AND ST_DWithin(e.location::geography, s.geom::geography, :radius_m)
+          AND lower(unaccent(btrim(e.name))) = s.norm_name
+          AND (s.external_id IS NULL OR e.external_id IS NULL)
+        ORDER BY e.location <-> s.geom
+        LIMIT 1
+    )
+    WHERE s.match_id IS NULL
+""")
+
+# Linhas com o mesmo external_id que foram associadas a experiências diferentes (por
+# nome e raio, ou uma nova e outra existente): gravar as duas violaria o índice único de
+# external_id e abortaria a parte inteira. Vale a última linha; as outras saem como erro
+UPSERT_EXTERNAL_ID_CONFLICTS_SQL = text("""
+    WITH targets AS (
+        SELECT position, match_id,
+               FIRST_VALUE(match_id) OVER (PARTITION BY external_id ORDER BY position DESC) AS final_match_id
+        FROM import_stage
+        WHERE external_id IS NOT NULL
+    )
+    DELETE FROM import_stage s
+    USING targets t
+    WHERE s.position = t.position AND t.match_id IS DISTINCT FROM t.final_match_id
+    RETURNING s.row_number
+""")
+UPSERT_EXTERNAL_ID_CONFLICT_MESSAGE = (
+    'external_id repetido no arquivo em linhas que correspondem a experiências diferentes (vale a última)'
+)
+
+# Linhas novas; repetições dentro do arquivo (mesmo external_id) ficam com a última
+UPSERT_INSERT_SQL = text("""
+    INSERT INTO experiences (
+        name, description, category_id, address, location, phone, website_url,
+        instagram_handle, opening_hours, price_range, is_hidden_gem, external_id, created_by,
+        import_job_id, created_at, updated_at
+    )
+    SELECT s.name, s.description, s.category_id::uuid, s.address, s.geom, s.phone, s.website_url,
+           s.instagram_handle, s.opening_hours::jsonb, s.price_range, s.is_hidden_gem, s.external_id,
+           CAST(:created_by AS UUID), CAST(:import_job_id AS UUID), NOW(), NOW()
+    FROM (
+        SELECT DISTINCT ON (COALESCE(external_id, position::text)) *
+        FROM import_stage
+        WHERE match_id IS NULL
+        ORDER BY COALESCE(external_id, position::text), position DESC
+    ) s
+    RETURNING id
+""")
+
+
+def _upsert_update_sql(columns):
+    """UPDATE das experiências encontradas, só onde algum valor mudou
+
+    Atualiza as colunas obrigatórias e as opcionais presentes na planilha (as
+    ausentes mantêm o valor atual). Quando várias linhas apontam para a mesma
+    experiência, vale a última do arquivo.
+    """
+    values = {
+        'name': 's.name',
+        'description': 's.description',
+        'address': 's.address',
+        'location': 's.geom'
+    }
+    values.update({column: UPSERT_OPTIONAL_VALUES[column] for column in columns if column in UPSERT_OPTIONAL_VALUES})
+
+    assignments = ', '.join(f'{column} = {value}' for column, value in values.items())
+    current = ', '.join(f'e.{column}' for column in values if column != 'location')
+    incoming = ', '.join(value for column, value in values.items() if column != 'location')
+
+    return text(f"""
+        UPDATE experiences e SET {assignments}, updated_at = NOW()
+        FROM (
+            SELECT DISTINCT ON (match_id) *
+            FROM import_stage
+            WHERE match_id IS NOT NULL
+            ORDER BY match_id, position DESC
+        ) s
+        WHERE e.id = s.match_id
+          AND (({current}) IS DISTINCT FROM ({incoming}) OR NOT ST_Equals(e.location, s.geom))
+        RETURNING e.id
+    """)
+
+
+def upsert_experiences(valid, columns, created_by=None, radius_m=DEFAULT_MATCH_RADIUS_M, import_job_id=None,
+                       row_numbers=None):
+    """Atualiza experiências existentes e insere as novas, tudo em operações de conjunto
+
+    Cada linha é associada a uma experiência pelo external_id ou, na falta dele,
+    pelo nome normalizado (minúsculas, sem acento) dentro de radius_m metros.
+    columns são as colunas presentes na planilha; row_numbers, a linha da
+    planilha de cada linha de valid (para os erros). Não faz commit. Retorna
+    (ids criados, ids atualizados, quantidade sem alteração, erros por linha).
+    """
+    if not len(valid):
+        return [], [], 0, []
+
+    positions = list(range(len(valid)))
+    db.session.execute(UPSERT_STAGE_SQL, {
+        'positions': positions,
+        'row_numbers': [int(row) for row in row_numbers] if row_numbers is not None else [position + 2 for position in positions],
+        **_batch_arrays(valid)
+    })
+    db.session.execute(UPSERT_MATCH_BY_KEY_SQL)
+    db.session.execute(UPSERT_MATCH_BY_NAME_SQL, {
+        'radius_m': radius_m,
+        'radius_deg': radius_m / METERS_PER_DEGREE
+    })
+
+    row_errors = sorted(
+        (row[0], UPSERT_EXTERNAL_ID_CONFLICT_MESSAGE) for row in db.session.execute(UPSERT_EXTERNAL_ID_CONFLICTS_SQL)
+    )
+
+    # Várias linhas podem apontar para a mesma experiência: conta experiências, como updated_ids
+    matched = db.session.execute(text("SELECT COUNT(DISTINCT match_id) FROM import_stage")).scalar()
+    updated_ids = [str(row[0]) for row in db.session.execute(_upsert_update_sql(columns))]
+    created_ids = [str(row[0]) for row in db.session.execute(UPSERT_INSERT_SQL, {
+        'created_by': created_by,
+        'import_job_id': import_job_id
+    })]
+
+    # ON COMMIT DROP só vale no fim da transação; liberar o nome para a próxima parte
+    db.session.execute(text("DROP TABLE import_stage"))
+
+    return created_ids, updated_ids, matched - len(updated_ids), row_errors
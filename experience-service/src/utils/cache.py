@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+class TTLCache:
+    """Cache LRU em memória com expiração por tempo (thread-safe)"""
+
+    def __init__(self, max_size=1024, ttl_seconds=60):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Retorna o valor armazenado ou None se ausente/expirado"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+
+            # Remover os itens usados há mais tempo
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
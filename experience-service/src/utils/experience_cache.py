@@ -0,0 +1,182 @@
+from src.utils.cache import TTLCache
+from taiglo_shared.experience_cache import (
+    EXPERIENCE_CACHE_CHANNEL, EXPERIENCE_CACHE_GENERATION_KEY, EXPERIENCE_CACHE_KEY,
+    canonical_experience_id, invalidate_experience_keys
+)
+from threading import Lock, Thread
+import logging
+import os
+import redis
+import time
+
+logger = logging.getLogger(__name__)
+
+# JSON serializado de GET /experiences/<id>, em dois níveis:
+#   local  -> LRU + TTL em memória de cada processo (sem rede)
+#   shared -> Redis, compartilhado entre processos e réplicas do serviço
+# Escritas fora deste serviço também invalidam: o review-service apaga a chave e publica
+# no mesmo canal quando uma review muda média e total de reviews (trigger no banco).
+# O TTL local curto só limita o atraso se uma dessas publicações se perder.
+EXPERIENCE_CACHE_SIZE = int(os.getenv('EXPERIENCE_CACHE_SIZE', 5000))
+EXPERIENCE_CACHE_TTL = int(os.getenv('EXPERIENCE_CACHE_TTL', 30))
+EXPERIENCE_SHARED_CACHE_TTL = int(os.getenv('EXPERIENCE_SHARED_CACHE_TTL', 300))
+
+# Grava no Redis só se a geração da experiência ainda for a lida antes da consulta ao banco
+SET_IF_GENERATION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+class ExperienceCache:
+    """Cache de experiências serializadas com invalidação explícita nas escritas
+
+    Sem REDIS_URL (ou com o Redis fora do ar) funciona só com o nível local.
+    Os ids são normalizados (str(uuid.UUID(...))): a mesma experiência pedida com
+    outra grafia do UUID cai na chave que invalidate apaga. Quem carrega do banco
+    chama generation() antes e passa o valor a set(), que descarta o JSON se uma
+    invalidação chegou no meio da leitura.
+    """
+
+    def __init__(self, max_size=EXPERIENCE_CACHE_SIZE, ttl_seconds=EXPERIENCE_CACHE_TTL,
+                 shared_ttl_seconds=EXPERIENCE_SHARED_CACHE_TTL, redis_url=None):
+        self.local = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.redis_url = redis_url
+        self.shared_ttl_seconds = shared_ttl_seconds
+        self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.2, socket_connect_timeout=0.2) if redis_url else None
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0, 'shared_errors': 0}
+        self._stats_lock = Lock()
+        self._listener = None
+        self._set_if_generation = self.redis.register_script(SET_IF_GENERATION_SCRIPT) if self.redis else None
+        # Invalidações vistas por este processo (locais ou pelo canal), para o nível local
+        self._local_generation = 0
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _bump_local_generation(self):
+        with self._stats_lock:
+            self._local_generation += 1
+
+    def get(self, experience_id):
+        """JSON da experiência ou None; um acerto no Redis também preenche o nível local"""
+        experience_id = canonical_experience_id(experience_id)
+        if experience_id is None:
+            return None
+
+        payload = self.local.get(experience_id)
+        if payload is not None:
+            self._count('local_hits')
+            return payload
+
+        if self.redis is not None:
+            try:
+                payload = self.redis.get(EXPERIENCE_CACHE_KEY.format(experience_id))
+            except redis.RedisError:
+                self._count('shared_errors')
+                payload = None
+            if payload is not None:
+                payload = payload.decode('utf-8')
+                self.local.set(experience_id, payload)
+                self._count('shared_hits')
+                return payload
+
+        self._count('misses')
+        return None
+
+    def generation(self, experience_id):
+        """Geração atual (local e no Redis): ler antes de consultar o banco e passar a set()"""
+        experience_id = canonical_experience_id(experience_id)
+        with self._stats_lock:
+            local_generation = self._local_generation
+
+        shared_generation = None
+        if self.redis is not None and experience_id is not None:
+            try:
+                shared_generation = (self.redis.get(EXPERIENCE_CACHE_GENERATION_KEY.format(experience_id)) or b'0').decode('ascii')
+            except redis.RedisError:
+                self._count('shared_errors')
+        return local_generation, shared_generation
+
+    def set(self, experience_id, payload, generation):
+        """Guarda o JSON se nenhuma invalidação aconteceu desde generation()"""
+        experience_id = canonical_experience_id(experience_id)
+        if experience_id is None:
+            return
+
+        local_generation, shared_generation = generation
+        with self._stats_lock:
+            local_current = self._local_generation == local_generation
+        if local_current:
+            self.local.set(experience_id, payload)
+
+        if self._set_if_generation is not None and shared_generation is not None:
+            try:
+                self._set_if_generation(
+                    keys=[EXPERIENCE_CACHE_KEY.format(experience_id), EXPERIENCE_CACHE_GENERATION_KEY.format(experience_id)],
+                    args=[shared_generation, payload, self.shared_ttl_seconds]
+                )
+            except redis.RedisError:
+                self._count('shared_errors')
+
+    def invalidate(self, *experience_ids):
+        """Remove as experiências dos dois níveis e avisa os outros processos (chamar após o commit)"""
+        experience_ids = [
+            experience_id for experience_id in map(canonical_experience_id, experience_ids) if experience_id
+        ]
+        if not experience_ids:
+            return
+
+        self._bump_local_generation()
+        for experience_id in experience_ids:
+            self.local.delete(experience_id)
+        self._count('invalidations', len(experience_ids))
+
+        if self.redis is not None:
+            try:
+                invalidate_experience_keys(self.redis, experience_ids)
+            except redis.RedisError:
+                self._count('shared_errors')
+
+    def start_listener(self):
+        """Thread que apaga do cache local as experiências invalidadas em outros processos"""
+        if self.redis is None or self._listener is not None:
+            return
+
+        def listen():
+            # Conexão própria, sem socket_timeout: a leitura do canal bloqueia até chegar mensagem
+            client = redis.Redis.from_url(self.redis_url)
+            while True:
+                try:
+                    pubsub = client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(EXPERIENCE_CACHE_CHANNEL)
+                    for message in pubsub.listen():
+                        self._bump_local_generation()
+                        for experience_id in message['data'].decode('utf-8').split(','):
+                            self.local.delete(experience_id)
+                except redis.RedisError as e:
+                    # Durante a queda do Redis o nível local vale só pelo TTL
+                    logger.warning(f"Canal de invalidação do cache indisponível: {str(e)}")
+                    self._bump_local_generation()
+                    self.local.clear()
+                    time.sleep(5)
+
+        self._listener = Thread(target=listen, name='experience-cache-listener', daemon=True)
+        self._listener.start()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = stats['local_hits'] + stats['shared_hits']
+        lookups = hits + stats['misses']
+        stats['hit_ratio'] = round(hits / lookups, 4) if lookups else None
+        stats['local_size'] = len(self.local)
+        stats['shared'] = self.redis is not None
+        return stats
+
+
+experience_cache = ExperienceCache(redis_url=os.getenv('REDIS_URL'))
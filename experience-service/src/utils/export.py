@@ -0,0 +1,139 @@
+from src.models.experience import db
+from src.utils.bulk_import import REQUIRED_COLUMNS, OPTIONAL_COLUMNS
+from sqlalchemy import text
+import pyarrow as pa
+import pyarrow.parquet as pq
+import csv
+import io
+import json
+
+# Mesmas colunas (e ordem) da planilha de upload, para o arquivo exportado poder ser reimportado
+EXPORT_COLUMNS = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+# Linhas por busca no cursor do servidor (e por row group no Parquet)
+EXPORT_BATCH_SIZE = 10000
+# Bytes acumulados antes de enviar um pedaço do CSV/NDJSON
+EXPORT_FLUSH_BYTES = 256 * 1024
+
+EXPORT_SQL = text("""
+    SELECT e.name, e.description, e.address,
+           ST_Y(e.location) AS latitude, ST_X(e.location) AS longitude,
+           e.category_id::text AS category_id, e.phone, e.website_url, e.instagram_handle,
+           e.opening_hours, e.price_range, e.is_hidden_gem, e.external_id
+    FROM experiences e
+    WHERE (CAST(:category_id AS UUID) IS NULL OR e.category_id = CAST(:category_id AS UUID))
+    ORDER BY e.created_at, e.id
+""")
+
+
+def iter_export_batches(category_id=None, batch_size=EXPORT_BATCH_SIZE):
+    """Lê as experiências em lotes com cursor do servidor (memória constante)"""
+    result = db.session.execute(
+        EXPORT_SQL.execution_options(yield_per=batch_size),
+        {'category_id': category_id}
+    )
+    for batch in result.partitions():
+        yield batch
+
+
+def _csv_value(column, value):
+    if value is None:
+        return ''
+    if column == 'opening_hours':
+        return json.dumps(value, ensure_ascii=False)
+    if column == 'is_hidden_gem':
+        return 'true' if value else 'false'
+    return value
+
+
+def iter_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            writer.writerow([_csv_value(column, value) for column, value in zip(EXPORT_COLUMNS, row)])
+            if buffer.tell() >= EXPORT_FLUSH_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def iter_ndjson(batches):
+    chunk = []
+    size = 0
+    for batch in batches:
+        for row in batch:
+            line = json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False, default=str) + '\n'
+            chunk.append(line)
+            size += len(line)
+            if size >= EXPORT_FLUSH_BYTES:
+                yield ''.join(chunk)
+                chunk = []
+                size = 0
+    yield ''.join(chunk)
+
+
+class _StreamSink:
+    """Destino de escrita do ParquetWriter que entrega os bytes a cada row group"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(batches):
+    """Parquet com um row group por lote; só o lote atual fica em memória"""
+    schema = pa.schema([
+        ('name', pa.string()), ('description', pa.string()), ('address', pa.string()),
+        ('latitude', pa.float64()), ('longitude', pa.float64()), ('category_id', pa.string()),
+        ('phone', pa.string()), ('website_url', pa.string()), ('instagram_handle', pa.string()),
+        ('opening_hours', pa.string()), ('price_range', pa.int32()), ('is_hidden_gem', pa.bool_()),
+        ('external_id', pa.string())
+    ])
+
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            arrays = {column: list(values) for column, values in zip(EXPORT_COLUMNS, columns)}
+            arrays['opening_hours'] = [None if value is None else json.dumps(value, ensure_ascii=False)
+                                       for value in arrays['opening_hours']]
+            writer.write_table(pa.table(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+    'parquet': iter_parquet
+}
@@ -0,0 +1,75 @@
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+import io
+import os
+import threading
+
+# Variantes geradas para cada foto: nome -> maior lado em pixels
+IMAGE_VARIANTS = {
+    'full': 1600,
+    'card': 640,
+    'thumbnail': 200
+}
+IMAGE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}
+}
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', os.cpu_count() or 2))
+
+# Fotos de até 5MB não passam disso; acima é provável decompression bomb
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool de processos criado sob demanda (o processamento de imagem não disputa o GIL das requisições)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _pool
+
+
+def _flatten(image):
+    """RGB para JPEG (transparência sobre fundo branco)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process_image(data, output_dir):
+    """Decodifica a imagem uma vez e grava as variantes em output_dir
+
+    A orientação do EXIF é aplicada aos pixels e os metadados (EXIF, GPS) não
+    são copiados para as variantes. Cada variante é reduzida a partir da
+    anterior, da maior para a menor. Retorna {variante: {'width', 'height',
+    'files': {formato: nome do arquivo}}}. Roda nos processos do pool.
+    """
+    image = Image.open(io.BytesIO(data))
+    # JPEG pode ser decodificado já em escala reduzida (DCT scaling)
+    largest = max(IMAGE_VARIANTS.values())
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image.mode in ('LA', 'P') else 'RGB')
+
+    os.makedirs(output_dir, exist_ok=True)
+    variants = {}
+    for name, max_size in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        files = {}
+        for extension, options in IMAGE_FORMATS.items():
+            filename = f'{name}.{extension}'
+            target = image if extension == 'webp' else _flatten(image)
+            target.save(os.path.join(output_dir, filename), **options)
+            files[extension] = filename
+
+        variants[name] = {'width': image.width, 'height': image.height, 'files': files}
+
+    return variants
@@ -0,0 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import text
+from src.models.experience import db
+from src.models.import_job import BulkImportJob, BulkImportJobError
+from src.utils.bulk_import import (
+    REQUIRED_COLUMNS, missing_columns, load_category_ids, validate_frame, insert_experiences, upsert_experiences
+)
+from src.utils.experience_cache import experience_cache
+from src.utils.spreadsheet import iter_chunks
+import os
+
+# Linhas lidas, validadas e commitadas por vez
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_WORKERS = int(os.getenv('BULK_IMPORT_WORKERS', 2))
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix='bulk-import')
+
+
+def submit_job(app, job_id):
+    """Agenda o processamento de um job em segundo plano"""
+    _executor.submit(process_job, app, job_id)
+
+
+def resume_pending_jobs(app):
+    """Reagenda jobs pendentes ou interrompidos (ex.: após queda do serviço)"""
+    with app.app_context():
+        try:
+            job_ids = [job.id for job in BulkImportJob.query.filter(
+                BulkImportJob.status.in_(['pending', 'running'])
+            ).all()]
+        except Exception as e:
+            app.logger.warning(f"Não foi possível verificar jobs de importação pendentes: {str(e)}")
+            return
+
+    for job_id in job_ids:
+        app.logger.info(f"Retomando job de importação {job_id}")
+        submit_job(app, job_id)
+
+
+def process_job(app, job_id):
+    """Processa um job parte por parte, commitando dados e progresso juntos
+
+    O advisory lock (preso a uma conexão dedicada) garante um único worker por job
+    e é liberado automaticamente se o processo cair. Partes já commitadas
+    (chunks_committed) são puladas, então o job retoma de onde parou.
+    """
+    with app.app_context():
+        lock_key = f'bulk_import:{job_id}'
+        lock_connection = db.engine.connect()
+        try:
+            acquired = lock_connection.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:key))"), {'key': lock_key}
+            ).scalar()
+            lock_connection.commit()
+            if not acquired:
+                return
+
+            try:
+                _run_job(app, job_id)
+            finally:
+                lock_connection.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {'key': lock_key})
+                lock_connection.commit()
+        except Exception as e:
+            app.logger.error(f"Erro no job de importação {job_id}: {str(e)}")
+        finally:
+            lock_connection.close()
+            db.session.remove()
+
+
+def _check_columns(chunk):
+    missing = missing_columns(chunk)
+    if missing:
+        raise ValueError(
+            f'Colunas obrigatórias ausentes: {", ".join(missing)}. '
+            f'Obrigatórias: {", ".join(REQUIRED_COLUMNS)}'
+        )
+
+
+def validate_file(path, file_format, mode='insert', chunk_size=IMPORT_CHUNK_SIZE):
+    """Validação completa do arquivo sem gravar nada (dry run)
+
+    Percorre o arquivo nas mesmas partes e com as mesmas regras do job real,
+    com uma única consulta de categorias. Gera (linhas da parte, linhas válidas,
+    erros da parte). Levanta ValueError se faltarem colunas obrigatórias.
+    """
+    known_categories = load_category_ids()
+    seen_external_ids = set() if mode == 'insert' else None
+
+    for chunk_index, chunk in enumerate(iter_chunks(path, file_format, chunk_size)):
+        if chunk_index == 0:
+            _check_columns(chunk)
+
+        valid, row_errors = validate_frame(
+            chunk, row_offset=chunk_index * chunk_size,
+            known_categories=known_categories, seen_external_ids=seen_external_ids
+        )
+        yield len(chunk), len(valid), row_errors
+
+
+def _run_job(app, job_id):
+    job = BulkImportJob.query.get(job_id)
+    if not job or job.status in ('completed', 'failed'):
+        return
+
+    job.status = 'running'
+    job.started_at = job.started_at or datetime.utcnow()
+    db.session.commit()
+
+    try:
+        known_categories = load_category_ids()
+        # No modo insert, external_id repetido é erro de validação (no upsert vale a última linha)
+        seen_external_ids = set() if job.mode == 'insert' else None
+        if seen_external_ids is not None and job.chunks_committed:
+            # Retomada: as partes puladas não passam por validate_frame, então o conjunto
+            # começa com os external_id que elas já gravaram (mesmo erro de uma execução sem queda)
+            seen_external_ids.update(row[0] for row in db.session.execute(
+                text("SELECT external_id FROM experiences WHERE import_job_id = CAST(:job_id AS UUID) AND external_id IS NOT NULL"),
+                {'job_id': job.id}
+            ))
+
+        for chunk_index, chunk in enumerate(iter_chunks(job.file_path, job.file_format, job.chunk_size)):
+            if chunk_index == 0:
+                _check_columns(chunk)
+
+            # Parte já commitada antes de uma falha: pular
+            if chunk_index < job.chunks_committed:
+                continue
+
+            valid, row_errors = validate_frame(
+                chunk, row_offset=chunk_index * job.chunk_size,
+                known_categories=known_categories, seen_external_ids=seen_external_ids
+            )
+            updated_ids = []
+            unchanged = 0
+            if job.mode == 'upsert':
+                created_ids, updated_ids, unchanged, upsert_errors = upsert_experiences(
+                    valid, list(chunk.columns), job.created_by, job.match_radius_m, import_job_id=job.id,
+                    row_numbers=chunk.index.get_indexer(valid.index) + chunk_index * job.chunk_size + 2
+                )
+                row_errors = sorted(row_errors + upsert_errors)
+            else:
+                created_ids = insert_experiences(valid, job.created_by, commit=False, import_job_id=job.id) if len(valid) else []
+
+            if row_errors:
+                db.session.bulk_insert_mappings(BulkImportJobError, [
+                    {'job_id': job.id, 'row_number': row, 'message': message}
+                    for row, message in row_errors
+                ])
+
+            job.chunks_committed = chunk_index + 1
+            job.rows_processed += len(chunk)
+            job.created_count += len(created_ids)
+            job.updated_count += len(updated_ids)
+            job.unchanged_count += unchanged
+            job.error_count += len(row_errors)
+
+            # Dados e progresso da parte no mesmo commit
+            db.session.commit()
+            experience_cache.invalidate(*updated_ids)
+            app.logger.info(
+                f"Job {job.id}: parte {chunk_index + 1} concluída "
+                f"({job.rows_processed} linhas, {job.created_count} criadas, {job.updated_count} atualizadas, "
+                f"{job.error_count} erros)"
+            )
+
+        job.status = 'completed'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+        try:
+            os.remove(job.file_path)
+        except OSError:
+            pass
+
+    except Exception as e:
+        db.session.rollback()
+        job = BulkImportJob.query.get(job_id)
+        job.status = 'failed'
+        job.error_message = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        app.logger.error(f"Job de importação {job_id} falhou: {str(e)}")
@@ -0,0 +1,43 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import os
+import re
+
+# opening_hours é normalizado no banco em minutos da semana (segunda 00:00 = 0),
+# no horário local das experiências (ver database/opening_hours.sql)
+OPENING_HOURS_TIMEZONE = ZoneInfo(os.getenv('OPENING_HOURS_TIMEZONE', 'America/Sao_Paulo'))
+DAY_NAMES = ['seg', 'ter', 'qua', 'qui', 'sex', 'sab', 'dom']
+OPEN_AT_PATTERN = re.compile(r'^([a-zç]{3})[a-zç-]*\s+(\d{1,2})(?:[:h](\d{2}))?h?$')
+
+
+def minute_of_week(moment):
+    return moment.weekday() * 1440 + moment.hour * 60 + moment.minute
+
+
+def parse_open_at(value):
+    """Converte o filtro open_at em minuto da semana
+
+    Aceita 'now'/'agora', um dia e horário ('sab 22:00', 'domingo 9h') ou data e
+    hora ISO 8601 (com fuso, é convertida para OPENING_HOURS_TIMEZONE).
+    Levanta ValueError para valores inválidos.
+    """
+    value = value.strip()
+    normalized = value.lower().replace('á', 'a').replace('ç', 'c')
+
+    if normalized in ('now', 'agora'):
+        return minute_of_week(datetime.now(OPENING_HOURS_TIMEZONE))
+
+    match = OPEN_AT_PATTERN.match(normalized)
+    if match and match.group(1) in DAY_NAMES:
+        hour, minute = int(match.group(2)), int(match.group(3) or 0)
+        if hour > 23 or minute > 59:
+            raise ValueError('Horário inválido em open_at')
+        return DAY_NAMES.index(match.group(1)) * 1440 + hour * 60 + minute
+
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError("open_at deve ser 'now', dia e horário (ex.: 'sab 22:00') ou data ISO 8601")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(OPENING_HOURS_TIMEZONE)
+    return minute_of_week(moment)
@@ -0,0 +1,250 @@
+from src.models.experience import db
+from src.utils.images import get_pool, process_image
+from sqlalchemy import text
+from threading import Thread
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Fotos endereçadas pelo conteúdo: /static/photos/<2 primeiros>/<sha256>/<variante>.<formato>
+# (photo_hash e sync_photo_refs ficam em taiglo_shared.photos, usados também pelo review-service)
+PHOTO_URL_PREFIX = '/static/photos'
+PHOTO_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# Blobs sem referências só são apagados depois disso (uploads ainda não associados a nada);
+# vale também para diretórios no disco sem linha em photo_blobs (upload que fez rollback)
+PHOTO_GC_GRACE_SECONDS = 24 * 60 * 60
+# Intervalo da coleta periódica (start_photo_gc); um processo por vez (advisory lock)
+PHOTO_GC_INTERVAL_SECONDS = int(os.getenv('PHOTO_GC_INTERVAL_SECONDS', 60 * 60))
+PHOTO_GC_LOCK_KEY = 'photo_gc'
+
+
+def _blob_dir(storage_root, content_hash):
+    return os.path.join(storage_root, content_hash[:2], content_hash)
+
+
+def _photo_entry(content_hash, variants):
+    """Entrada de experience.photos / review.photos a partir das variantes do blob"""
+    base_url = f'{PHOTO_URL_PREFIX}/{content_hash[:2]}/{content_hash}'
+    return {
+        'url': f"{base_url}/{variants['full']['files']['webp']}",
+        'hash': content_hash,
+        'variants': {
+            name: {
+                'width': variant['width'],
+                'height': variant['height'],
+                **{extension: f'{base_url}/{filename}' for extension, filename in variant['files'].items()}
+            }
+            for name, variant in variants.items()
+        }
+    }
+
+
+def store_photos(files, storage_root):
+    """Grava as fotos pelo hash SHA-256 do conteúdo, sem duplicar arquivos
+
+    Imagens já armazenadas (por qualquer experiência ou review) não são
+    reprocessadas. As novas são processadas em paralelo no pool, em um
+    diretório temporário renomeado atomicamente para o diretório do hash.
+    Blobs reaproveitados ficam travados (FOR UPDATE) até o commit de quem chama,
+    então collect_garbage não os apaga antes de sync_photo_refs referenciá-los;
+    os novos ficam sob um advisory lock da transação, para a coleta não apagar o
+    diretório antes da linha em photo_blobs ser commitada.
+    Retorna (entradas na ordem dos arquivos, nomes que falharam). Não faz commit.
+    """
+    uploads = []
+    for file in files:
+        data = file.read()
+        uploads.append((file.filename, hashlib.sha256(data).hexdigest(), data))
+
+    hashes = list({content_hash for _, content_hash, _ in uploads})
+    # Trava e renova os blobs existentes; um blob que a coleta já apagou não volta aqui e é
+    # reprocessado. Ordem fixa dos locks para não haver deadlock entre uploads
+    stored = {
+        row.hash: row.variants
+        for row in db.session.execute(text("""
+            WITH locked AS (
+                SELECT hash FROM photo_blobs
+                WHERE hash = ANY(CAST(:hashes AS TEXT[]))
+                ORDER BY hash
+                FOR UPDATE
+            )
+            UPDATE photo_blobs b SET last_used_at = NOW()
+            FROM locked
+            WHERE b.hash = locked.hash
+            RETURNING b.hash, b.variants
+        """), {'hashes': hashes})
+    }
+
+    new_hashes = sorted(
+        content_hash for content_hash in hashes
+        if not (content_hash in stored and os.path.isdir(_blob_dir(storage_root, content_hash)))
+    )
+    if new_hashes:
+        _lock_blob_dirs(new_hashes)
+
+    pending = {}
+    for filename, content_hash, data in uploads:
+        if content_hash in pending or content_hash not in new_hashes:
+            continue
+        tmp_dir = os.path.join(storage_root, 'tmp', uuid.uuid4().hex)
+        pending[content_hash] = (filename, len(data), tmp_dir, get_pool().submit(process_image, data, tmp_dir))
+
+    failed = []
+    for content_hash, (filename, size, tmp_dir, future) in pending.items():
+        try:
+            variants = future.result(timeout=60)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            failed.append(filename)
+            continue
+
+        final_dir = _blob_dir(storage_root, content_hash)
+        os.makedirs(os.path.dirname(final_dir), exist_ok=True)
+        try:
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            # Mesmo conteúdo gravado por outra requisição ao mesmo tempo
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        stored[content_hash] = variants
+        db.session.execute(text("""
+            INSERT INTO photo_blobs (hash, variants, size_bytes)
+            VALUES (:hash, CAST(:variants AS JSONB), :size)
+            ON CONFLICT (hash) DO UPDATE SET last_used_at = NOW()
+        """), {'hash': content_hash, 'variants': json.dumps(variants), 'size': size})
+
+    entries = [_photo_entry(content_hash, stored[content_hash])
+               for _, content_hash, _ in uploads if content_hash in stored]
+    return entries, failed
+
+
+def _lock_blob_dirs(hashes):
+    """Advisory locks (até o fim da transação) nos diretórios de blob, em ordem fixa"""
+    db.session.execute(text("""
+        SELECT pg_advisory_xact_lock(hashtext('photo_blob:' || hash))
+        FROM (SELECT hash FROM unnest(CAST(:hashes AS TEXT[])) AS hash ORDER BY hash) AS ordered
+    """), {'hashes': hashes})
+
+
+def collect_garbage(storage_root):
+    """Apaga blobs sem referências há mais de PHOTO_GC_GRACE_SECONDS e seus arquivos
+
+    Blobs travados por um upload em andamento (store_photos) são pulados; os
+    apagados continuam travados até os arquivos saírem do disco, então um upload
+    concorrente do mesmo conteúdo espera e grava os arquivos de novo depois.
+    Também remove diretórios antigos sem linha em photo_blobs (ver _sweep_orphan_dirs).
+    """
+    try:
+        removed = [row[0] for row in db.session.execute(text("""
+            WITH candidates AS (
+                SELECT hash FROM photo_blobs
+                WHERE ref_count = 0 AND last_used_at < NOW() - make_interval(secs => :grace)
+                ORDER BY hash
+                FOR UPDATE SKIP LOCKED
+            )
+            DELETE FROM photo_blobs b
+            USING candidates
+            WHERE b.hash = candidates.hash
+            RETURNING b.hash
+        """), {'grace': PHOTO_GC_GRACE_SECONDS})]
+
+        for content_hash in removed:
+            shutil.rmtree(_blob_dir(storage_root, content_hash), ignore_errors=True)
+        db.session.commit()
+
+        removed_dirs = _sweep_orphan_dirs(storage_root)
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(removed) + removed_dirs
+
+
+def _sweep_orphan_dirs(storage_root):
+    """Remove diretórios de blob sem linha em photo_blobs e temporários abandonados
+
+    store_photos move os arquivos para o diretório do hash antes do commit de quem
+    chama; se a requisição falha depois, sobra um diretório que a coleta pelas
+    linhas nunca encontraria. Só entram diretórios mais antigos que a carência, e
+    cada um é conferido sob o mesmo advisory lock que store_photos segura até o commit.
+    """
+    cutoff = time.time() - PHOTO_GC_GRACE_SECONDS
+
+    def subdirs(parent, older_only=True):
+        try:
+            entries = list(os.scandir(parent))
+        except OSError:
+            return []
+        return [entry for entry in entries
+                if entry.is_dir() and (not older_only or entry.stat().st_mtime < cutoff)]
+
+    for entry in subdirs(os.path.join(storage_root, 'tmp')):
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+    # O mtime do diretório de prefixo muda a cada blob novo: só os blobs são filtrados por idade
+    candidates = [
+        blob.name
+        for prefix in subdirs(storage_root, older_only=False) if len(prefix.name) == 2
+        for blob in subdirs(prefix.path)
+        if blob.name.startswith(prefix.name) and PHOTO_HASH_PATTERN.match(blob.name)
+    ]
+    if not candidates:
+        return 0
+
+    try:
+        # Dois comandos: a existência da linha é conferida com um snapshot tirado depois
+        # de obtidos os locks, então um upload que commitou nesse meio tempo aparece
+        locked = [row[0] for row in db.session.execute(text("""
+            SELECT hash
+            FROM (SELECT hash FROM unnest(CAST(:hashes AS TEXT[])) AS hash ORDER BY hash) AS ordered
+            WHERE pg_try_advisory_xact_lock(hashtext('photo_blob:' || hash))
+        """), {'hashes': candidates})]
+        orphans = [row[0] for row in db.session.execute(text("""
+            SELECT candidate.hash FROM unnest(CAST(:hashes AS TEXT[])) AS candidate(hash)
+            WHERE NOT EXISTS (SELECT 1 FROM photo_blobs b WHERE b.hash = candidate.hash)
+        """), {'hashes': locked})]
+
+        for content_hash in orphans:
+            shutil.rmtree(_blob_dir(storage_root, content_hash), ignore_errors=True)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(orphans)
+
+
+def start_photo_gc(app, storage_root):
+    """Thread que roda collect_garbage a cada PHOTO_GC_INTERVAL_SECONDS, fora das requisições"""
+    def run():
+        with app.app_context():
+            while True:
+                time.sleep(PHOTO_GC_INTERVAL_SECONDS)
+                lock_connection = db.engine.connect()
+                try:
+                    acquired = lock_connection.execute(
+                        text("SELECT pg_try_advisory_lock(hashtext(:key))"), {'key': PHOTO_GC_LOCK_KEY}
+                    ).scalar()
+                    lock_connection.commit()
+                    if not acquired:
+                        continue
+
+                    try:
+                        removed = collect_garbage(storage_root)
+                        if removed:
+                            logger.info(f"Coleta de fotos: {removed} blobs removidos")
+                    finally:
+                        lock_connection.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {'key': PHOTO_GC_LOCK_KEY})
+                        lock_connection.commit()
+                except Exception as e:
+                    logger.warning(f"Falha na coleta de fotos sem referências: {str(e)}")
+                finally:
+                    lock_connection.close()
+                    db.session.remove()
+
+    Thread(target=run, name='photo-gc', daemon=True).start()
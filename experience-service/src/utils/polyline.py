@@ -0,0 +1,33 @@
+def decode_polyline(encoded, precision=5):
+    """Decodifica um encoded polyline (formato do Google Maps/OSRM) em [(latitude, longitude)]
+
+    precision é 5 no Google Maps e no OSRM padrão, 6 no Valhalla e no OSRM com
+    polyline6. Levanta ValueError se o texto estiver truncado ou malformado.
+    """
+    factor = 10 ** precision
+    points = []
+    index = latitude = longitude = 0
+    length = len(encoded)
+
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                if index >= length:
+                    raise ValueError('Polyline truncado')
+                byte = ord(encoded[index]) - 63
+                index += 1
+                if byte < 0 or byte > 63:
+                    raise ValueError('Caractere inválido no polyline')
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+
+        latitude += deltas[0]
+        longitude += deltas[1]
+        points.append((latitude / factor, longitude / factor))
+
+    return points
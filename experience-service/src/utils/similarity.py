@@ -0,0 +1,331 @@
+from scipy import sparse
+import numpy as np
+import os
+import re
+import threading
+import unicodedata
+import zlib
+
+# Experiências parecidas: TF-IDF de nome e descrição em vetores esparsos com hashing
+# de features (sem vocabulário para manter), mais bônus por mesma categoria e faixa
+# de preço próxima. O índice guarda as SIMILARITY_TOP_K mais parecidas de cada
+# experiência, então a consulta é só uma leitura de linha.
+SIMILARITY_FEATURES = 2 ** 20
+SIMILARITY_TOP_K = 20
+SIMILARITY_NAME_WEIGHT = 2  # Cada termo do nome conta como duas ocorrências
+SIMILARITY_MAX_DF = 0.2  # Termos em mais de 20% das experiências são ignorados
+SIMILARITY_CATEGORY_WEIGHT = 0.15
+SIMILARITY_PRICE_WEIGHT = 0.05  # Máximo para a mesma faixa de preço, proporcional à diferença
+SIMILARITY_BLOCK_SIZE = 128  # Linhas por bloco no cálculo das listas (bloco x N scores em memória)
+SIMILARITY_REBUILD_RATIO = 0.2  # Proporção de linhas descartadas que pede reconstrução completa
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]{3,}')
+STOPWORDS = {
+    'que', 'com', 'uma', 'para', 'por', 'dos', 'das', 'nos', 'nas', 'mais', 'como', 'mas', 'foi',
+    'ao', 'aos', 'seu', 'sua', 'seus', 'suas', 'ele', 'ela', 'eles', 'elas', 'isso', 'esta', 'este',
+    'essa', 'esse', 'tem', 'sao', 'ser', 'bem', 'muito', 'muita', 'entre', 'sobre', 'tambem', 'onde',
+    'quando', 'cada', 'pelo', 'pela', 'pelos', 'pelas', 'num', 'numa', 'todo', 'toda', 'todos', 'todas'
+}
+
+
+def tokenize(value):
+    """Termos em minúsculas e sem acento, com 3+ caracteres e sem stopwords"""
+    if not value:
+        return []
+    normalized = unicodedata.normalize('NFKD', value.lower())
+    normalized = ''.join(char for char in normalized if not unicodedata.combining(char))
+    return [token for token in TOKEN_PATTERN.findall(normalized) if token not in STOPWORDS]
+
+
+def term_counts(name, description):
+    """{coluna (hash do termo): ocorrências}; crc32 é estável entre processos, hash() não"""
+    counts = {}
+    for weight, value in ((SIMILARITY_NAME_WEIGHT, name), (1, description)):
+        for token in tokenize(value):
+            column = zlib.crc32(token.encode('utf-8')) % SIMILARITY_FEATURES
+            counts[column] = counts.get(column, 0) + weight
+    return counts
+
+
+def document_signature(name, description, category_id, price_range):
+    """Muda só quando algo usado na similaridade muda (nota e reviews não entram)"""
+    return zlib.crc32(f'{name}\x1f{description}\x1f{category_id}\x1f{price_range}'.encode('utf-8'))
+
+
+class SimilarityIndex:
+    """Índice em memória das experiências mais parecidas, com atualização incremental
+
+    Documentos são tuplas (id, nome, descrição, category_id, price_range).
+    Atualizações acrescentam uma linha nova e descartam a antiga; o IDF é o da
+    última construção completa (rebuild quando os descartes passam de
+    SIMILARITY_REBUILD_RATIO). Métodos são thread-safe.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids = []
+        self.positions = {}
+        self.signatures = {}
+        self.category_codes = {}
+        self.idf = np.ones(SIMILARITY_FEATURES, dtype=np.float32)
+        self.matrix = sparse.csr_matrix((0, SIMILARITY_FEATURES), dtype=np.float32)
+        self.codes = np.zeros(0, dtype=np.int32)  # Par (categoria, faixa de preço); -1 = linha descartada
+        self.alive = np.zeros(0, dtype=bool)
+        self.top_ids = np.zeros((0, SIMILARITY_TOP_K), dtype=np.int32)
+        self.top_scores = np.zeros((0, SIMILARITY_TOP_K), dtype=np.float32)
+        self._matrix_t = None
+        self._bonus = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    # ---------- construção ----------
+
+    def build(self, documents):
+        """Reconstrói o índice inteiro (IDF, vetores e listas de mais parecidas)"""
+        documents = list(documents)
+        counts = [term_counts(name, description) for _, name, description, _, _ in documents]
+
+        document_frequency = np.zeros(SIMILARITY_FEATURES, dtype=np.int32)
+        for document_counts in counts:
+            document_frequency[np.fromiter(document_counts.keys(), dtype=np.int64, count=len(document_counts))] += 1
+
+        total = len(documents)
+        idf = (np.log((1 + total) / (1 + document_frequency)) + 1).astype(np.float32)
+        idf[document_frequency > max(SIMILARITY_MAX_DF * total, 10)] = 0
+
+        with self.lock:
+            self.idf = idf
+            self.ids = [document[0] for document in documents]
+            self.positions = {experience_id: position for position, experience_id in enumerate(self.ids)}
+            self.signatures = {
+                document[0]: document_signature(*document[1:]) for document in documents
+            }
+            self.category_codes = {}
+            self.codes = np.array([self._code(document) for document in documents], dtype=np.int32)
+            self.alive = np.ones(total, dtype=bool)
+            self.matrix = self._vectorize(counts)
+            self._matrix_t = None
+            self.top_ids = np.full((total, SIMILARITY_TOP_K), -1, dtype=np.int32)
+            self.top_scores = np.full((total, SIMILARITY_TOP_K), -np.inf, dtype=np.float32)
+            self._compute_top(np.arange(total))
+
+    def _code(self, document):
+        """categoria (0 = sem categoria) * 5 + faixa de preço (0 = sem preço)"""
+        category_id, price_range = document[3], document[4]
+        category = 0 if category_id is None else self.category_codes.setdefault(category_id, len(self.category_codes)) + 1
+        return category * 5 + (price_range or 0)
+
+    def _bonus_table(self):
+        """Bônus de categoria e preço para cada par de códigos; a última coluna (código -1) é -inf"""
+        size = (len(self.category_codes) + 1) * 5
+        if self._bonus is None or len(self._bonus) != size + 1:
+            categories, prices = np.divmod(np.arange(size), 5)
+            same_category = (categories[:, None] == categories[None, :]) & (categories[:, None] > 0)
+            # Faixas de 1 a 4: mesma faixa soma o peso inteiro, 3 faixas de diferença não somam nada
+            price_closeness = 1 - np.abs(prices[:, None] - prices[None, :]) / 3
+            price_closeness[(prices == 0)[:, None] | (prices == 0)[None, :]] = 0
+            bonus = np.full((size + 1, size + 1), -np.inf, dtype=np.float32)
+            bonus[:size, :size] = SIMILARITY_CATEGORY_WEIGHT * same_category + SIMILARITY_PRICE_WEIGHT * price_closeness
+            self._bonus = bonus
+        return self._bonus
+
+    def _vectorize(self, counts):
+        """Linhas TF-IDF (tf sublinear) normalizadas em L2"""
+        indptr = [0]
+        indices = []
+        data = []
+        for document_counts in counts:
+            columns = np.fromiter(document_counts.keys(), dtype=np.int32, count=len(document_counts))
+            frequencies = np.fromiter(document_counts.values(), dtype=np.float32, count=len(document_counts))
+            weights = (1 + np.log(frequencies)) * self.idf[columns]
+            keep = weights > 0
+            columns, weights = columns[keep], weights[keep]
+            order = np.argsort(columns)
+            columns, weights = columns[order], weights[order]
+            norm = np.linalg.norm(weights)
+            if norm:
+                weights /= norm
+            indices.append(columns)
+            data.append(weights)
+            indptr.append(indptr[-1] + len(columns))
+
+        return sparse.csr_matrix((
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+            np.array(indptr, dtype=np.int64)
+        ), shape=(len(counts), SIMILARITY_FEATURES), dtype=np.float32)
+
+    # ---------- similaridade ----------
+
+    def _scores(self, positions):
+        """Similaridade das linhas em positions com todas as linhas (len(positions) x N)"""
+        if self._matrix_t is None:
+            self._matrix_t = self.matrix.T.tocsr()
+        scores = (self.matrix[positions] @ self._matrix_t).toarray()
+        # Uma consulta à tabela por célula em vez de comparar categorias e preços (e exclui descartadas)
+        scores += np.take(self._bonus_table()[self.codes[positions]], self.codes, axis=1)
+        scores[np.arange(len(positions)), positions] = -np.inf
+        return scores
+
+    def _compute_top(self, positions):
+        """Recalcula as listas das posições informadas, em blocos"""
+        k = min(SIMILARITY_TOP_K, len(self.ids))
+        if k == 0:
+            return
+
+        for start in range(0, len(positions), SIMILARITY_BLOCK_SIZE):
+            block = positions[start:start + SIMILARITY_BLOCK_SIZE]
+            scores = self._scores(block)
+
+            candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind='stable')
+            top_ids = np.take_along_axis(candidates, order, axis=1).astype(np.int32)
+            top_scores = np.take_along_axis(candidate_scores, order, axis=1)
+            top_ids[~np.isfinite(top_scores)] = -1
+
+            self.top_ids[block] = -1
+            self.top_scores[block] = -np.inf
+            self.top_ids[block, :k] = top_ids
+            self.top_scores[block, :k] = top_scores
+
+    def similar(self, experience_id, limit=10):
+        """[(id, score)] das mais parecidas, ou None se a experiência não estiver no índice"""
+        with self.lock:
+            position = self.positions.get(experience_id)
+            if position is None:
+                return None
+            return [
+                (self.ids[neighbor], float(score))
+                for neighbor, score in zip(self.top_ids[position, :limit], self.top_scores[position, :limit])
+                if neighbor >= 0
+            ]
+
+    # ---------- atualização incremental ----------
+
+    def upsert(self, documents):
+        """Inclui ou atualiza experiências; retorna quantas mudaram de fato"""
+        with self.lock:
+            documents = [
+                document for document in documents
+                if self.signatures.get(document[0]) != document_signature(*document[1:])
+            ]
+            if not documents:
+                return 0
+
+            replaced = [self.positions[document[0]] for document in documents if document[0] in self.positions]
+            self.alive[replaced] = False
+            self.codes[replaced] = -1
+
+            first = len(self.ids)
+            new_positions = np.arange(first, first + len(documents))
+            for position, document in zip(new_positions, documents):
+                self.ids.append(document[0])
+                self.positions[document[0]] = int(position)
+                self.signatures[document[0]] = document_signature(*document[1:])
+
+            rows = self._vectorize([term_counts(name, description) for _, name, description, _, _ in documents])
+            self.matrix = sparse.vstack([self.matrix, rows], format='csr')
+            self._matrix_t = None
+            self.codes = np.concatenate([
+                self.codes, np.array([self._code(document) for document in documents], dtype=np.int32)
+            ])
+            self.alive = np.concatenate([self.alive, np.ones(len(documents), dtype=bool)])
+            self.top_ids = np.vstack([self.top_ids, np.full((len(documents), SIMILARITY_TOP_K), -1, dtype=np.int32)])
+            self.top_scores = np.vstack([
+                self.top_scores, np.full((len(documents), SIMILARITY_TOP_K), -np.inf, dtype=np.float32)
+            ])
+
+            # Listas próprias das novas linhas e inserção delas nas listas das outras
+            self._compute_top(new_positions)
+            self._insert_into_lists(new_positions)
+            # Listas que ainda citam as versões antigas: recalcular (depois da inserção, senão
+            # a linha nova entraria duas vezes nas listas recalculadas)
+            self._refresh_lists_containing(replaced)
+            return len(documents)
+
+    def remove(self, experience_ids):
+        with self.lock:
+            removed = [self.positions.pop(experience_id) for experience_id in experience_ids
+                       if experience_id in self.positions]
+            for experience_id in experience_ids:
+                self.signatures.pop(experience_id, None)
+            if not removed:
+                return 0
+            self.alive[removed] = False
+            self.codes[removed] = -1
+            self._refresh_lists_containing(removed)
+            return len(removed)
+
+    def _refresh_lists_containing(self, positions):
+        if not len(positions):
+            return
+        affected = np.nonzero(np.isin(self.top_ids, positions).any(axis=1) & self.alive)[0]
+        self._compute_top(affected)
+
+    def _insert_into_lists(self, new_positions):
+        """A similaridade é simétrica: a linha nova entra nas listas em que supera a última"""
+        # As listas das linhas novas já foram calculadas com todas elas vivas
+        existing = self.alive.copy()
+        existing[new_positions] = False
+        for start in range(0, len(new_positions), SIMILARITY_BLOCK_SIZE):
+            block = new_positions[start:start + SIMILARITY_BLOCK_SIZE]
+            scores = self._scores(block)
+            for position, row_scores in zip(block, scores):
+                beaten = np.nonzero((row_scores > self.top_scores[:, -1]) & existing)[0]
+                for other in beaten:
+                    score = row_scores[other]
+                    slot = int(np.searchsorted(-self.top_scores[other], -score, side='right'))
+                    self.top_ids[other, slot + 1:] = self.top_ids[other, slot:-1]
+                    self.top_scores[other, slot + 1:] = self.top_scores[other, slot:-1]
+                    self.top_ids[other, slot] = position
+                    self.top_scores[other, slot] = score
+
+    def needs_rebuild(self):
+        total = len(self.ids)
+        return total > 0 and (total - len(self.positions)) / total > SIMILARITY_REBUILD_RATIO
+
+    # ---------- persistência ----------
+
+    def save(self, path):
+        """Grava o índice em .npz (arquivo temporário + rename, sem leitor ver arquivo pela metade)"""
+        with self.lock:
+            live_ids = np.array([
+                experience_id if self.alive[position] else '' for position, experience_id in enumerate(self.ids)
+            ])
+            tmp_path = f'{path}.tmp.npz'
+            np.savez(
+                tmp_path,
+                ids=live_ids,
+                idf=self.idf,
+                data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                codes=self.codes,
+                category_ids=np.array(sorted(self.category_codes, key=self.category_codes.get)),
+                top_ids=self.top_ids, top_scores=self.top_scores,
+                signature_ids=np.array(list(self.signatures.keys())),
+                signatures=np.array(list(self.signatures.values()), dtype=np.int64)
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        with np.load(path, allow_pickle=False) as stored:
+            ids = [str(experience_id) for experience_id in stored['ids']]
+            index.ids = ids
+            index.alive = np.array([bool(experience_id) for experience_id in ids], dtype=bool)
+            index.positions = {experience_id: position for position, experience_id in enumerate(ids) if experience_id}
+            index.idf = stored['idf']
+            index.matrix = sparse.csr_matrix(
+                (stored['data'], stored['indices'], stored['indptr']), shape=(len(ids), SIMILARITY_FEATURES)
+            )
+            index.codes = stored['codes']
+            index.category_codes = {str(category_id): code for code, category_id in enumerate(stored['category_ids'])}
+            index.top_ids = stored['top_ids']
+            index.top_scores = stored['top_scores']
+            index.signatures = {
+                str(experience_id): int(signature)
+                for experience_id, signature in zip(stored['signature_ids'], stored['signatures'])
+            }
+        return index
@@ -0,0 +1,66 @@
+from openpyxl import load_workbook
+import pandas as pd
+
+
+def _is_blank(row):
+    return all(value is None or (isinstance(value, str) and not value.strip()) for value in row)
+
+
+def iter_csv_chunks(path, chunk_size):
+    """Lê o CSV em DataFrames de até chunk_size linhas"""
+    yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def iter_xlsx_chunks(path, chunk_size):
+    """Lê a primeira planilha do .xlsx em DataFrames de até chunk_size linhas
+
+    Usa o modo read_only do openpyxl, que percorre o XML da planilha linha a
+    linha sem montar a árvore de células: o pico de memória depende de
+    chunk_size, não do tamanho do arquivo. Linhas vazias no meio da planilha
+    são mantidas (para a numeração de linhas dos erros bater com a planilha);
+    as do final são descartadas, como no pd.read_excel.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        columns = [str(value).strip() if value is not None else f'Unnamed: {index}'
+                   for index, value in enumerate(header)]
+        width = len(columns)
+
+        buffer = []
+        pending_blank = []
+        for row in rows:
+            # Linhas podem vir mais curtas ou mais longas que o cabeçalho
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            if _is_blank(row):
+                pending_blank.append(row)
+                continue
+
+            buffer.extend(pending_blank)
+            pending_blank = []
+            buffer.append(row)
+
+            while len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer[:chunk_size], columns=columns)
+                buffer = buffer[chunk_size:]
+
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(path, file_format, chunk_size):
+    """Lê o arquivo do upload em DataFrames de até chunk_size linhas"""
+    if file_format == 'csv':
+        return iter_csv_chunks(path, chunk_size)
+    if file_format == 'xlsx':
+        return iter_xlsx_chunks(path, chunk_size)
+
+    # .xls (formato binário antigo) não tem leitura em streaming
+    df = pd.read_excel(path)
+    return (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
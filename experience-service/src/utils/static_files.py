@@ -0,0 +1,48 @@
+from flask import Response, abort, current_app, send_file
+from werkzeug.security import safe_join
+import mimetypes
+import os
+import stat
+
+# Modos de entrega dos arquivos estáticos (STATIC_OFFLOAD):
+#   ''           -> o próprio worker envia o arquivo (wsgi.file_wrapper/sendfile, Range e condicionais)
+#   'x-sendfile' -> header X-Sendfile com o caminho no disco (Apache mod_xsendfile, lighttpd)
+#   'x-accel'    -> header X-Accel-Redirect com a URI interna (nginx), ex.:
+#                       location /_static/ { internal; alias /app/src/static/; }
+
+
+def send_static(directory, filename, max_age, immutable=False):
+    """Entrega um arquivo de directory sem passar os bytes pelo Python quando possível
+
+    Um único stat por requisição (sem os.path.exists antes do envio). Sem
+    proxy na frente, send_file responde 304/206 para requisições condicionais
+    e com Range e usa wsgi.file_wrapper, que servidores como o gunicorn
+    implementam com sendfile (zero-copy).
+    """
+    path = safe_join(directory, filename)
+    if path is None:
+        abort(404)
+
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        abort(404)
+    if not stat.S_ISREG(file_stat.st_mode):
+        abort(404)
+
+    cache_control = f'public, max-age={max_age}' + (', immutable' if immutable else '')
+    offload = current_app.config.get('STATIC_OFFLOAD', '')
+
+    if offload == 'x-accel':
+        # nginx lê o arquivo e cuida de Range, ETag e If-Modified-Since
+        relative = os.path.relpath(path, current_app.static_folder).replace(os.sep, '/')
+        response = Response(status=200)
+        response.headers['X-Accel-Redirect'] = f"{current_app.config['STATIC_OFFLOAD_PREFIX'].rstrip('/')}/{relative}"
+        response.headers['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    else:
+        # Com USE_X_SENDFILE (modo x-sendfile) o send_file só emite o header X-Sendfile
+        response = send_file(path, conditional=True, etag=True, max_age=max_age,
+                             last_modified=file_stat.st_mtime)
+
+    response.headers['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,170 @@
+"""Validação vetorizada das planilhas de upload (validate_frame), sem banco"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils import bulk_import
+from src.utils.bulk_import import validate_frame
+
+CATEGORY_ID = '6f1c2a1e-1d2b-4c3d-8e4f-5a6b7c8d9e0f'
+
+
+def make_row(**overrides):
+    row = {
+        'name': 'Café do Ponto',
+        'description': 'Café coado na hora',
+        'address': 'Rua Augusta, 100',
+        'latitude': -23.55,
+        'longitude': -46.63,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_valid_rows_are_normalized():
+    df = pd.DataFrame([
+        make_row(name='  Café do Ponto ', category_id=CATEGORY_ID, price_range=2.0,
+                 is_hidden_gem='Sim', opening_hours='{"seg": "08:00-18:00"}'),
+        make_row(latitude='-22.9', longitude='-43.2'),
+    ])
+
+    valid, errors = validate_frame(df, known_categories={CATEGORY_ID})
+
+    assert errors == []
+    assert len(valid) == 2
+    first = valid.iloc[0]
+    assert first['name'] == 'Café do Ponto'
+    assert first['price_range'] == 2
+    assert bool(first['is_hidden_gem']) is True
+    assert first['opening_hours'] == '{"seg": "08:00-18:00"}'
+    second = valid.iloc[1]
+    assert second['latitude'] == -22.9
+    assert pd.isna(second['price_range'])
+    assert bool(second['is_hidden_gem']) is False
+    assert second['opening_hours'] == '{}'
+
+
+def test_each_rule_reports_spreadsheet_row():
+    df = pd.DataFrame([
+        make_row(),
+        make_row(description='   '),
+        make_row(latitude='abc'),
+        make_row(latitude=91),
+        make_row(longitude=-181),
+        make_row(category_id='inexistente'),
+        make_row(price_range=5),
+    ])
+
+    valid, errors = validate_frame(df, known_categories={CATEGORY_ID})
+
+    assert len(valid) == 1
+    # Linha da planilha = posição + 2 (cabeçalho + índice base 1)
+    assert errors == [
+        (3, 'Campos obrigatórios não podem estar vazios'),
+        (4, 'Latitude e longitude devem ser números válidos'),
+        (5, 'Latitude deve estar entre -90 e 90'),
+        (6, 'Longitude deve estar entre -180 e 180'),
+        (7, 'Categoria não encontrada'),
+        (8, 'price_range deve ser um número inteiro entre 1 e 4'),
+    ]
+
+
+def test_only_first_error_of_each_row_is_reported():
+    df = pd.DataFrame([make_row(name=None, latitude=200, price_range=9)])
+
+    valid, errors = validate_frame(df, known_categories=set())
+
+    assert valid.empty
+    assert errors == [(2, 'Campos obrigatórios não podem estar vazios')]
+
+
+def test_row_offset_and_chunk_index():
+    # Parte do meio de um arquivo lido em partes: o índice não começa em 0
+    df = pd.DataFrame([make_row(), make_row(address=None)], index=[500, 501])
+
+    valid, errors = validate_frame(df, row_offset=500, known_categories=set())
+
+    assert list(valid.index) == [500]
+    assert errors == [(503, 'Campos obrigatórios não podem estar vazios')]
+
+
+def test_integer_category_read_as_float_matches():
+    # Planilhas com category_id numérico chegam como float (1 -> 1.0)
+    df = pd.DataFrame([make_row(category_id=1.0), make_row(category_id=None)])
+
+    valid, errors = validate_frame(df, known_categories={'1'})
+
+    assert errors == []
+    assert valid['category_id'].iloc[0] == '1'
+
+
+@pytest.fixture
+def registered_external_ids(monkeypatch):
+    """Substitui a consulta de external_id já cadastrados por um conjunto em memória"""
+    registered = set()
+    monkeypatch.setattr(bulk_import, 'existing_external_ids',
+                        lambda external_ids: registered & set(external_ids.dropna()))
+    return registered
+
+
+def test_repeated_external_id_in_file(registered_external_ids):
+    seen = set()
+    first = pd.DataFrame([make_row(external_id='A'), make_row(external_id='B')])
+    second = pd.DataFrame([make_row(external_id='A'), make_row(external_id='B'), make_row()],
+                          index=[2, 3, 4])
+
+    validate_frame(first, known_categories=set(), seen_external_ids=seen)
+    valid, errors = validate_frame(second, row_offset=2, known_categories=set(), seen_external_ids=seen)
+
+    # Repetidos também entre partes diferentes do arquivo
+    assert list(valid.index) == [4]
+    assert errors == [(4, 'external_id repetido no arquivo'), (5, 'external_id repetido no arquivo')]
+
+
+def test_duplicate_checked_only_among_valid_rows(registered_external_ids):
+    seen = set()
+    df = pd.DataFrame([
+        make_row(external_id='A', latitude='abc'),
+        make_row(external_id='A'),
+        make_row(external_id='B', name=None),
+    ])
+
+    valid, errors = validate_frame(df, known_categories=set(), seen_external_ids=seen)
+
+    # A linha descartada por outro motivo não torna repetida a próxima com o mesmo id
+    assert list(valid['external_id']) == ['A']
+    assert errors == [
+        (2, 'Latitude e longitude devem ser números válidos'),
+        (4, 'Campos obrigatórios não podem estar vazios'),
+    ]
+    # Só os ids das linhas aceitas entram no conjunto compartilhado
+    assert seen == {'A'}
+
+
+def test_invalid_row_does_not_block_id_in_later_chunk(registered_external_ids):
+    seen = set()
+    first = pd.DataFrame([make_row(external_id='A', address=None)])
+    second = pd.DataFrame([make_row(external_id='A')], index=[1])
+
+    validate_frame(first, known_categories=set(), seen_external_ids=seen)
+    valid, errors = validate_frame(second, row_offset=1, known_categories=set(), seen_external_ids=seen)
+
+    assert errors == []
+    assert list(valid['external_id']) == ['A']
+
+
+def test_already_registered_external_id(registered_external_ids):
+    registered_external_ids.add('A')
+    seen = set()
+    df = pd.DataFrame([make_row(external_id='A'), make_row(external_id='B')])
+
+    valid, errors = validate_frame(df, known_categories=set(), seen_external_ids=seen)
+
+    assert list(valid['external_id']) == ['B']
+    assert errors == [(2, 'external_id já cadastrado (use o modo upsert para atualizar)')]
+    assert seen == {'B'}
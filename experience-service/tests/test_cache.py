@@ -0,0 +1,81 @@
+"""TTLCache (cache LRU com expiração) usado pelo autocomplete e pelas facetas"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils import cache as cache_module
+from src.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_returns_stored_value_and_none_when_missing():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set('café', ['Café do Ponto'])
+
+    assert cache.get('café') == ['Café do Ponto']
+    assert cache.get('bar') is None
+
+
+def test_items_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set('a', 1)
+
+    clock.now += 59
+    assert cache.get('a') == 1
+
+    clock.now += 2
+    assert cache.get('a') is None
+    # O item expirado sai do cache na leitura
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    # Ler 'a' o torna o mais recente: 'b' é o próximo a sair
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+
+def test_set_existing_key_refreshes_value_and_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set('a', 1)
+
+    clock.now += 50
+    cache.set('a', 2)
+    clock.now += 50
+
+    assert cache.get('a') == 2
+
+
+def test_delete_and_clear():
+    cache = TTLCache(max_size=10, ttl_seconds=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    cache.delete('a')
+    cache.delete('inexistente')
+    assert cache.get('a') is None
+    assert len(cache) == 1
+
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,77 @@
+"""
+Paginação por cursor de /api/experiences ordenada por relevância
+
+Precisa de um PostgreSQL com PostGIS e database/schema.sql aplicado:
+    TEST_DATABASE_URL=postgresql://... python -m pytest experience-service/tests
+"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason='TEST_DATABASE_URL não configurada (PostgreSQL com database/schema.sql)'
+)
+
+
+@pytest.fixture(scope='module')
+def app():
+    os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+    from src.main import app
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def experiences(app):
+    """Três experiências com um termo exclusivo, para a busca encontrar só elas"""
+    from sqlalchemy import text
+    from src.models.experience import db
+
+    term = f'zqx{uuid.uuid4().hex[:8]}'
+    with app.app_context():
+        ids = [
+            db.session.execute(text("""
+                INSERT INTO experiences (name, description, address, location)
+                VALUES (:name, :description, 'Rua de Teste, 1', ST_SetSRID(ST_MakePoint(-46.63, -23.55), 4326))
+                RETURNING id::text
+            """), {
+                'name': f'Café {term} {i}',
+                # Repetições diferentes do termo dão ranks diferentes
+                'description': ' '.join([term] * (i + 1)) + ' para teste de paginação'
+            }).scalar()
+            for i in range(3)
+        ]
+        db.session.commit()
+
+    yield term, ids
+
+    with app.app_context():
+        db.session.execute(text("DELETE FROM experiences WHERE id = ANY(CAST(:ids AS UUID[]))"), {'ids': ids})
+        db.session.commit()
+
+
+def test_relevance_cursor_second_page(app, experiences):
+    term, ids = experiences
+    client = app.test_client()
+    params = {'search': term, 'sort_by': 'relevance', 'pagination': 'cursor', 'per_page': 2}
+
+    first = client.get('/api/experiences', query_string=params)
+    assert first.status_code == 200
+    first_page = first.get_json()
+    assert len(first_page['experiences']) == 2
+    assert first_page['pagination']['next_cursor']
+
+    second = client.get('/api/experiences', query_string={**params, 'cursor': first_page['pagination']['next_cursor']})
+    assert second.status_code == 200
+    second_page = second.get_json()
+    assert second_page['pagination']['next_cursor'] is None
+
+    returned = [exp['id'] for exp in first_page['experiences'] + second_page['experiences']]
+    assert sorted(returned) == sorted(ids)
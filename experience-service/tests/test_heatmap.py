@@ -0,0 +1,50 @@
+"""Tamanho das células geohash e escolha da resolução do mapa de calor"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.models.experience import HEATMAP_MAX_CELLS, HEATMAP_PRECISIONS, ExperienceReadModel
+
+
+@pytest.mark.parametrize('precision, expected', [
+    (1, (45.0, 45.0)),
+    (2, (11.25, 5.625)),
+    (5, (0.0439453125, 0.0439453125)),
+    # Precisão par: metade dos bits na longitude mais um, células duas vezes mais largas que altas
+    (6, (0.010986328125, 0.0054931640625)),
+    (7, (0.001373291015625, 0.001373291015625)),
+])
+def test_geohash_cell_size(precision, expected):
+    assert ExperienceReadModel.geohash_cell_size(precision) == expected
+
+
+@pytest.mark.parametrize('bounds, expected', [
+    # Cidade de São Paulo (~0,5°): 153 células na 5, mais de 4 mil na 6
+    ((-23.8, -46.9, -23.3, -46.4), 5),
+    # Bairro (~0,05°)
+    ((-23.58, -46.70, -23.53, -46.65), 6),
+    # Quarteirão: a mais fina disponível
+    ((-23.5615, -46.6560, -23.5605, -46.6550), max(HEATMAP_PRECISIONS)),
+    # Brasil inteiro: a mais grossa
+    ((-34.0, -74.0, 5.5, -34.0), min(HEATMAP_PRECISIONS)),
+    # Mundo: nem a mais grossa cabe no limite, fica com ela mesmo assim
+    ((-90.0, -180.0, 90.0, 180.0), min(HEATMAP_PRECISIONS)),
+])
+def test_heatmap_precision(bounds, expected):
+    assert ExperienceReadModel.heatmap_precision(*bounds) == expected
+
+
+def test_heatmap_precision_respects_cell_limit():
+    min_lat, min_lng, max_lat, max_lng = -23.8, -46.9, -23.3, -46.4
+    precision = ExperienceReadModel.heatmap_precision(min_lat, min_lng, max_lat, max_lng)
+
+    def cells(precision):
+        width, height = ExperienceReadModel.geohash_cell_size(precision)
+        return ((max_lng - min_lng) / width + 1) * ((max_lat - min_lat) / height + 1)
+
+    assert cells(precision) <= HEATMAP_MAX_CELLS
+    assert cells(precision + 1) > HEATMAP_MAX_CELLS
@@ -0,0 +1,86 @@
+"""Filtro open_at: minuto da semana (parse_open_at) e normalização de opening_hours no banco"""
+
+import json
+import os
+import sys
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils import opening_hours
+from src.utils.opening_hours import parse_open_at
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+WEEK_MINUTES = 7 * 1440
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('seg 00:00', 0),
+    ('sab 22:00', 5 * 1440 + 22 * 60),
+    ('domingo 9h', 6 * 1440 + 9 * 60),
+    ('Sábado 23h59', 5 * 1440 + 23 * 60 + 59),
+    ('  qua 7:05 ', 2 * 1440 + 7 * 60 + 5),
+    ('dom 23:59', WEEK_MINUTES - 1),
+])
+def test_day_and_time(value, expected):
+    assert parse_open_at(value) == expected
+
+
+def test_iso_without_timezone_is_local_time():
+    # 2024-06-02 é um domingo
+    assert parse_open_at('2024-06-02T23:30:00') == 6 * 1440 + 23 * 60 + 30
+
+
+def test_iso_with_timezone_is_converted(monkeypatch):
+    monkeypatch.setattr(opening_hours, 'OPENING_HOURS_TIMEZONE', ZoneInfo('America/Sao_Paulo'))
+    # Segunda 01:30 UTC ainda é domingo 22:30 em São Paulo (UTC-3): volta para o fim da semana
+    assert parse_open_at('2024-06-03T01:30:00+00:00') == 6 * 1440 + 22 * 60 + 30
+
+
+def test_now_uses_configured_timezone(monkeypatch):
+    monkeypatch.setattr(opening_hours, 'OPENING_HOURS_TIMEZONE', ZoneInfo('America/Sao_Paulo'))
+    before = opening_hours.minute_of_week(datetime.now(ZoneInfo('America/Sao_Paulo')))
+    value = parse_open_at('agora')
+    # Tolera a virada de minuto (e da semana) entre as duas leituras
+    assert (value - before) % WEEK_MINUTES in (0, 1)
+
+
+@pytest.mark.parametrize('value', ['sab 24:00', 'seg 10:60', 'xyz 10:00', 'sabado', '', 'amanhã'])
+def test_invalid_values(value):
+    with pytest.raises(ValueError):
+        parse_open_at(value)
+
+
+@pytest.fixture(scope='module')
+def connection():
+    from sqlalchemy import create_engine
+
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason='TEST_DATABASE_URL não configurada (PostgreSQL com database/schema.sql)')
+@pytest.mark.parametrize('hours, expected', [
+    ({'seg-sex': '08:00-18:00'}, '{[480,1080),[1920,2520),[3360,3960),[4800,5400),[6240,6840)}'),
+    # Sexta à noite até sábado de madrugada: intervalo contínuo
+    ({'sex': '22:00-02:00'}, '{[7080,7320)}'),
+    # Domingo à noite até segunda de madrugada: volta ao início da semana
+    ({'dom': '22:00-02:00'}, '{[0,120),[9960,10080)}'),
+    ({'sab-seg': '20h às 2h'}, '{[0,120),[1200,1560),[8400,8760),[9840,10080)}'),
+    ({'dom': '24h'}, '{[8640,10080)}'),
+    ({'dom': 'fechado'}, '{}'),
+    ({'dom': 'consultar'}, None),
+])
+def test_opening_hours_minutes(connection, hours, expected):
+    from sqlalchemy import text
+
+    result = connection.execute(
+        text("SELECT opening_hours_minutes(CAST(:hours AS JSONB))::text"), {'hours': json.dumps(hours)}
+    ).scalar()
+
+    assert result == expected
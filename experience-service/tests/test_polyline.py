@@ -0,0 +1,63 @@
+"""Decodificação de encoded polylines (rotas do Google Maps, OSRM e Valhalla)"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils.polyline import decode_polyline
+
+
+def encode_polyline(points, precision=5):
+    """Codificador de referência do formato, só para os testes"""
+    factor = 10 ** precision
+    encoded = []
+    previous = (0, 0)
+    for point in points:
+        current = tuple(round(value * factor) for value in point)
+        for delta in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                encoded.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            encoded.append(chr(value + 63))
+        previous = current
+    return ''.join(encoded)
+
+
+def test_google_example_precision_5():
+    # Exemplo da documentação do Google (Encoded Polyline Algorithm Format)
+    assert decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@') == [
+        (38.5, -120.2), (40.7, -120.95), (43.252, -126.453)
+    ]
+
+
+def test_precision_6_round_trip():
+    points = [(-23.561414, -46.655881), (-23.563210, -46.654123), (-23.55052, -46.633309)]
+    encoded = encode_polyline(points, precision=6)
+
+    assert decode_polyline(encoded, precision=6) == points
+    # Lido com a precisão errada, as coordenadas saem 10x maiores
+    assert decode_polyline(encoded)[0] == pytest.approx((-235.61414, -466.55881))
+
+
+def test_empty_polyline():
+    assert decode_polyline('') == []
+
+
+@pytest.mark.parametrize('encoded', [
+    '_p~iF',                  # só a latitude do primeiro ponto
+    '_p~iF~ps|U_ulL',         # segundo ponto sem longitude
+    '_p~iF~ps|',              # número cortado no meio (último byte com bit de continuação)
+])
+def test_truncated_polyline(encoded):
+    with pytest.raises(ValueError, match='truncado'):
+        decode_polyline(encoded)
+
+
+@pytest.mark.parametrize('encoded', ['_p~iF ps|U', '_p~iF~ps|U\x7f?', '_p~iF~ps|Uç?'])
+def test_invalid_character(encoded):
+    with pytest.raises(ValueError, match='Caractere inválido'):
+        decode_polyline(encoded)
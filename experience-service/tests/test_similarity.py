@@ -0,0 +1,131 @@
+"""Índice de experiências parecidas (SimilarityIndex): construção e atualização incremental"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils.similarity import SimilarityIndex
+
+PIZZA = 'cat-pizza'
+JAPONESA = 'cat-japonesa'
+
+DOCUMENTS = [
+    ('p1', 'Pizzaria Napolitana', 'Pizza napolitana no forno a lenha, massa de fermentação natural', PIZZA, 2),
+    ('p2', 'Forno de Pedra', 'Pizza de massa fina assada no forno a lenha', PIZZA, 2),
+    ('p3', 'Cantina do Bixiga', 'Massas caseiras, pizza e vinho na cantina italiana', PIZZA, 3),
+    ('s1', 'Sushi Liberdade', 'Sushi e sashimi de peixe fresco no balcão', JAPONESA, 3),
+    ('s2', 'Temakeria Oriental', 'Temaki, sushi e sashimi com peixe fresco', JAPONESA, 2),
+    ('b1', 'Bar do Mirante', 'Drinks autorais com vista para a cidade', None, None),
+]
+
+
+def build_index(documents=DOCUMENTS):
+    index = SimilarityIndex()
+    index.build(documents)
+    return index
+
+
+def similar_ids(index, experience_id, limit=10):
+    return [neighbor for neighbor, _ in index.similar(experience_id, limit)]
+
+
+def test_build_ranks_similar_documents_first():
+    index = build_index()
+
+    assert len(index) == len(DOCUMENTS)
+    assert set(similar_ids(index, 'p1', 2)) == {'p2', 'p3'}
+    assert similar_ids(index, 's1', 1) == ['s2']
+
+    results = index.similar('p1')
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    # A própria experiência nunca aparece na lista
+    assert 'p1' not in [neighbor for neighbor, _ in results]
+    assert len(results) == len(DOCUMENTS) - 1
+
+
+def test_similar_unknown_id_and_empty_index():
+    assert build_index().similar('inexistente') is None
+
+    empty = SimilarityIndex()
+    empty.build([])
+    assert len(empty) == 0
+    assert empty.similar('p1') is None
+
+
+def test_upsert_unchanged_documents_is_noop():
+    index = build_index()
+    before = index.similar('p1')
+
+    assert index.upsert(DOCUMENTS[:2]) == 0
+    assert index.similar('p1') == before
+    assert not index.needs_rebuild()
+
+
+def test_upsert_changed_document_moves_it():
+    index = build_index()
+
+    # s2 vira pizzaria: sai da vizinhança do sushi e entra na das pizzas
+    changed = ('s2', 'Pizza Oriental', 'Pizza napolitana no forno a lenha com massa fina', PIZZA, 2)
+    assert index.upsert([changed]) == 1
+
+    assert len(index) == len(DOCUMENTS)
+    assert similar_ids(index, 's2', 1)[0] in {'p1', 'p2'}
+    assert 's2' in similar_ids(index, 'p1', 3)
+    assert similar_ids(index, 's1', 1) != ['s2']
+    # Cada id aparece uma vez só, mesmo com a versão antiga ainda na matriz
+    for experience_id in index.positions:
+        neighbors = similar_ids(index, experience_id)
+        assert len(neighbors) == len(set(neighbors)) == len(DOCUMENTS) - 1
+
+
+def test_upsert_new_document_enters_other_lists():
+    index = build_index()
+
+    new = ('s3', 'Sushi Bar Japonês', 'Sushi, sashimi e temaki de peixe fresco', JAPONESA, 3)
+    assert index.upsert([new]) == 1
+
+    assert len(index) == len(DOCUMENTS) + 1
+    assert similar_ids(index, 's3', 2)[0] in {'s1', 's2'}
+    assert 's3' in similar_ids(index, 's1', 2)
+
+
+def test_remove_drops_id_from_other_lists():
+    index = build_index()
+
+    assert index.remove(['p2', 'inexistente']) == 1
+    assert index.remove(['p2']) == 0
+
+    assert len(index) == len(DOCUMENTS) - 1
+    assert index.similar('p2') is None
+    for experience_id in index.positions:
+        assert 'p2' not in similar_ids(index, experience_id)
+    assert similar_ids(index, 'p1', 1) == ['p3']
+
+
+def test_needs_rebuild_after_many_discarded_rows():
+    index = build_index()
+    assert not index.needs_rebuild()
+
+    index.remove(['b1'])
+    assert not index.needs_rebuild()
+
+    index.remove(['p3'])
+    assert index.needs_rebuild()
+
+
+def test_save_and_load(tmp_path):
+    index = build_index()
+    index.remove(['b1'])
+    path = str(tmp_path / 'similarity.npz')
+
+    index.save(path)
+    loaded = SimilarityIndex.load(path)
+
+    assert len(loaded) == len(index)
+    assert loaded.similar('b1') is None
+    for experience_id in index.positions:
+        assert loaded.similar(experience_id) == index.similar(experience_id)
+    # Assinaturas preservadas: o mesmo documento não conta como mudança depois de carregar
+    assert loaded.upsert(DOCUMENTS[:1]) == 0
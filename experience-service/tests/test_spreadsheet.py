@@ -0,0 +1,76 @@
+"""Leitura em partes do .xlsx (iter_xlsx_chunks), com arquivos gerados pelo openpyxl"""
+
+import os
+import sys
+
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.utils.spreadsheet import iter_xlsx_chunks
+
+
+def write_xlsx(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row_number, row in enumerate(rows, start=1):
+        for column_number, value in enumerate(row, start=1):
+            if value is not None:
+                sheet.cell(row=row_number, column=column_number, value=value)
+    workbook.save(path)
+    return str(path)
+
+
+def test_chunks_of_chunk_size(tmp_path):
+    rows = [['name', 'latitude']] + [[f'Lugar {index}', index] for index in range(5)]
+    path = write_xlsx(tmp_path / 'upload.xlsx', rows)
+
+    chunks = list(iter_xlsx_chunks(path, 2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(chunks[0].columns) == ['name', 'latitude']
+    assert list(chunks[2]['name']) == ['Lugar 4']
+    assert [value for chunk in chunks for value in chunk['latitude']] == list(range(5))
+
+
+def test_blank_rows_kept_in_the_middle_and_dropped_at_the_end(tmp_path):
+    rows = [
+        ['name', 'latitude'],
+        ['Lugar 1', 1],
+        [None, None],
+        ['   ', None],
+        ['Lugar 2', 2],
+        [None, None],
+        ['  ', None],
+    ]
+    path = write_xlsx(tmp_path / 'upload.xlsx', rows)
+
+    chunks = list(iter_xlsx_chunks(path, 100))
+
+    # As vazias do meio mantêm a numeração das linhas da planilha
+    assert len(chunks) == 1
+    assert len(chunks[0]) == 4
+    assert chunks[0]['name'].iloc[3] == 'Lugar 2'
+
+
+def test_short_rows_padded_and_unnamed_header(tmp_path):
+    rows = [
+        [' name ', None, 'extra'],
+        ['Lugar 1'],
+        ['Lugar 2', 2, 'x'],
+    ]
+    path = write_xlsx(tmp_path / 'upload.xlsx', rows)
+
+    chunk = next(iter_xlsx_chunks(path, 100))
+
+    assert list(chunk.columns) == ['name', 'Unnamed: 1', 'extra']
+    assert chunk['name'].iloc[0] == 'Lugar 1'
+    assert chunk[['Unnamed: 1', 'extra']].iloc[0].isna().all()
+    assert chunk.iloc[1].tolist() == ['Lugar 2', 2, 'x']
+
+
+def test_empty_sheet_yields_nothing(tmp_path):
+    path = tmp_path / 'vazio.xlsx'
+    Workbook().save(path)
+
+    assert list(iter_xlsx_chunks(str(path), 100)) == []
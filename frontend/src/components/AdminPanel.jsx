@@ -201,6 +201,30 @@ const AdminPanel = () => {
     }
   };
 
+  const waitForImportJob = async (jobId) => {
+    while (true) {
+      const response = await fetch(`${API_BASE_URL}/admin/experiences/bulk-upload/${jobId}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+      const data = await response.json();
+
+      if (!response.ok) {
+        throw new Error(data.error);
+      }
+      if (data.job.status === 'completed' || data.job.status === 'failed') {
+        return data.job;
+      }
+
+      setMessage({ 
+        type: 'success', 
+        text: `Importando... ${data.job.rows_processed} linhas processadas, ${data.job.created_count} experiências criadas.` 
+      });
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+    }
+  };
+
   const handleFileUpload = async (e) => {
     e.preventDefault();
     
@@ -228,11 +252,19 @@ const AdminPanel = () => {
       const data = await response.json();
 
       if (response.ok) {
-        setMessage({ 
-          type: 'success', 
-          text: `Upload concluído! ${data.created_count} experiências criadas.` 
-        });
+        setMessage({ type: 'success', text: 'Upload recebido. Processando importação...' });
         setSelectedFile(null);
+
+        // A importação roda em segundo plano: acompanhar o job até terminar
+        const job = await waitForImportJob(data.job_id);
+        if (job.status === 'completed') {
+          setMessage({ 
+            type: 'success', 
+            text: `Upload concluído! ${job.created_count} experiências criadas, ${job.error_count} erros.` 
+          });
+        } else {
+          setMessage({ type: 'error', text: job.error_message || 'Erro na importação' });
+        }
         fetchExperiences();
       } else {
         setMessage({ type: 'error', text: data.error || 'Erro no upload' });
@@ -222,7 +222,7 @@ export default function ExperienceDetails() {
                 {experience.photos.map((photo, index) => (
                   <div key={index} className="relative group">
                     <img
-                      src={photo}
+                      src={typeof photo === 'string' ? photo : photo.variants.card.webp}
                       alt={`Foto ${index + 1} de ${experience.name}`}
                       className="w-full h-48 object-cover rounded-lg shadow-md hover:shadow-lg transition-shadow duration-200"
                     />
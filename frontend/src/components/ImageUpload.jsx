@@ -6,6 +6,10 @@ import { Card, CardContent } from './ui/card';
 import { X, Upload, Image as ImageIcon, Trash2, Move } from 'lucide-react';
 import { useAuth } from '../hooks/useAuth';
 
+// Fotos novas têm variantes (thumbnail, card, full); as antigas são só a URL
+const photoUrl = (photo) => (typeof photo === 'string' ? photo : photo.url);
+const thumbnailUrl = (photo) => (typeof photo === 'string' ? photo : photo.variants.thumbnail.webp);
+
 const ImageUpload = ({ experienceId, photos = [], onPhotosChange }) => {
   const [uploading, setUploading] = useState(false);
   const [dragActive, setDragActive] = useState(false);
@@ -46,7 +50,7 @@ const ImageUpload = ({ experienceId, photos = [], onPhotosChange }) => {
     }
   };
 
-  const handleDeletePhoto = async (photoUrl) => {
+  const handleDeletePhoto = async (url) => {
     try {
       const response = await fetch(`/api/experiences/${experienceId}/photos`, {
         method: 'DELETE',
@@ -55,12 +59,12 @@ const ImageUpload = ({ experienceId, photos = [], onPhotosChange }) => {
           'Authorization': `Bearer ${token}`
         },
         body: JSON.stringify({
-          photo_urls: [photoUrl]
+          photo_urls: [url]
         })
       });
 
       if (response.ok) {
-        const updatedPhotos = photos.filter(photo => photo !== photoUrl);
+        const updatedPhotos = photos.filter(photo => photoUrl(photo) !== url);
         onPhotosChange(updatedPhotos);
       } else {
         const error = await response.json();
@@ -141,7 +145,7 @@ const ImageUpload = ({ experienceId, photos = [], onPhotosChange }) => {
           {photos.map((photo, index) => (
             <div key={index} className="relative group">
               <img
-                src={photo}
+                src={thumbnailUrl(photo)}
                 alt={`Foto ${index + 1}`}
                 className="w-full h-32 object-cover rounded-lg"
               />
@@ -150,7 +154,7 @@ const ImageUpload = ({ experienceId, photos = [], onPhotosChange }) => {
                   <Button
                     size="sm"
                     variant="destructive"
-                    onClick={() => handleDeletePhoto(photo)}
+                    onClick={() => handleDeletePhoto(photoUrl(photo))}
                     className="h-8 w-8 p-0"
                   >
                     <Trash2 className="h-4 w-4" />
@@ -0,0 +1,125 @@
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+import os
+import uuid
+
+db = SQLAlchemy()
+
+# Parâmetros dos vector tiles (padrão Mapbox)
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_LAYER_NAME = 'experiences'
+MAX_ZOOM = 22
+# Zooms com versão própria em experience_tile_versions (database/tile_versions.sql)
+TILE_VERSION_MIN_ZOOM = 10
+TILE_VERSION_MAX_ZOOM = 14
+
+TILE_MVT_SQL = text("""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+    ),
+    mvtgeom AS (
+        SELECT ST_AsMVTGeom(
+                   ST_Transform(e.location, 3857), bounds.geom,
+                   :extent, :buffer, true
+               ) AS geom,
+               e.id::text AS id,
+               e.name,
+               e.category_id::text AS category_id,
+               c.name AS category_name,
+               c.color_hex,
+               e.average_rating::float AS average_rating,
+               e.price_range,
+               e.is_hidden_gem
+        FROM experiences e
+        LEFT JOIN experience_categories c ON c.id = e.category_id,
+             bounds
+        WHERE e.location && ST_Transform(bounds.geom, 4326)
+    )
+    SELECT ST_AsMVT(mvtgeom.*, :layer, :extent, 'geom') FROM mvtgeom
+""")
+
+# Versão do tile: contadores incrementados por triggers quando uma experiência do tile
+# é criada, alterada ou removida e quando uma categoria muda (nome e cor vão no tile).
+# Abaixo do zoom 10 soma as versões dos descendentes de zoom 10 (só crescem, então a
+# soma muda a cada alteração); leituras pela chave primária, sem varrer as experiências
+TILE_STAMP_SQL = text("""
+    SELECT COALESCE((
+               SELECT SUM(version) FROM experience_tile_versions
+               WHERE z = :z AND x BETWEEN :x_min AND :x_max AND y BETWEEN :y_min AND :y_max
+           ), 0) AS tile_version,
+           (SELECT version FROM map_data_versions WHERE name = 'categories') AS categories_version
+""")
+
+
+def is_valid_tile(z, x, y):
+    """Verifica se as coordenadas z/x/y existem no esquema XYZ"""
+    if not (0 <= z <= MAX_ZOOM):
+        return False
+    max_index = 2 ** z
+    return 0 <= x < max_index and 0 <= y < max_index
+
+
+class TileCache:
+    """Cache em disco dos tiles, organizado como <raiz>/z/x/y/<versão>.mvt"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def tile_stamp(self, z, x, y):
+        """Versão atual de um tile
+
+        Acima de TILE_VERSION_MAX_ZOOM vale a do ancestral; abaixo de TILE_VERSION_MIN_ZOOM,
+        a soma das versões dos descendentes (prefixo 's' para não coincidir com uma versão única).
+        """
+        if z > TILE_VERSION_MAX_ZOOM:
+            shift = z - TILE_VERSION_MAX_ZOOM
+            params = {'z': TILE_VERSION_MAX_ZOOM, 'x_min': x >> shift, 'x_max': x >> shift,
+                      'y_min': y >> shift, 'y_max': y >> shift}
+        else:
+            shift = max(TILE_VERSION_MIN_ZOOM - z, 0)
+            params = {'z': z + shift, 'x_min': x << shift, 'x_max': ((x + 1) << shift) - 1,
+                      'y_min': y << shift, 'y_max': ((y + 1) << shift) - 1}
+        row = db.session.execute(TILE_STAMP_SQL, params).mappings().one()
+        prefix = 's' if z < TILE_VERSION_MIN_ZOOM else ''
+        return f"{prefix}{row['tile_version']}-{row['categories_version']}"
+
+    def tile_dir(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), str(y))
+
+    def get_or_build(self, z, x, y):
+        """Retorna (caminho, versão) do tile, gerando-o no banco se o cache estiver desatualizado"""
+        stamp = self.tile_stamp(z, x, y)
+        directory = self.tile_dir(z, x, y)
+        path = os.path.join(directory, f'{stamp}.mvt')
+
+        if os.path.exists(path):
+            return path, stamp
+
+        tile = db.session.execute(TILE_MVT_SQL, {
+            'z': z,
+            'x': x,
+            'y': y,
+            'extent': TILE_EXTENT,
+            'buffer': TILE_BUFFER,
+            'layer': TILE_LAYER_NAME
+        }).scalar()
+
+        os.makedirs(directory, exist_ok=True)
+
+        # Escrita atômica para que requisições concorrentes nunca leiam um tile parcial
+        # (nome único por escrita: threads do mesmo processo podem gerar o mesmo tile juntas)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as tile_file:
+            tile_file.write(bytes(tile or b''))
+        os.replace(tmp_path, path)
+
+        # Remover versões antigas do mesmo tile
+        for filename in os.listdir(directory):
+            if filename.endswith('.mvt') and filename != f'{stamp}.mvt':
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError:
+                    pass
+
+        return path, stamp
@@ -0,0 +1,29 @@
+from flask import Blueprint, jsonify, send_file, current_app
+from src.models.tile import TileCache, is_valid_tile
+
+tile_bp = Blueprint('tile', __name__)
+
+@tile_bp.route('/tiles/<int:z>/<int:x>/<int:y>.mvt', methods=['GET'])
+def get_tile(z, x, y):
+    """Retorna um Mapbox Vector Tile com as experiências do tile z/x/y"""
+    try:
+        if not is_valid_tile(z, x, y):
+            return jsonify({'error': 'Coordenadas de tile inválidas'}), 400
+
+        cache = TileCache(current_app.config['TILE_CACHE_DIR'])
+        path, stamp = cache.get_or_build(z, x, y)
+
+        # send_file usa wsgi.file_wrapper (sendfile) quando o servidor suporta
+        # e responde 304 para If-None-Match com a versão atual
+        response = send_file(
+            path,
+            mimetype='application/vnd.mapbox-vector-tile',
+            etag=stamp,
+            conditional=True,
+            max_age=current_app.config['TILE_MAX_AGE']
+        )
+        return response
+
+    except Exception as e:
+        current_app.logger.error(f"Erro ao gerar tile {z}/{x}/{y}: {str(e)}")
+        return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -2,6 +2,8 @@ import os
 import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+# Código comum aos serviços (na imagem Docker fica em /app/taiglo_shared, já no PYTHONPATH)
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'shared'))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
@@ -24,6 +24,12 @@ class Review(db.Model):
     # Constraint única para evitar múltiplas avaliações do mesmo usuário para a mesma experiência
     __table_args__ = (
         db.UniqueConstraint('experience_id', 'user_id', name='unique_user_experience_review'),
+        # Índices para paginação por cursor (keyset) nas ordenações suportadas
+        db.Index('idx_reviews_created_at_id', 'created_at', 'id'),
+        db.Index('idx_reviews_rating_id', 'rating', 'id'),
+        db.Index('idx_reviews_helpful_votes_id', 'helpful_votes', 'id'),
+        db.Index('idx_reviews_experience_created_at_id', 'experience_id', 'created_at', 'id'),
+        db.Index('idx_reviews_experience_helpful_votes_id', 'experience_id', 'helpful_votes', 'id'),
     )
     
     def to_dict(self, include_user_info=False, user_info=None):
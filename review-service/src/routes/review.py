@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flasgger import swag_from
 from src.models.review import Review, ReviewHelpfulVote, db
+from taiglo_shared.pagination import InvalidCursor, keyset_paginate, estimate_count
+from src.utils.experience_cache import invalidate_experience
+from taiglo_shared.photos import sync_photo_refs
 from datetime import datetime, date
 import requests
 import os
@@ -42,10 +45,14 @@ def get_experience_info(experience_id):
         {'name': 'user_id', 'in': 'query', 'type': 'string', 'description': 'Filtrar por usuário'},
         {'name': 'min_rating', 'in': 'query', 'type': 'integer', 'description': 'Rating mínimo'},
         {'name': 'max_rating', 'in': 'query', 'type': 'integer', 'description': 'Rating máximo'},
-        {'name': 'include_user_info', 'in': 'query', 'type': 'boolean', 'description': 'Incluir dados do usuário'}
+        {'name': 'include_user_info', 'in': 'query', 'type': 'boolean', 'description': 'Incluir dados do usuário'},
+        {'name': 'cursor', 'in': 'query', 'type': 'string', 'description': 'Cursor opaco da próxima página (paginação por keyset)'},
+        {'name': 'pagination', 'in': 'query', 'type': 'string', 'description': 'Use "cursor" para iniciar a paginação por keyset'},
+        {'name': 'include_total', 'in': 'query', 'type': 'string', 'description': 'Com cursor: "exact" (COUNT) ou "estimate" (estimativa do planejador)'}
     ],
     'responses': {
         200: {'description': 'Lista de reviews'},
+        400: {'description': 'Cursor inválido'},
         500: {'description': 'Erro interno do servidor'}
     }
 })
@@ -88,32 +95,73 @@ def get_reviews():
         sort_by = request.args.get('sort_by', 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
         
-        if sort_by == 'rating':
-            if sort_order == 'asc':
-                query = query.order_by(Review.rating.asc())
-            else:
-                query = query.order_by(Review.rating.desc())
-        elif sort_by == 'helpful_votes':
-            if sort_order == 'asc':
-                query = query.order_by(Review.helpful_votes.asc())
-            else:
-                query = query.order_by(Review.helpful_votes.desc())
-        else:  # created_at
-            if sort_order == 'asc':
-                query = query.order_by(Review.created_at.asc())
-            else:
-                query = query.order_by(Review.created_at.desc())
-        
-        # Paginar
-        reviews = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        # Paginação por cursor (keyset): sem OFFSET e sem COUNT por página
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total')  # 'exact' ou 'estimate'
+        
+        if cursor is not None or request.args.get('pagination') == 'cursor':
+            total = None
+            if include_total == 'exact':
+                total = query.order_by(None).count()
+            elif include_total == 'estimate':
+                total = estimate_count(query)
+            
+            sort_columns = {
+                'created_at': Review.created_at,
+                'rating': Review.rating,
+                'helpful_votes': Review.helpful_votes
+            }
+            if sort_by not in sort_columns:
+                sort_by = 'created_at'
+            
+            items, next_cursor = keyset_paginate(
+                query, sort_columns[sort_by], Review.id, sort_by, sort_order, per_page, cursor,
+                value_parser=datetime.fromisoformat if sort_by == 'created_at' else None
+            )
+            
+            pagination = {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None,
+                'total': total
+            }
+        else:
+            if sort_by == 'rating':
+                if sort_order == 'asc':
+                    query = query.order_by(Review.rating.asc())
+                else:
+                    query = query.order_by(Review.rating.desc())
+            elif sort_by == 'helpful_votes':
+                if sort_order == 'asc':
+                    query = query.order_by(Review.helpful_votes.asc())
+                else:
+                    query = query.order_by(Review.helpful_votes.desc())
+            else:  # created_at
+                if sort_order == 'asc':
+                    query = query.order_by(Review.created_at.asc())
+                else:
+                    query = query.order_by(Review.created_at.desc())
+            
+            # Paginar
+            reviews = query.paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+            items = reviews.items
+            
+            pagination = {
+                'page': reviews.page,
+                'pages': reviews.pages,
+                'per_page': reviews.per_page,
+                'total': reviews.total,
+                'has_next': reviews.has_next,
+                'has_prev': reviews.has_prev
+            }
         
         # Preparar dados das reviews
         reviews_data = []
-        for review in reviews.items:
+        for review in items:
             user_info = None
             if include_user_info:
                 user_info = get_user_info(review.user_id)
@@ -125,14 +173,7 @@ def get_reviews():
         
         return jsonify({
             'reviews': reviews_data,
-            'pagination': {
-                'page': reviews.page,
-                'pages': reviews.pages,
-                'per_page': reviews.per_page,
-                'total': reviews.total,
-                'has_next': reviews.has_next,
-                'has_prev': reviews.has_prev
-            },
+            'pagination': pagination,
             'filters': {
                 'experience_id': experience_id,
                 'user_id': user_id,
@@ -144,6 +185,8 @@ def get_reviews():
             }
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
@@ -273,7 +316,11 @@ def create_review():
         )
         
         db.session.add(review)
+        db.session.flush()
+        sync_photo_refs(db.session, 'review', review.id, review.photos)
         db.session.commit()
+        # Média e total de reviews da experiência mudaram (trigger no banco)
+        invalidate_experience(review.experience_id)
         
         return jsonify({
             'message': 'Review criada com sucesso',
@@ -356,7 +403,10 @@ def update_review(review_id):
         })
         
         review.updated_at = datetime.utcnow()
+        if 'photos' in data:
+            sync_photo_refs(db.session, 'review', review.id, review.photos)
         db.session.commit()
+        invalidate_experience(review.experience_id)
         
         return jsonify({
             'message': 'Review atualizada com sucesso',
@@ -388,8 +438,11 @@ def delete_review(review_id):
         if not review:
             return jsonify({'error': 'Review não encontrada'}), 404
         
+        experience_id = review.experience_id
+        sync_photo_refs(db.session, 'review', review.id, [])
         db.session.delete(review)
         db.session.commit()
+        invalidate_experience(experience_id)
         
         return jsonify({
             'message': 'Review deletada com sucesso'
@@ -0,0 +1,28 @@
+from taiglo_shared.experience_cache import canonical_experience_id, invalidate_experience_keys
+import logging
+import os
+import redis
+
+logger = logging.getLogger(__name__)
+
+# O experience-service guarda o JSON de cada experiência no Redis e em caches locais
+# (experience-service/src/utils/experience_cache.py). Média e total de reviews fazem
+# parte desse JSON e mudam aqui, por trigger no banco: cada escrita de review apaga a
+# chave e publica no mesmo canal usado pelas invalidações de lá (chaves em taiglo_shared).
+REDIS_URL = os.getenv('REDIS_URL')
+_redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.2, socket_connect_timeout=0.2) if REDIS_URL else None
+
+
+def invalidate_experience(*experience_ids):
+    """Invalida o cache das experiências no experience-service (chamar após o commit)"""
+    experience_ids = [
+        experience_id for experience_id in map(canonical_experience_id, experience_ids) if experience_id
+    ]
+    if _redis is None or not experience_ids:
+        return
+
+    try:
+        invalidate_experience_keys(_redis, experience_ids)
+    except redis.RedisError as e:
+        # Sem Redis o experience-service também não lê o nível compartilhado; resta o TTL local
+        logger.warning(f"Não foi possível invalidar o cache de experiências: {str(e)}")
@@ -0,0 +1 @@
+"""Código comum aos serviços Python (copiado para /app/taiglo_shared nas imagens)"""
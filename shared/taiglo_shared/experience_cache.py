@@ -0,0 +1,35 @@
+import uuid
+
+# Chaves do cache de experiências no Redis, usadas pelo experience-service (que grava)
+# e por quem invalida (experience-service e review-service)
+EXPERIENCE_CACHE_KEY = 'experience:json:{}'
+# Geração de cada experiência: incrementada em toda invalidação; o experience-service só
+# grava no Redis se a geração não mudou durante a leitura do banco
+EXPERIENCE_CACHE_GENERATION_KEY = 'experience:generation:{}'
+# Bem maior que o tempo de uma leitura do banco: a geração só precisa sobreviver a ela
+EXPERIENCE_CACHE_GENERATION_TTL = 24 * 60 * 60
+# Canal em que cada invalidação é publicada para os caches locais dos outros processos
+EXPERIENCE_CACHE_CHANNEL = 'experience:invalidate'
+
+
+def canonical_experience_id(experience_id):
+    """Id no formato canônico do UUID (minúsculas, com hifens); None se não for um UUID"""
+    try:
+        return str(uuid.UUID(str(experience_id)))
+    except ValueError:
+        return None
+
+
+def invalidate_experience_keys(client, experience_ids):
+    """Apaga as chaves, avança as gerações e publica no canal (ids já canônicos)
+
+    Levanta redis.RedisError se o Redis estiver fora do ar; quem chama decide o que fazer.
+    """
+    pipeline = client.pipeline(transaction=False)
+    pipeline.delete(*[EXPERIENCE_CACHE_KEY.format(experience_id) for experience_id in experience_ids])
+    for experience_id in experience_ids:
+        generation_key = EXPERIENCE_CACHE_GENERATION_KEY.format(experience_id)
+        pipeline.incr(generation_key)
+        pipeline.expire(generation_key, EXPERIENCE_CACHE_GENERATION_TTL)
+    pipeline.publish(EXPERIENCE_CACHE_CHANNEL, ','.join(experience_ids))
+    pipeline.execute()
@@ -0,0 +1,89 @@
+from sqlalchemy import tuple_
+from datetime import datetime
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado ou gerado para outra ordenação"""
+
+
+def encode_cursor(sort_by, sort_order, value, last_id):
+    """Gera um cursor opaco a partir do último item da página"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort_by, 'o': sort_order, 'v': value, 'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """Decodifica o cursor e confere se ele pertence à ordenação pedida"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value, last_id = payload['v'], payload['id']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Cursor inválido')
+
+    if payload.get('s') != sort_by or payload.get('o') != sort_order:
+        raise InvalidCursor('Cursor não corresponde à ordenação pedida')
+
+    return value, last_id
+
+
+def keyset_paginate(query, sort_column, id_column, sort_by, sort_order, per_page, cursor=None,
+                    value_parser=None, position_getter=None):
+    """Pagina por keyset: WHERE (coluna, id) > (último valor, último id) ORDER BY coluna, id
+
+    Não usa OFFSET nem COUNT, então o custo por página é constante e atendido por
+    um índice composto (coluna, id). position_getter(item) deve retornar (valor, id)
+    quando os itens não forem objetos do modelo. Colunas de ponto flutuante devem ser
+    float8 (ex.: ts_rank, que é float4, convertido com CAST): o valor volta do JSON do
+    cursor como float8 e só compara exatamente com ele. Retorna (itens, próximo cursor ou None).
+    """
+    descending = sort_order != 'asc'
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        if value_parser and value is not None:
+            try:
+                value = value_parser(value)
+            except (ValueError, TypeError):
+                raise InvalidCursor('Cursor inválido')
+
+        position = tuple_(sort_column, id_column)
+        if descending:
+            query = query.filter(position < tuple_(value, last_id))
+        else:
+            query = query.filter(position > tuple_(value, last_id))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Buscar um item a mais para saber se existe próxima página
+    rows = query.limit(per_page + 1).all()
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        if position_getter:
+            value, last_id = position_getter(last)
+        else:
+            value, last_id = getattr(last, sort_column.key), getattr(last, id_column.key)
+        next_cursor = encode_cursor(sort_by, sort_order, value, str(last_id))
+
+    return items, next_cursor
+
+
+def estimate_count(query):
+    """Estimativa do total de linhas pelo planejador do PostgreSQL (sem executar COUNT)"""
+    statement = query.order_by(None).statement
+    connection = query.session.connection()
+    compiled = statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
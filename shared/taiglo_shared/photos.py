@@ -0,0 +1,36 @@
+from sqlalchemy import text
+import re
+
+# Fotos endereçadas pelo conteúdo (armazenadas pelo experience-service):
+# /static/photos/<2 primeiros>/<sha256>/<variante>.<formato>
+PHOTO_URL_PATTERN = re.compile(r'^/static/photos/[0-9a-f]{2}/([0-9a-f]{64})/')
+
+
+def photo_hash(photo):
+    """Hash do conteúdo de uma foto (URL ou entrada com variantes); None para fotos antigas ou externas"""
+    url = photo.get('url') if isinstance(photo, dict) else photo
+    match = PHOTO_URL_PATTERN.match(url or '') if isinstance(url, str) else None
+    return match.group(1) if match else None
+
+
+def sync_photo_refs(session, owner_type, owner_id, photos):
+    """Deixa as referências do dono (experience/review) iguais às fotos atuais
+
+    O ref_count de photo_blobs é mantido por trigger em photo_refs; blobs sem
+    referências são removidos pelo experience-service. Não faz commit.
+    """
+    hashes = list({content_hash for content_hash in map(photo_hash, photos or []) if content_hash})
+    params = {'owner_type': owner_type, 'owner_id': str(owner_id), 'hashes': hashes}
+
+    session.execute(text("""
+        DELETE FROM photo_refs
+        WHERE owner_type = :owner_type AND owner_id = CAST(:owner_id AS UUID)
+          AND NOT (hash = ANY(CAST(:hashes AS TEXT[])))
+    """), params)
+    if hashes:
+        session.execute(text("""
+            INSERT INTO photo_refs (hash, owner_type, owner_id)
+            SELECT hash, :owner_type, CAST(:owner_id AS UUID)
+            FROM photo_blobs WHERE hash = ANY(CAST(:hashes AS TEXT[]))
+            ON CONFLICT DO NOTHING
+        """), params)